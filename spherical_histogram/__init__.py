@@ -2,6 +2,18 @@ from .version import __version__
 from . import mesh
 from . import tree
 from . import geometry
+from . import cache
+from . import accumulate
+from . import stream
+from . import parallel
+from . import serialization
+from . import summary
+from . import raster
+from . import hierarchy
+from . import voronoi
+from . import instrumentation as _instrumentation
+from . import stack
+from .stack import HemisphereHistogramStack
 
 import spherical_coordinates
 import numpy as np
@@ -16,9 +28,13 @@ class HemisphereHistogram:
     ------
     bin_counts : numpy.array
         The contetn of the bins.
-    overflow : int
+    bin_squared_weights : numpy.array or None
+        The sum of the squared weights in each bin. Only if
+        track_squared_weights is True. The uncertainty of a bin's content is
+        the square root of it.
+    overflow : int / float
         When a pointong is assigned to the histogram which does not hit any bin
-        this overflow counter is raised.
+        this overflow counter is raised (by the pointing's weight).
     bin_geometry : spherical_histogram.geometry.HemisphereGeometry
         The geometry of the bins. Each bin is a triangular face on the unit
         sphere. Faces are defined by their vertices. The bin_geometry stores
@@ -31,15 +47,33 @@ class HemisphereHistogram:
         num_vertices=2047,
         max_zenith_distance_rad=np.deg2rad(89.0),
         bin_geometry=None,
+        engine="merlict",
+        cache_dir=None,
+        dtype=int,
+        track_squared_weights=False,
     ):
         """
         Provide either a ``bin_geometry``, or ``num_vertices`` and
         ``max_zenith_distance_rad`` to create a bin_geometry on the fly.
+        The ``engine`` to find the bins of directions and the ``cache_dir``
+        are only used when the bin_geometry is created on the fly.
+        See spherical_histogram.geometry.ENGINES and
+        spherical_histogram.cache.
+        The ``dtype`` of ``bin_counts`` can be e.g. ``numpy.uint32`` for
+        counts or ``numpy.float32``/``numpy.float64`` to assign weights.
+        With ``track_squared_weights`` the sum of the squared weights is kept
+        in ``bin_squared_weights``.
         """
+        self.dtype = np.dtype(dtype)
+        self.track_squared_weights = bool(track_squared_weights)
+        self.instrumentation = None
+
         if bin_geometry is None:
             self.bin_geometry = geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
                 num_vertices=num_vertices,
                 max_zenith_distance_rad=max_zenith_distance_rad,
+                engine=engine,
+                cache_dir=cache_dir,
             )
         else:
             self.bin_geometry = bin_geometry
@@ -50,8 +84,15 @@ class HemisphereHistogram:
         """
         Resets the bin content ``bin_counts`` and  the ``overflow`` to zero.
         """
+        num_bins = len(self.bin_geometry.faces)
         self.overflow = 0
-        self.bin_counts = np.zeros(len(self.bin_geometry.faces), dtype=int)
+        self.bin_counts = np.zeros(num_bins, dtype=self.dtype)
+        self._draw_cdf = None
+        self._draw_cdf_bin_counts = None
+        if self.track_squared_weights:
+            self.bin_squared_weights = np.zeros(num_bins, dtype=float)
+        else:
+            self.bin_squared_weights = None
 
     def solid_angle(self, threshold=1):
         """
@@ -59,77 +100,400 @@ class HemisphereHistogram:
 
         Parameters
         ----------
-        threshold : int / float
+        threshold : int / float or array of ints / floats
             Minimum content of a bin in order to sum its solid angle.
 
         Returns
         -------
-        solid_angle : float
+        solid_angle : float or numpy.array
             The total solid angle covered by all bins with a
-            content >= threshold.
+            content >= threshold. One for each threshold.
         """
-        if threshold == 0:
-            return np.sum(self.bin_geometry.faces_solid_angles)
+        return summary.solid_angle_above(
+            bin_counts=self.bin_counts,
+            faces_solid_angles=self.bin_geometry.faces_solid_angles,
+            threshold=threshold,
+        )
+
+    def containment_solid_angle(self, fraction):
+        """
+        Returns the smallest solid angle which contains the fraction of the
+        content in the bins. The densest bins are taken first.
+
+        Parameters
+        ----------
+        fraction : float or array of floats
+            E.g. 0.68 or [0.68, 0.95].
+
+        Returns
+        -------
+        solid_angle : float or numpy.array
+            One for each fraction.
+        """
+        return summary.containment_solid_angle(
+            bin_counts=self.bin_counts,
+            faces_solid_angles=self.bin_geometry.faces_solid_angles,
+            fraction=fraction,
+        )
 
-        total_sr = 0.0
-        for iface in self.bin_counts:
-            if self.bin_counts[iface] >= threshold:
-                total_sr += self.bin_geometry.faces_solid_angles[iface]
-        return total_sr
+    def moments(self):
+        """
+        Returns the mean direction, the resultant length, the angular spread,
+        and the covariance in the tangent plane of the content.
+        See spherical_histogram.summary.moments().
+        """
+        return summary.moments(
+            bin_counts=self.bin_counts,
+            faces_centroids=self.bin_geometry.faces_centroids,
+        )
 
-    def assign_cx_cy_cz(self, cx, cy, cz):
-        faces = self.bin_geometry.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
-        self._assign(faces)
+    def assign_cx_cy_cz(self, cx, cy, cz, weights=None):
+        """
+        Assigns directions. The optional weights (scalar or one for each
+        direction) are added to the bins instead of one.
+        """
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "query",
+            np.size(cx),
+            self.bin_geometry.query_cx_cy_cz,
+            cx=cx,
+            cy=cy,
+            cz=cz,
+            instrumentation=self.instrumentation,
+        )
+        self._assign(faces, weights=weights)
 
-    def assign_cx_cy(self, cx, cy):
-        faces = self.bin_geometry.query_cx_cy(cx=cx, cy=cy)
-        self._assign(faces)
+    def assign_cx_cy(self, cx, cy, weights=None):
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "query",
+            np.size(cx),
+            self.bin_geometry.query_cx_cy,
+            cx=cx,
+            cy=cy,
+            instrumentation=self.instrumentation,
+        )
+        self._assign(faces, weights=weights)
 
-    def assign_azimuth_zenith(self, azimuth_rad, zenith_rad):
-        faces = self.bin_geometry.query_azimuth_zenith(
+    def assign_azimuth_zenith(self, azimuth_rad, zenith_rad, weights=None):
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "query",
+            np.size(azimuth_rad),
+            self.bin_geometry.query_azimuth_zenith,
             azimuth_rad=azimuth_rad,
             zenith_rad=zenith_rad,
+            instrumentation=self.instrumentation,
         )
-        self._assign(faces)
+        self._assign(faces, weights=weights)
 
-    def assign_cone_cx_cy_cz(self, cx, cy, cz, half_angle_rad):
-        self._assign(
-            self.bin_geometry.query_cone_cx_cy_cz(
-                cx=cx, cy=cy, cz=cz, half_angle_rad=half_angle_rad
-            )
+    def assign_stream_cx_cy_cz(self, chunks, chunk_size=None):
+        """
+        Assigns a stream of directions with a peak memory independent of the
+        stream's length.
+
+        Parameters
+        ----------
+        chunks : iterable
+            Yields tuples (cx, cy, cz) or (cx, cy, cz, weights) of array like.
+            The chunks can have any length, e.g. one event each.
+        chunk_size : int or None
+            The chunks are cut and joined into batches of this size. If None,
+            it is bin_geometry.chunk_size, which defaults to
+            spherical_histogram.stream.CHUNK_SIZE.
+            See spherical_histogram.stream.rechunk().
+        """
+        for batch in self._rechunk(chunks=chunks, chunk_size=chunk_size):
+            self.assign_cx_cy_cz(*batch)
+
+    def assign_stream_cx_cy(self, chunks, chunk_size=None):
+        """
+        Like assign_stream_cx_cy_cz() for chunks (cx, cy) or
+        (cx, cy, weights).
+        """
+        for batch in self._rechunk(chunks=chunks, chunk_size=chunk_size):
+            self.assign_cx_cy(*batch)
+
+    def assign_stream_azimuth_zenith(self, chunks, chunk_size=None):
+        """
+        Like assign_stream_cx_cy_cz() for chunks (azimuth_rad, zenith_rad) or
+        (azimuth_rad, zenith_rad, weights).
+        """
+        for batch in self._rechunk(chunks=chunks, chunk_size=chunk_size):
+            self.assign_azimuth_zenith(*batch)
+
+    def _rechunk(self, chunks, chunk_size):
+        if chunk_size is None:
+            chunk_size = self.bin_geometry.chunk_size
+        return stream.rechunk(chunks=chunks, chunk_size=chunk_size)
+
+    def assign_parallel_cx_cy_cz(
+        self, cx, cy, cz, weights=None, num_workers=None, executor=None
+    ):
+        """
+        Like assign_cx_cy_cz() but the directions are split across a pool of
+        workers. See spherical_histogram.parallel.assign().
+        """
+        parallel.assign(
+            hist=self,
+            kind="cx_cy_cz",
+            columns=_with_weights((cx, cy, cz), weights),
+            num_workers=num_workers,
+            executor=executor,
         )
 
-    def assign_cone_cx_cy(self, cx, cy, half_angle_rad):
-        self._assign(
-            self.bin_geometry.query_cone_cx_cy(
-                cx=cx, cy=cy, half_angle_rad=half_angle_rad
-            )
+    def assign_parallel_cx_cy(
+        self, cx, cy, weights=None, num_workers=None, executor=None
+    ):
+        parallel.assign(
+            hist=self,
+            kind="cx_cy",
+            columns=_with_weights((cx, cy), weights),
+            num_workers=num_workers,
+            executor=executor,
         )
 
+    def assign_parallel_azimuth_zenith(
+        self,
+        azimuth_rad,
+        zenith_rad,
+        weights=None,
+        num_workers=None,
+        executor=None,
+    ):
+        parallel.assign(
+            hist=self,
+            kind="azimuth_zenith",
+            columns=_with_weights((azimuth_rad, zenith_rad), weights),
+            num_workers=num_workers,
+            executor=executor,
+        )
+
+    def assign_cone_cx_cy_cz(self, cx, cy, cz, half_angle_rad, weights=None):
+        """
+        Assigns each face touching a cone once. The pointings and half angles
+        of the cones can be scalars or arrays. The optional weights (scalar or
+        one for each cone) are added to each face touching the cone.
+        """
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "cone_query",
+            np.size(cx),
+            self.bin_geometry.query_cone_cx_cy_cz,
+            cx=cx,
+            cy=cy,
+            cz=cz,
+            half_angle_rad=half_angle_rad,
+        )
+        self._assign_cones(faces, weights=weights)
+
+    def assign_cone_cx_cy(self, cx, cy, half_angle_rad, weights=None):
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "cone_query",
+            np.size(cx),
+            self.bin_geometry.query_cone_cx_cy,
+            cx=cx,
+            cy=cy,
+            half_angle_rad=half_angle_rad,
+        )
+        self._assign_cones(faces, weights=weights)
+
     def assign_cone_azimuth_zenith(
-        self, azimuth_rad, zenith_rad, half_angle_rad
+        self, azimuth_rad, zenith_rad, half_angle_rad, weights=None
     ):
-        self._assign(
-            self.bin_geometry.query_cone_azimuth_zenith(
-                azimuth_rad=azimuth_rad,
-                zenith_rad=zenith_rad,
-                half_angle_rad=half_angle_rad,
+        faces = _instrumentation.call(
+            self.instrumentation,
+            "cone_query",
+            np.size(azimuth_rad),
+            self.bin_geometry.query_cone_azimuth_zenith,
+            azimuth_rad=azimuth_rad,
+            zenith_rad=zenith_rad,
+            half_angle_rad=half_angle_rad,
+        )
+        self._assign_cones(faces, weights=weights)
+
+    def _assign_cones(self, faces, weights=None):
+        if isinstance(faces, tuple):
+            # many cones in (indptr, faces)
+            indptr, faces = faces
+            if weights is not None:
+                num_cones = len(indptr) - 1
+                weights = np.broadcast_to(np.asarray(weights), (num_cones,))
+                weights = np.repeat(weights, np.diff(indptr))
+        self._assign(faces, weights=weights, are_directions=False)
+
+    def _assign(self, faces, weights=None, are_directions=True):
+        self.overflow += _instrumentation.call(
+            self.instrumentation,
+            "accumulate",
+            np.size(faces),
+            accumulate.add_to_bins,
+            bin_counts=self.bin_counts,
+            bins=faces,
+            weights=weights,
+            bin_squared_weights=self.bin_squared_weights,
+        )
+        if self.instrumentation is not None and are_directions:
+            self.instrumentation.count_directions(
+                num_directions=np.size(faces),
+                num_overflow=np.count_nonzero(np.asarray(faces) < 0),
             )
+
+    def enable_instrumentation(self):
+        """
+        Starts to time the stages of the assignment and to count the
+        directions and the overflow. When the engine of the bin_geometry
+        supports it, its stages are timed, too. Read the results with
+        ``instrumentation.to_dict()``.
+
+        The instrumentation belongs to this histogram only. It is passed to
+        the queries of the bin_geometry and not stored in the shared tree,
+        so other histograms of the same bin_geometry are not counted. The
+        workers of the assign_parallel_* methods are not counted either.
+
+        Returns
+        -------
+        instrumentation : spherical_histogram.instrumentation.Instrumentation
+        """
+        self.instrumentation = _instrumentation.Instrumentation()
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """
+        Stops timing and counting.
+        """
+        self.instrumentation = None
+
+    def draw(self, prng, size=None):
+        """
+        Draws directions distributed like the content of the bins. Within a
+        bin the directions are distributed uniformly on the unit-sphere.
+        The cumulative distribution of the bins is kept until the content of
+        bin_counts changes, also when bin_counts is written to directly.
+
+        Parameters
+        ----------
+        prng : numpy.random.Generator
+            Pseudo random number generator.
+        size : int or None
+            The number of directions. If None, a single direction is drawn.
+
+        Returns
+        -------
+        (cx, cy, cz) : floats or arrays of floats
+            The directions.
+        """
+        cdf = self._get_draw_cdf()
+        u = prng.uniform(size=1 if size is None else size) * cdf[-1]
+        faces = np.searchsorted(cdf, u, side="right")
+        points = self.bin_geometry.draw_points_in_faces(prng=prng, faces=faces)
+        if size is None:
+            return points[0, 0], points[0, 1], points[0, 2]
+        return points[:, 0], points[:, 1], points[:, 2]
+
+    def _get_draw_cdf(self):
+        if not np.array_equal(self._draw_cdf_bin_counts, self.bin_counts):
+            if np.any(self.bin_counts < 0):
+                raise ValueError("Can not draw from negative bin_counts.")
+            cdf = np.cumsum(self.bin_counts, dtype=float)
+            if cdf[-1] <= 0.0:
+                raise ValueError("Can not draw from empty bin_counts.")
+            self._draw_cdf = cdf
+            self._draw_cdf_bin_counts = self.bin_counts.copy()
+        return self._draw_cdf
+
+    def merge(self, other):
+        """
+        Adds the content of the other histogram to this one. Both must have
+        the same bins.
+
+        Parameters
+        ----------
+        other : HemisphereHistogram
+            With the same bin_geometry.
+        """
+        if not self.bin_geometry.has_same_bins(other.bin_geometry):
+            raise ValueError("Expected histograms to have the same bins.")
+        self._merge_dict(other.to_dict())
+
+    def _merge_dict(self, other):
+        accumulate.assert_can_add(
+            bin_counts_dtype=self.bin_counts.dtype,
+            dtype=other["bin_counts"].dtype,
         )
+        if self.bin_squared_weights is not None:
+            if "bin_squared_weights" not in other:
+                raise ValueError(
+                    "Expected other histogram to track the squared weights."
+                )
+            self.bin_squared_weights += other["bin_squared_weights"]
+        self.bin_counts += other["bin_counts"].astype(self.bin_counts.dtype)
+        self.overflow += other["overflow"]
 
-    def _assign(self, faces):
-        faces = np.asarray(faces, dtype=int)
-        if faces.ndim == 0:
-            faces = faces[np.newaxis]
+    def _empty_like(self):
+        out = copy.copy(self)
+        out.instrumentation = None
+        out.reset()
+        return out
 
-        valid = faces >= 0
-        self.overflow += np.sum(np.logical_not(valid))
-        valid_faces = faces[valid]
-        unique_faces, counts = np.unique(valid_faces, return_counts=True)
-        self.bin_counts[unique_faces] += counts
+    def __iadd__(self, other):
+        self.merge(other)
+        return self
+
+    def __add__(self, other):
+        out = self._empty_like()
+        out.merge(self)
+        out.merge(other)
+        return out
 
     def to_dict(self):
-        return {"overflow": self.overflow, "bin_counts": self.bin_counts}
+        out = {"overflow": self.overflow, "bin_counts": self.bin_counts}
+        if self.bin_squared_weights is not None:
+            out["bin_squared_weights"] = self.bin_squared_weights
+        return out
+
+    def save(self, path):
+        """
+        Writes the content of the histogram to path in a binary format.
+        The geometry is not written, only its fingerprint.
+        See spherical_histogram.serialization.
+        """
+        serialization.write(path=path, hist=self)
+
+    @classmethod
+    def load(cls, path, bin_geometry, mmap_mode="r"):
+        """
+        Reads a histogram written with save().
+
+        Parameters
+        ----------
+        path : str
+            Path of the file.
+        bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+            Must have the same bins as the histogram in the file, otherwise a
+            ValueError is raised.
+        mmap_mode : str or None
+            By default the bins are memory mapped read only. Use "c" to
+            assign further directions in memory only, or None to read the
+            bins into memory.
+        """
+        header, arrays = serialization.read_arrays(
+            path=path,
+            fingerprint=bin_geometry.fingerprint,
+            mmap_mode=mmap_mode,
+        )
+        hist = cls(
+            bin_geometry=bin_geometry,
+            dtype=arrays["bin_counts"].dtype,
+            track_squared_weights="bin_squared_weights" in arrays,
+        )
+        hist.overflow = header["overflow"]
+        hist.bin_counts = arrays["bin_counts"]
+        if hist.track_squared_weights:
+            hist.bin_squared_weights = arrays["bin_squared_weights"]
+        return hist
 
     def plot(self, path):
         """
@@ -146,7 +510,36 @@ class HemisphereHistogram:
             faces_values=faces_values,
         )
 
+    def plot_raster(self, path, num_pixel=1080, fill_color=raster.ROYAL_BLUE):
+        """
+        Writes a raster image of the bins to path, either '.png' or '.ppm'.
+        Much faster than plot() for fine geometries and for many images as
+        the face seen in each pixel is looked up only once for the
+        bin_geometry. See spherical_histogram.raster.
+
+        Parameters
+        ----------
+        path : str
+            Path of the image.
+        num_pixel : int
+            The number of rows and columns of the square image.
+        fill_color : (r, g, b)
+            Color of the bin with the largest content, in 0 to 255.
+        """
+        rgba = raster.render(
+            pixel_to_face=self.bin_geometry.pixel_to_face(num_pixel),
+            faces_values=raster.normalized(self.bin_counts),
+            fill_color=fill_color,
+        )
+        raster.write(path=path, rgba=rgba)
+
     def __repr__(self):
         return "{:s}()".format(
             self.__class__.__name__,
         )
+
+
+def _with_weights(columns, weights):
+    if weights is None:
+        return columns
+    return columns + (weights,)
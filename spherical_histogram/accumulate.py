@@ -0,0 +1,93 @@
+import numpy as np
+
+
+def add_to_bins(
+    bin_counts,
+    bins,
+    weights=None,
+    bin_squared_weights=None,
+):
+    """
+    Adds the bins (optionally weighted) to the bin_counts in place.
+    Bins < 0 are not added but returned as overflow.
+
+    Parameters
+    ----------
+    bin_counts : numpy.array, shape(N, )
+        The accumulator. Its dtype is kept.
+    bins : array of ints
+        The bins to be added. Bins < 0 are overflow.
+    weights : array of floats / ints or None
+        The weight of each entry in bins. If None, each entry has weight one.
+    bin_squared_weights : numpy.array, shape(N, ) or None
+        If not None, the squared weights are added to it in place.
+
+    Returns
+    -------
+    overflow : int / float
+        The number (sum of weights) of entries in bins which are < 0.
+    """
+    for out in [bin_counts, bin_squared_weights]:
+        if out is not None and not out.flags.writeable:
+            raise ValueError(
+                "Can not add to read only bins. Load with mmap_mode='c' or "
+                "None to assign."
+            )
+
+    bins = np.asarray(bins, dtype=int).reshape(-1)
+    valid = bins >= 0
+    valid_bins = bins[valid]
+
+    if weights is None:
+        overflow = int(len(bins) - len(valid_bins))
+        valid_weights = None
+    else:
+        weights = np.broadcast_to(np.asarray(weights), bins.shape)
+        assert_can_add(bin_counts_dtype=bin_counts.dtype, dtype=weights.dtype)
+        overflow = np.sum(weights[~valid])
+        valid_weights = weights[valid]
+
+    _add(out=bin_counts, bins=valid_bins, weights=valid_weights)
+
+    if bin_squared_weights is not None:
+        _add(
+            out=bin_squared_weights,
+            bins=valid_bins,
+            weights=None if valid_weights is None else valid_weights**2,
+        )
+    return overflow
+
+
+def assert_can_add(bin_counts_dtype, dtype):
+    """
+    Raises a TypeError when values of dtype can not be added to bin_counts of
+    bin_counts_dtype without loosing their fractions.
+    """
+    if np.issubdtype(bin_counts_dtype, np.integer) and not (
+        np.issubdtype(dtype, np.integer) or np.issubdtype(dtype, np.bool_)
+    ):
+        raise TypeError(
+            "Can not add values of dtype {:s} to bin_counts of "
+            "dtype {:s}.".format(str(dtype), str(bin_counts_dtype))
+        )
+
+
+def _add(out, bins, weights):
+    if len(bins) == 0:
+        return
+    # Only count in the range of bins which are hit. This keeps the
+    # bincount small when out is large, e.g. a flattened stack of
+    # histograms.
+    start = np.min(bins)
+    stop = np.max(bins) + 1
+
+    if len(bins) < (stop - start) // 8:
+        # For few entries np.add.at is cheaper than a full length bincount.
+        if weights is None:
+            np.add.at(out, bins, 1)
+        else:
+            np.add.at(out, bins, weights.astype(out.dtype))
+        return
+
+    counts = np.bincount(bins - start, weights=weights, minlength=stop - start)
+    out[start:stop] += counts.astype(out.dtype, copy=False)
@@ -0,0 +1,414 @@
+"""
+Benchmarks for the construction of geometries, the lookup of directions,
+cone queries, and the filling of histograms, also in parallel.
+
+Run from the command line and write the results as JSON:
+
+    python -m spherical_histogram.benchmark --out results.json
+
+Each result holds the name of the benchmark, its parameters, and the
+durations of the repetitions in seconds. Compare the results of two runs to
+catch regressions, or compare the engines within one run.
+"""
+from .version import __version__
+from . import geometry
+from . import voronoi
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+
+NUM_VERTICES = [10**2, 10**3, 10**4, 10**5, 10**6]
+BATCH_SIZES = [1, 10**2, 10**4, 10**6]
+NUM_CONES = [1, 10**2, 10**4]
+NUM_WORKERS = [1, 2, 4, 8]
+
+
+def timeit(func, repeat=5):
+    """
+    Returns the durations in seconds of repeat calls to func.
+    """
+    durations = []
+    for r in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def make_result(name, params, durations, num_items=None):
+    result = {
+        "name": name,
+        "params": params,
+        "seconds": durations,
+        "min_seconds": float(np.min(durations)),
+        "median_seconds": float(np.median(durations)),
+    }
+    if num_items is not None:
+        result["num_items"] = int(num_items)
+        result["items_per_second"] = num_items / result["min_seconds"]
+    return result
+
+
+def draw_cx_cy_cz(prng, size, max_zenith_distance_rad=np.deg2rad(89)):
+    cz = prng.uniform(low=np.cos(max_zenith_distance_rad), high=1.0, size=size)
+    az = prng.uniform(low=-np.pi, high=np.pi, size=size)
+    r = np.sqrt(1.0 - cz**2)
+    return r * np.cos(az), r * np.sin(az), cz
+
+
+def build_geometry(engine, num_vertices):
+    """
+    Returns a geometry with all its derived structures made. Otherwise the
+    lazy structures, e.g. the tree, would not be part of the duration.
+    """
+    geom = geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=num_vertices,
+        max_zenith_distance_rad=np.deg2rad(89),
+        engine=engine,
+    )
+    return geom.warm()
+
+
+def bench_geometry_build(engines, num_vertices, repeat):
+    out = []
+    for engine in engines:
+        for nv in num_vertices:
+            durations = timeit(
+                lambda: build_geometry(engine=engine, num_vertices=nv),
+                repeat=repeat,
+            )
+            out.append(
+                make_result(
+                    name="geometry_build",
+                    params={"engine": engine, "num_vertices": nv},
+                    durations=durations,
+                )
+            )
+    return out
+
+
+def bench_query(geometries, batch_sizes, repeat, prng):
+    out = []
+    for engine in geometries:
+        geom = geometries[engine]
+        for size in batch_sizes:
+            cx, cy, cz = draw_cx_cy_cz(prng=prng, size=size)
+            durations = timeit(
+                lambda: geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz),
+                repeat=repeat,
+            )
+            out.append(
+                make_result(
+                    name="query_cx_cy_cz",
+                    params={"engine": engine, "batch_size": size},
+                    durations=durations,
+                    num_items=size,
+                )
+            )
+    return out
+
+
+def bench_query_cone(geometries, num_cones, repeat, prng):
+    out = []
+    for engine in geometries:
+        geom = geometries[engine]
+        for size in num_cones:
+            cx, cy, cz = draw_cx_cy_cz(prng=prng, size=size)
+            durations = timeit(
+                lambda: geom.query_cone_cx_cy_cz(
+                    cx=cx, cy=cy, cz=cz, half_angle_rad=np.deg2rad(5)
+                ),
+                repeat=repeat,
+            )
+            out.append(
+                make_result(
+                    name="query_cone_cx_cy_cz",
+                    params={"engine": engine, "num_cones": size},
+                    durations=durations,
+                    num_items=size,
+                )
+            )
+    return out
+
+
+def bench_query_cone_weights(geometries, repeat):
+    out = []
+    for engine in geometries:
+        geom = geometries[engine]
+        for method in ["monte_carlo", "quadrature"]:
+            durations = timeit(
+                lambda: geom.query_cone_weiths_azimuth_zenith(
+                    azimuth_rad=0.3,
+                    zenith_rad=0.4,
+                    half_angle_rad=np.deg2rad(10),
+                    method=method,
+                ),
+                repeat=repeat,
+            )
+            out.append(
+                make_result(
+                    name="query_cone_weiths_azimuth_zenith",
+                    params={"engine": engine, "method": method},
+                    durations=durations,
+                )
+            )
+    return out
+
+
+def bench_assign(geometries, batch_sizes, repeat, prng):
+    from . import HemisphereHistogram
+
+    out = []
+    geom = next(iter(geometries.values()))
+    num_faces = len(geom.faces)
+    for size in batch_sizes:
+        faces = prng.integers(low=-1, high=num_faces, size=size)
+        weights = prng.uniform(size=size)
+        for dtype, w in [("int64", None), ("float64", weights)]:
+            hist = HemisphereHistogram(bin_geometry=geom, dtype=dtype)
+            durations = timeit(
+                lambda: hist._assign(faces=faces, weights=w), repeat=repeat
+            )
+            out.append(
+                make_result(
+                    name="assign",
+                    params={
+                        "batch_size": size,
+                        "dtype": dtype,
+                        "weighted": w is not None,
+                        "num_faces": num_faces,
+                    },
+                    durations=durations,
+                    num_items=size,
+                )
+            )
+    return out
+
+
+def bench_assign_parallel(geometries, batch_size, num_workers, repeat, prng):
+    """
+    Times assign_parallel_cx_cy_cz() with a pool of threads for each number
+    of workers. Compare the durations to see how well an engine scales on
+    this machine, see "num_cpus" in the report.
+    """
+    from . import HemisphereHistogram
+
+    out = []
+    cx, cy, cz = draw_cx_cy_cz(prng=prng, size=batch_size)
+    for engine in geometries:
+        hist = HemisphereHistogram(bin_geometry=geometries[engine])
+        for nw in num_workers:
+            durations = timeit(
+                lambda: hist.assign_parallel_cx_cy_cz(
+                    cx=cx, cy=cy, cz=cz, num_workers=nw
+                ),
+                repeat=repeat,
+            )
+            out.append(
+                make_result(
+                    name="assign_parallel_cx_cy_cz",
+                    params={
+                        "engine": engine,
+                        "batch_size": batch_size,
+                        "num_workers": nw,
+                    },
+                    durations=durations,
+                    num_items=batch_size,
+                )
+            )
+    return out
+
+
+def bench_plot(geometries, repeat):
+    from . import HemisphereHistogram
+
+    geom = next(iter(geometries.values()))
+    hist = HemisphereHistogram(bin_geometry=geom)
+    hist.bin_counts[:] = np.arange(len(hist.bin_counts))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hist.svg")
+        durations = timeit(lambda: hist.plot(path=path), repeat=repeat)
+        geom.pixel_to_face(num_pixel=1080)
+        raster_path = os.path.join(tmp, "hist.png")
+        raster_durations = timeit(
+            lambda: hist.plot_raster(path=raster_path, num_pixel=1080),
+            repeat=repeat,
+        )
+    return [
+        make_result(
+            name="plot",
+            params={"num_faces": len(geom.faces)},
+            durations=durations,
+        ),
+        make_result(
+            name="plot_raster",
+            params={"num_faces": len(geom.faces), "num_pixel": 1080},
+            durations=raster_durations,
+        ),
+    ]
+
+
+def bench_import(repeat):
+    """
+    Times ``import spherical_histogram`` in a fresh interpreter, including
+    the import of numpy. The startup of the interpreter itself is measured
+    separately and subtracted.
+    """
+    python = [sys.executable, "-c"]
+    baseline = timeit(
+        lambda: subprocess.run(python + ["pass"], check=True), repeat=repeat
+    )
+    durations = timeit(
+        lambda: subprocess.run(
+            python + ["import spherical_histogram"], check=True
+        ),
+        repeat=repeat,
+    )
+    durations = [max(0.0, d - min(baseline)) for d in durations]
+    return [make_result(name="import", params={}, durations=durations)]
+
+
+def run(
+    engines=geometry.ENGINES,
+    num_vertices=NUM_VERTICES,
+    batch_sizes=BATCH_SIZES,
+    num_cones=NUM_CONES,
+    num_workers=NUM_WORKERS,
+    num_vertices_lookup=2047,
+    repeat=5,
+    seed=1,
+):
+    """
+    Runs all benchmarks.
+
+    Parameters
+    ----------
+    engines : list of str
+        The engines to compare. See spherical_histogram.geometry.ENGINES.
+    num_vertices : list of int
+        The sizes of the geometries to be constructed.
+    batch_sizes : list of int
+        The number of directions in a batch to be looked up and assigned.
+    num_cones : list of int
+        The number of cones in a batch to be queried.
+    num_workers : list of int
+        The numbers of workers to assign the largest batch in parallel.
+    num_vertices_lookup : int
+        The size of the geometry used for the lookups and cones.
+    repeat : int
+        The number of repetitions of each benchmark.
+    seed : int
+        Seed for the directions.
+
+    Returns
+    -------
+    report : dict
+        The environment and the list of results.
+    """
+    prng = np.random.Generator(np.random.PCG64(seed))
+    geometries = {}
+    for engine in engines:
+        geometries[engine] = build_geometry(
+            engine=engine, num_vertices=num_vertices_lookup
+        )
+
+    results = []
+    results += bench_import(repeat=repeat)
+    results += bench_geometry_build(
+        engines=engines, num_vertices=num_vertices, repeat=repeat
+    )
+    results += bench_query(
+        geometries=geometries,
+        batch_sizes=batch_sizes,
+        repeat=repeat,
+        prng=prng,
+    )
+    results += bench_query(
+        geometries={
+            "voronoi": voronoi.VoronoiHemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+                num_vertices=num_vertices_lookup,
+                max_zenith_distance_rad=np.deg2rad(89),
+            )
+        },
+        batch_sizes=batch_sizes,
+        repeat=repeat,
+        prng=prng,
+    )
+    results += bench_query_cone(
+        geometries=geometries, num_cones=num_cones, repeat=repeat, prng=prng
+    )
+    results += bench_query_cone_weights(geometries=geometries, repeat=repeat)
+    results += bench_assign(
+        geometries=geometries,
+        batch_sizes=batch_sizes,
+        repeat=repeat,
+        prng=prng,
+    )
+    results += bench_assign_parallel(
+        geometries=geometries,
+        batch_size=max(batch_sizes),
+        num_workers=num_workers,
+        repeat=repeat,
+        prng=prng,
+    )
+    results += bench_plot(geometries=geometries, repeat=repeat)
+
+    return {
+        "spherical_histogram_version": __version__,
+        "numpy_version": np.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "num_cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m spherical_histogram.benchmark",
+        description="Benchmarks spherical_histogram and writes JSON.",
+    )
+    parser.add_argument(
+        "--out", default=None, help="Path of the JSON file. Default stdout."
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=geometry.ENGINES,
+        choices=geometry.ENGINES,
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Only small geometries and batches for a fast check.",
+    )
+    args = parser.parse_args(argv)
+
+    kwargs = {"engines": args.engines, "repeat": args.repeat}
+    if args.quick:
+        kwargs["num_vertices"] = [10**2, 10**3]
+        kwargs["batch_sizes"] = [1, 10**2, 10**4]
+        kwargs["num_cones"] = [1, 10**2]
+        kwargs["num_workers"] = [1, 2]
+
+    report = run(**kwargs)
+    text = json.dumps(report, indent=4)
+    if args.out is None:
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.out, "wt") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+A cache on the file system for HemisphereGeometry.
+
+Each geometry is written into its own directory which is named after the hash
+of its parameters. All arrays are written as '.npy' files and are read back
+as read-only memory maps, so processes reading the same geometry share the
+pages of memory.
+"""
+from .version import __version__
+from . import geometry
+from . import tree
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+FORMAT_VERSION = 2
+
+
+def make_key(num_vertices, max_zenith_distance_rad):
+    """
+    Returns the name of the directory in the cache for a geometry with these
+    parameters.
+
+    Parameters
+    ----------
+    num_vertices : int
+        A guidence for the number of verties in the mesh.
+    max_zenith_distance_rad : float
+        Vertices will only be put up to this zenith-distance.
+
+    Returns
+    -------
+    key : str
+        A hexadecimal hash.
+    """
+    params = {
+        "format_version": FORMAT_VERSION,
+        "spherical_histogram_version": __version__,
+        "num_vertices": int(num_vertices),
+        "max_zenith_distance_rad": float(max_zenith_distance_rad).hex(),
+    }
+    payload = json.dumps(params, sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _merlict_dump_filename():
+    import merlict
+
+    return "tree.merlict-{:s}.dump".format(merlict.__version__)
+
+
+def write(path, bin_geometry):
+    """
+    Writes the bin_geometry and its derived structures into the directory
+    path. The directory is written next to path first and then moved in
+    place, so other processes never read an incomplete directory.
+
+    Parameters
+    ----------
+    path : str
+        Path of the directory to be written.
+    bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+        The geometry.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(
+        prefix=os.path.basename(path) + ".", dir=os.path.dirname(path) or "."
+    )
+    try:
+        arrays = _to_arrays(bin_geometry=bin_geometry)
+        for key in arrays:
+            np.save(os.path.join(tmp_path, key + ".npy"), arrays[key])
+
+        # Only merlict's tree is dumped. The lazy trees of the other engines
+        # are not built here.
+        if bin_geometry.engine == "merlict" and isinstance(
+            bin_geometry.tree, tree.Tree
+        ):
+            bin_geometry.tree.dump(
+                os.path.join(tmp_path, _merlict_dump_filename())
+            )
+
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # An other process was faster.
+            shutil.rmtree(tmp_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read(path, engine="merlict", mmap_mode="r"):
+    """
+    Reads a HemisphereGeometry from the directory path written by write().
+
+    Parameters
+    ----------
+    path : str
+        Path of the directory.
+    engine : str
+        See HemisphereGeometry.__init__(). When the engine is "merlict" and
+        the directory contains a dump of the tree, the tree is not compiled
+        again.
+    mmap_mode : str or None
+        Passed on to numpy.load().
+
+    Returns
+    -------
+    bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+    """
+    arrays = {}
+    for key in ARRAY_KEYS:
+        arrays[key] = np.load(
+            os.path.join(path, key + ".npy"), mmap_mode=mmap_mode
+        )
+
+    _tree = None
+    dump_path = os.path.join(path, _merlict_dump_filename())
+    if engine == "merlict" and os.path.exists(dump_path):
+        _tree = tree.Tree.from_dump(dump_path)
+
+    return geometry.HemisphereGeometry(
+        vertices=arrays["vertices"],
+        faces=arrays["faces"],
+        engine=engine,
+        vertices_to_faces=(
+            arrays["vertices_to_faces_indptr"],
+            arrays["vertices_to_faces_indices"],
+        ),
+        faces_solid_angles=arrays["faces_solid_angles"],
+        faces_neighbors=arrays["faces_neighbors"],
+        tree=_tree,
+    )
+
+
+def read_or_make(
+    cache_dir, num_vertices, max_zenith_distance_rad, engine="merlict"
+):
+    """
+    Returns the HemisphereGeometry with Fibonacci spaced vertices from the
+    cache_dir. When it is not in the cache_dir yet, it is made and written to
+    the cache_dir.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Path of the cache's directory.
+    num_vertices : int
+        A guidence for the number of verties in the mesh.
+    max_zenith_distance_rad : float
+        Vertices will only be put up to this zenith-distance.
+    engine : str
+        See HemisphereGeometry.__init__().
+
+    Returns
+    -------
+    bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+    """
+    path = os.path.join(
+        cache_dir,
+        make_key(
+            num_vertices=num_vertices,
+            max_zenith_distance_rad=max_zenith_distance_rad,
+        ),
+    )
+
+    if os.path.exists(path):
+        return read(path=path, engine=engine)
+
+    bin_geometry = geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=num_vertices,
+        max_zenith_distance_rad=max_zenith_distance_rad,
+        engine=engine,
+    )
+    write(path=path, bin_geometry=bin_geometry)
+    return bin_geometry
+
+
+ARRAY_KEYS = [
+    "vertices",
+    "faces",
+    "faces_solid_angles",
+    "vertices_to_faces_indptr",
+    "vertices_to_faces_indices",
+    "faces_neighbors",
+]
+
+
+def _to_arrays(bin_geometry):
+    out = {}
+    out["vertices"] = np.asarray(bin_geometry.vertices, dtype=float)
+    out["faces"] = np.asarray(bin_geometry.faces, dtype=int)
+    out["faces_solid_angles"] = np.asarray(
+        bin_geometry.faces_solid_angles, dtype=float
+    )
+
+    indptr, indices = bin_geometry.vertices_to_faces
+    out["vertices_to_faces_indptr"] = np.asarray(indptr)
+    out["vertices_to_faces_indices"] = np.asarray(indices)
+
+    out["faces_neighbors"] = np.asarray(bin_geometry.faces_neighbors)
+    return out
@@ -1,11 +1,18 @@
 from . import tree
+from . import vertex_tree
+from . import grid_tree
 from . import mesh
+from . import cache
+from . import raster
+from . import stream
 
+import hashlib
+import itertools
 import numpy as np
 import spherical_coordinates
-import solid_angle_utils
-import scipy
-from scipy import spatial
+
+
+ENGINES = ["merlict", "vertex", "grid"]
 
 
 class HemisphereGeometry:
@@ -17,6 +24,12 @@ class HemisphereGeometry:
         self,
         vertices,
         faces,
+        engine="merlict",
+        vertices_to_faces=None,
+        faces_solid_angles=None,
+        faces_neighbors=None,
+        tree=None,
+        vertices_to_faces_map=None,
     ):
         """
         Parameters
@@ -26,45 +39,314 @@ class HemisphereGeometry:
         faces : [[a1,b1,c1], [a2, b2, c2], ... ]
             List of indices to reference the three (exactly three) vertices
             which form a face on the unit sphere.
+        engine : str, default="merlict"
+            The engine to find the face hit by a direction. Either "merlict"
+            to use merlict's ray tracing, "vertex" to use the nearest
+            vertices, or "grid" to use a uniform grid of cells in the x-y
+            plane. Both "vertex" and "grid" use numpy only. See ENGINES.
+        vertices_to_faces, faces_solid_angles, faces_neighbors, tree :
+            Optional. When already known, e.g. from a cache, these are not
+            estimated again. The tree must find the faces of this geometry,
+            but it does not need to be made by the engine, e.g. the
+            DescentTree of a hierarchy. Otherwise they are estimated on
+            first access. vertices_to_faces may also be
+            a dict of lists, see mesh.estimate_vertices_to_faces_map().
+        vertices_to_faces_map : dict of lists or None
+            The former form of vertices_to_faces. Still accepted and
+            converted.
         """
-        self.vertices = vertices
-        self.faces = faces
-
-        self.vertices_tree = scipy.spatial.cKDTree(data=self.vertices)
-        self.vertices_to_faces_map = mesh.estimate_vertices_to_faces_map(
-            faces=self.faces, num_vertices=len(self.vertices)
-        )
-        self.faces_solid_angles = mesh.estimate_solid_angles(
-            vertices=self.vertices,
-            faces=self.faces,
+        self.vertices = np.asarray(vertices, dtype=float)
+        self.faces = np.asarray(faces, dtype=int)
+        self.engine = engine
+        # The size of the batches when assigning streams of directions.
+        self.chunk_size = stream.CHUNK_SIZE
+
+        # The derived structures are made on first access, see warm().
+        self._vertices_tree = None
+        if vertices_to_faces is None:
+            vertices_to_faces = vertices_to_faces_map
+        self._vertices_to_faces = (
+            None
+            if vertices_to_faces is None
+            else mesh.as_vertices_to_faces(
+                vertices_to_faces=vertices_to_faces,
+                num_vertices=len(self.vertices),
+            )
         )
-        self.tree = tree.Tree(vertices=self.vertices, faces=self.faces)
-        self.faces_neighbors = mesh.find_faces_neighbors(
-            faces=self.faces,
-            vertices_to_faces_map=self.vertices_to_faces_map,
+        self._faces_solid_angles = faces_solid_angles
+        self._tree = tree
+        self._faces_neighbors = faces_neighbors
+        self._faces_bounding_caps = None
+        self._faces_bounding_caps_max_radius_rad = None
+        self._faces_unit_edge_normals = None
+        self._fingerprint = None
+        self._faces_sampling_table = None
+        self._pixel_to_face = {}
+
+    def warm(self):
+        """
+        Makes all derived structures now instead of on first access.
+        E.g. before forking workers which shall share them.
+
+        Returns
+        -------
+        self : HemisphereGeometry
+        """
+        self.vertices_tree
+        self.vertices_to_faces
+        self.faces_solid_angles
+        self.tree
+        self.faces_neighbors
+        self.faces_bounding_caps
+        self.fingerprint
+        self.faces_sampling_table
+        return self
+
+    @property
+    def vertices_tree(self):
+        """
+        A scipy.spatial.cKDTree of the vertices.
+        """
+        if self._vertices_tree is None:
+            import scipy.spatial
+
+            self._vertices_tree = scipy.spatial.cKDTree(data=self.vertices)
+        return self._vertices_tree
+
+    @property
+    def vertices_to_faces(self):
+        """
+        The faces connected to each vertex as (indptr, indices).
+        See spherical_histogram.mesh.estimate_vertices_to_faces().
+        """
+        if self._vertices_to_faces is None:
+            self._vertices_to_faces = mesh.estimate_vertices_to_faces(
+                faces=self.faces, num_vertices=len(self.vertices)
+            )
+        return self._vertices_to_faces
+
+    @property
+    def faces_solid_angles(self):
+        """
+        The solid angle of each face.
+        """
+        if self._faces_solid_angles is None:
+            self._faces_solid_angles = mesh.estimate_solid_angles(
+                vertices=self.vertices,
+                faces=self.faces,
+            )
+        return self._faces_solid_angles
+
+    @property
+    def tree(self):
+        """
+        The engine to find the face hit by a direction.
+        """
+        if self._tree is None:
+            self._tree = self._make_tree(engine=self.engine)
+        return self._tree
+
+    @property
+    def faces_neighbors(self):
+        """
+        The neighbors of each face, shape(N, 3), -1 when there is none.
+        See spherical_histogram.mesh.estimate_faces_neighbors().
+        """
+        if self._faces_neighbors is None:
+            self._faces_neighbors = mesh.estimate_faces_neighbors(
+                faces=self.faces
+            )
+        return self._faces_neighbors
+
+    @property
+    def _faces_bounding_caps_max_radius(self):
+        if self._faces_bounding_caps_max_radius_rad is None:
+            _, radii_rad = self.faces_bounding_caps
+            self._faces_bounding_caps_max_radius_rad = np.max(radii_rad)
+        return self._faces_bounding_caps_max_radius_rad
+
+    @property
+    def faces_bounding_caps(self):
+        """
+        The centers and radii of caps containing the faces.
+        See spherical_histogram.mesh.estimate_faces_bounding_caps().
+        """
+        if self._faces_bounding_caps is None:
+            self._faces_bounding_caps = mesh.estimate_faces_bounding_caps(
+                vertices=self.vertices, faces=self.faces
+            )
+        return self._faces_bounding_caps
+
+    @property
+    def faces_centroids(self):
+        """
+        The mean of each face's vertices projected onto the unit-sphere.
+        """
+        return self.faces_bounding_caps[0]
+
+    @property
+    def faces_sampling_table(self):
+        """
+        The properties of the faces needed to draw points in them.
+        Made on first access.
+        See spherical_histogram.mesh.make_spherical_triangles_sampling_table().
+        """
+        if self._faces_sampling_table is None:
+            self._faces_sampling_table = (
+                mesh.make_spherical_triangles_sampling_table(
+                    vertices=self.vertices, faces=self.faces
+                )
+            )
+        return self._faces_sampling_table
+
+    @property
+    def fingerprint(self):
+        """
+        A hexadecimal hash of the vertices and faces. Two geometries with the
+        same fingerprint have the same bins.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = make_fingerprint(
+                vertices=self.vertices, faces=self.faces
+            )
+        return self._fingerprint
+
+    def pixel_to_face(self, num_pixel=1080):
+        """
+        The face seen in each pixel of a square image with num_pixel rows
+        and columns. Made on first access for each num_pixel.
+        See spherical_histogram.raster.make_pixel_to_face().
+        """
+        num_pixel = int(num_pixel)
+        if num_pixel not in self._pixel_to_face:
+            self._pixel_to_face[num_pixel] = raster.make_pixel_to_face(
+                bin_geometry=self, num_pixel=num_pixel
+            )
+        return self._pixel_to_face[num_pixel]
+
+    def has_same_bins(self, other):
+        """
+        Returns True when other has the same vertices and faces.
+        """
+        if other is self:
+            return True
+        return self.fingerprint == other.fingerprint
+
+    @property
+    def vertices_to_faces_map(self):
+        """
+        The faces connected to each vertex as a dict of lists.
+        This is made on each access from the compact vertices_to_faces.
+        """
+        indptr, indices = self.vertices_to_faces
+        return mesh.vertices_to_faces_to_map(indptr=indptr, indices=indices)
+
+    @property
+    def faces_neighbors_map(self):
+        """
+        The neighbors of each face as a dict of lists.
+        This is made on each access from the compact faces_neighbors.
+        """
+        return mesh.faces_neighbors_to_map(
+            faces_neighbors=self.faces_neighbors
         )
 
+    def _make_tree(self, engine):
+        if engine == "merlict":
+            return tree.Tree(vertices=self.vertices, faces=self.faces)
+        elif engine == "vertex":
+            return vertex_tree.VertexTree(
+                vertices=self.vertices,
+                faces=self.faces,
+                vertices_tree=self.vertices_tree,
+                vertices_to_faces=self.vertices_to_faces,
+                faces_neighbors=self.faces_neighbors,
+            )
+        elif engine == "grid":
+            return grid_tree.GridTree(vertices=self.vertices, faces=self.faces)
+        else:
+            raise ValueError(
+                "Expected engine to be one of {:s}.".format(str(ENGINES))
+            )
+
     @classmethod
     def from_num_vertices_and_max_zenith_distance_rad(
-        cls, num_vertices, max_zenith_distance_rad
+        cls,
+        num_vertices,
+        max_zenith_distance_rad,
+        engine="merlict",
+        cache_dir=None,
     ):
+        """
+        Makes a geometry with Fibonacci spaced vertices.
+
+        Parameters
+        ----------
+        num_vertices : int
+            A guidence for the number of verties in the mesh.
+        max_zenith_distance_rad : float
+            Vertices will only be put up to this zenith-distance.
+        engine : str, default="merlict"
+            See HemisphereGeometry.__init__().
+        cache_dir : str or None
+            If not None, the geometry is read from this directory when it was
+            made before, or it is made and then written to this directory.
+            See spherical_histogram.cache.
+        """
+        if cache_dir is not None:
+            return cache.read_or_make(
+                cache_dir=cache_dir,
+                num_vertices=num_vertices,
+                max_zenith_distance_rad=max_zenith_distance_rad,
+                engine=engine,
+            )
+
         vertices = mesh.make_vertices(
             num_vertices=num_vertices,
             max_zenith_distance_rad=max_zenith_distance_rad,
         )
         faces = mesh.make_faces(vertices=vertices)
-        return cls(vertices=vertices, faces=faces)
+        return cls(vertices=vertices, faces=faces, engine=engine)
 
-    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
+    def clip_at_zenith(self, max_zenith_distance_rad):
+        """
+        Returns a new geometry which ends at max_zenith_distance_rad. The
+        faces crossing it are cut. See
+        spherical_histogram.mesh.clip_faces_at_zenith().
+        """
+        vertices, faces = mesh.clip_faces_at_zenith(
+            vertices=self.vertices,
+            faces=self.faces,
+            max_zenith_distance_rad=max_zenith_distance_rad,
+        )
+        return HemisphereGeometry(
+            vertices=vertices, faces=faces, engine=self.engine
+        )
+
+    def query_azimuth_zenith(
+        self, azimuth_rad, zenith_rad, instrumentation=None
+    ):
         return self.tree.query_azimuth_zenith(
-            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+            azimuth_rad=azimuth_rad,
+            zenith_rad=zenith_rad,
+            **self._tree_kwargs(instrumentation),
+        )
+
+    def query_cx_cy(self, cx, cy, instrumentation=None):
+        return self.tree.query_cx_cy(
+            cx=cx, cy=cy, **self._tree_kwargs(instrumentation)
         )
 
-    def query_cx_cy(self, cx, cy):
-        return self.tree.query_cx_cy(cx=cx, cy=cy)
+    def query_cx_cy_cz(self, cx, cy, cz, instrumentation=None):
+        return self.tree.query_cx_cy_cz(
+            cx, cy, cz, **self._tree_kwargs(instrumentation)
+        )
 
-    def query_cx_cy_cz(self, cx, cy, cz):
-        return self.tree.query_cx_cy_cz(cx, cy, cz)
+    def _tree_kwargs(self, instrumentation):
+        # Only the merlict tree times the stages of its queries.
+        if instrumentation is not None and isinstance(self.tree, tree.Tree):
+            return {"instrumentation": instrumentation}
+        return {}
 
     def query_cone_cx_cy(self, cx, cy, half_angle_rad):
         cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
@@ -83,37 +365,88 @@ class HemisphereGeometry:
         )
 
     def query_cone_cx_cy_cz(self, cx, cy, cz, half_angle_rad):
-        cxcycz = np.asarray([cx, cy, cz])
-        assert cxcycz.ndim == 1
-        assert half_angle_rad >= 0
-        assert 0.99 <= np.linalg.norm(cxcycz) <= 1.01
+        """
+        Finds the faces touching the cones with the given pointings and
+        half angles.
+
+        Parameters
+        ----------
+        cx, cy, cz : float or array of floats
+            The pointings of the cones.
+        half_angle_rad : float or array of floats
+            The half angles of the cones.
+
+        Returns
+        -------
+        faces : array of ints, or (indptr, faces)
+            For a scalar pointing, the faces touching the cone.
+            For array like pointings, the faces touching cone i are
+            faces[indptr[i]:indptr[i + 1]]. Each face is listed only once
+            for each cone.
+        """
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        cxcycz = np.c_[cx, cy, cz]
+        num_cones = len(cxcycz)
+        half_angle_rad = np.broadcast_to(half_angle_rad, (num_cones,))
+        assert np.all(half_angle_rad >= 0)
+        norms = np.linalg.norm(cxcycz, axis=1)
+        assert np.all(np.logical_and(0.99 <= norms, norms <= 1.01))
 
         # find the angle to the 3rd nearest neighbor vertex
         # -------------------------------------------------
-        third_neighbor_angle_rad = np.max(
-            self.vertices_tree.query(x=cxcycz, k=3)[0]
-        )
+        third_neighbor_angle_rad = self.vertices_tree.query(
+            x=cxcycz, k=[min(3, len(self.vertices))], workers=-1
+        )[0][:, 0]
 
         # make sure the query angle is at least as big as the angle
         # to the 3rd nearest neighbor vertex
         # ---------------------------------------------------------
-        query_angle_rad = np.max([half_angle_rad, third_neighbor_angle_rad])
+        query_angle_rad = np.maximum(half_angle_rad, third_neighbor_angle_rad)
 
         # query vertices
         # --------------
-        vidx_in_cone = self.vertices_tree.query_ball_point(
+        vidx_in_cones = self.vertices_tree.query_ball_point(
             x=cxcycz,
             r=query_angle_rad,
+            workers=-1,
+            return_sorted=False,
         )
+        num_vidx = np.fromiter(
+            (len(v) for v in vidx_in_cones), dtype=int, count=num_cones
+        )
+        vidx = np.fromiter(
+            itertools.chain.from_iterable(vidx_in_cones),
+            dtype=int,
+            count=np.sum(num_vidx),
+        )
+        cones_of_vidx = np.repeat(np.arange(num_cones), num_vidx)
 
         # identify the faces related to the vertices
         # ------------------------------------------
-        faces = set()  # count each face only once
-        for vidx in vidx_in_cone:
-            faces_touching_vidx = self.vertices_to_faces_map[vidx]
-            for face in faces_touching_vidx:
-                faces.add(face)
-        return np.array(list(faces))
+        indptr, indices = self.vertices_to_faces
+        faces, owners = mesh.gather_csr(
+            indptr=indptr, indices=indices, rows=vidx
+        )
+
+        # count each face only once in each cone
+        # --------------------------------------
+        num_faces = len(self.faces)
+        keys = np.unique(cones_of_vidx[owners] * num_faces + faces)
+        cones = keys // num_faces
+        faces = keys % num_faces
+
+        if is_scalar:
+            return faces
+
+        faces_indptr = np.zeros(num_cones + 1, dtype=int)
+        faces_indptr[1:] = np.cumsum(np.bincount(cones, minlength=num_cones))
+        return faces_indptr, faces
 
     def query_cone_weiths_azimuth_zenith(
         self,
@@ -122,7 +455,86 @@ class HemisphereGeometry:
         half_angle_rad,
         num_probing_rays_per_sr=4e5,
         path=None,
+        method="monte_carlo",
+        num_subdivisions=16,
     ):
+        """
+        Estimates the fraction of the cone's solid angle which overlaps with
+        each face.
+
+        Parameters
+        ----------
+        azimuth_rad : float
+            Pointing of the cone.
+        zenith_rad : float
+            Pointing of the cone.
+        half_angle_rad : float
+            Half angle of the cone.
+        num_probing_rays_per_sr : float
+            Only for method "monte_carlo".
+        path : str or None
+            If not None, a plot of the weights is written to path.
+        method : str, default="monte_carlo"
+            Either "monte_carlo" to probe the cone with random rays, or
+            "quadrature" to integrate over a fixed grid of cells in the cone.
+            The "quadrature" is deterministic. Faces fully inside of the
+            cone count with their exact solid angle, only the cone's edge is
+            resolved by the cells. A cone inside of a single face needs no
+            cells at all. The cells are not smaller than the faces need, so
+            a small cone has only a few cells.
+        num_subdivisions : int
+            Only for method "quadrature". The cone's edge is resolved by
+            rings of cells about 2 / num_subdivisions as wide as the
+            smallest face on the edge. At most num_subdivisions rings.
+            See spherical_histogram.mesh.make_cone_quadrature().
+
+        Returns
+        -------
+        (faces, weights) : (array of ints, array of floats)
+            The faces overlapping with the cone and the fraction of the cone's
+            solid angle overlapping with them.
+        """
+        if method == "monte_carlo":
+            out = self._query_cone_weights_monte_carlo(
+                azimuth_rad=azimuth_rad,
+                zenith_rad=zenith_rad,
+                half_angle_rad=half_angle_rad,
+                num_probing_rays_per_sr=num_probing_rays_per_sr,
+            )
+        elif method == "quadrature":
+            out = self._query_cone_weights_quadrature(
+                azimuth_rad=azimuth_rad,
+                zenith_rad=zenith_rad,
+                half_angle_rad=half_angle_rad,
+                num_subdivisions=num_subdivisions,
+            )
+        else:
+            raise ValueError(
+                "Expected method to be either 'monte_carlo' or 'quadrature'."
+            )
+
+        if path is not None:
+            w = np.zeros(len(self.faces))
+            w[out[0]] = out[1]
+            w = w / np.max(w)
+            mesh.plot(
+                vertices=self.vertices,
+                faces=self.faces,
+                faces_values=w,
+                path=path,
+            )
+
+        return out
+
+    def _query_cone_weights_monte_carlo(
+        self,
+        azimuth_rad,
+        zenith_rad,
+        half_angle_rad,
+        num_probing_rays_per_sr,
+    ):
+        import solid_angle_utils
+
         cone_solid_angle_sr = solid_angle_utils.cone.solid_angle(
             half_angle_rad=half_angle_rad
         )
@@ -147,19 +559,137 @@ class HemisphereGeometry:
             unique_faces, counts = np.unique(_faces, return_counts=True)
             weights = counts / np.sum(counts)
             out = unique_faces, weights
+        return out
 
-        if path is not None:
-            w = np.zeros(len(self.faces))
-            w[out[0]] = out[1]
-            w = w / np.max(w)
-            mesh.plot(
-                vertices=self.vertices,
-                faces=self.faces,
-                faces_values=w,
-                path=path,
+    def _query_cone_weights_quadrature(
+        self,
+        azimuth_rad,
+        zenith_rad,
+        half_angle_rad,
+        num_subdivisions,
+    ):
+        axis = np.array(
+            spherical_coordinates.az_zd_to_cx_cy_cz(
+                azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
             )
+        )
+        cos_half_angle = np.cos(half_angle_rad)
+
+        # bounding caps of the faces
+        # --------------------------
+        caps_centers, caps_radii = self.faces_bounding_caps
+        max_radius_rad = self._faces_bounding_caps_max_radius
+        reach_rad = min(half_angle_rad + max_radius_rad, np.pi)
+        candidates = np.flatnonzero(caps_centers @ axis >= np.cos(reach_rad))
+        caps_radii = caps_radii[candidates]
+        caps_angle_rad = np.arccos(
+            np.clip(caps_centers[candidates] @ axis, -1.0, 1.0)
+        )
+        touching = caps_angle_rad <= half_angle_rad + caps_radii
+        inside = caps_angle_rad + caps_radii <= half_angle_rad
+
+        faces_inside = candidates[inside]
+        overlap_inside = self.faces_solid_angles[faces_inside]
+        onedge = np.logical_and(touching, ~inside)
+        faces_onedge = candidates[onedge]
+
+        # a small cone inside of a single face
+        # ------------------------------------
+        if len(faces_inside) == 0:
+            face = self._find_face_containing_cone(
+                faces=faces_onedge,
+                axis=axis,
+                half_angle_rad=half_angle_rad,
+            )
+            if face >= 0:
+                return np.array([face]), np.array([1.0])
+
+        # integrate over the faces on the cone's edge
+        # -------------------------------------------
+        # Only the annulus of the cone which can overlap with the faces on
+        # the edge is divided into cells. The cells' faces are looked up
+        # with the tree. Cells in faces already counted as inside, or
+        # below the horizon, are dropped.
+        overlap_onedge = np.zeros(len(faces_onedge), dtype=float)
+        if len(faces_onedge) > 0:
+            min_angle_rad = np.maximum(
+                np.min(caps_angle_rad[onedge] - caps_radii[onedge]), 0.0
+            )
+            min_angle_rad = min(min_angle_rad, half_angle_rad)
+
+            # The rings are about 2 * radius / num_subdivisions wide for the
+            # smallest face on the edge. An annulus narrower than the faces,
+            # e.g. of a small cone, needs less rings for this.
+            annulus_rad = half_angle_rad - min_angle_rad
+            smallest_radius_rad = np.min(caps_radii[onedge])
+            num_rings = int(
+                np.ceil(
+                    num_subdivisions * annulus_rad / (2 * smallest_radius_rad)
+                )
+            )
+            num_rings = min(max(num_rings, 2), num_subdivisions)
 
-        return out
+            directions, solid_angles = mesh.make_cone_quadrature(
+                cone_axis=axis,
+                cone_half_angle_rad=half_angle_rad,
+                num_rings=num_rings,
+                min_angle_rad=min_angle_rad,
+            )
+            above = directions[:, 2] >= 0.0
+            directions = directions[above]
+            solid_angles = solid_angles[above]
+            cells_faces = np.asarray(
+                self.query_cx_cy_cz(
+                    directions[:, 0], directions[:, 1], directions[:, 2]
+                )
+            )
+            # faces_onedge is sorted, so searchsorted finds the cells' faces
+            slots = np.searchsorted(faces_onedge, cells_faces)
+            slots = np.minimum(slots, len(faces_onedge) - 1)
+            valid = faces_onedge[slots] == cells_faces
+            overlap_onedge = np.bincount(
+                slots[valid],
+                weights=solid_angles[valid],
+                minlength=len(faces_onedge),
+            )
+
+        faces = np.r_[faces_inside, faces_onedge]
+        overlap = np.r_[overlap_inside, overlap_onedge]
+        order = np.argsort(faces)
+        faces = faces[order]
+        overlap = overlap[order]
+
+        nonzero = overlap > 0.0
+        cone_solid_angle_sr = 2.0 * np.pi * (1.0 - cos_half_angle)
+        return faces[nonzero], overlap[nonzero] / cone_solid_angle_sr
+
+    def _find_face_containing_cone(self, faces, axis, half_angle_rad):
+        """
+        Returns the one of the faces which contains the whole cone, or -1.
+        The cone is inside when its axis is at least half_angle_rad away
+        from the great circles of all three edges, on their inner side.
+        """
+        if len(faces) == 0 or half_angle_rad >= 0.5 * np.pi:
+            return -1
+        if self._faces_unit_edge_normals is None:
+            normals = mesh.estimate_faces_edge_normals(
+                vertices=self.vertices, faces=self.faces
+            )
+            normals /= np.linalg.norm(normals, axis=2)[:, :, np.newaxis]
+            self._faces_unit_edge_normals = normals
+        sin_distances = self._faces_unit_edge_normals[faces] @ axis
+        contains = np.all(sin_distances >= np.sin(half_angle_rad), axis=1)
+        candidates = np.flatnonzero(contains)
+        return faces[candidates[0]] if len(candidates) > 0 else -1
+
+    def draw_points_in_faces(self, prng, faces):
+        """
+        Draws one point uniformly distributed in each of the faces.
+        See spherical_histogram.mesh.draw_points_with_sampling_table().
+        """
+        return mesh.draw_points_with_sampling_table(
+            prng=prng, table=self.faces_sampling_table, faces=faces
+        )
 
     def plot(self, **kwargs):
         """
@@ -171,6 +701,18 @@ class HemisphereGeometry:
         return "{:s}()".format(self.__class__.__name__)
 
 
+def make_fingerprint(vertices, faces):
+    """
+    Returns a hexadecimal hash of the vertices and faces.
+    """
+    h = hashlib.sha256()
+    for a, dtype in [(vertices, "<f8"), (faces, "<i8")]:
+        a = np.ascontiguousarray(a, dtype=dtype)
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
 def draw_in_cone(prng, azimuth_rad, zenith_rad, half_angle_rad, size):
     min_half_angle_rad = 0.0
 
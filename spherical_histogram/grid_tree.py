@@ -0,0 +1,231 @@
+from . import mesh
+
+import spherical_coordinates
+import numpy as np
+
+
+class GridTree:
+    """
+    An acceleration structure to allow fast queries for directions hitting a
+    mesh defined by vertices and faces. A uniform grid of square cells covers
+    the x-y plane from -1 to +1. Each cell lists the faces which might
+    overlap with it. A query looks up the cell of a direction's (cx, cy) and
+    only tests the few faces listed in this cell. The cost of a query does
+    not depend on the number of faces in the mesh.
+    """
+
+    def __init__(self, vertices, faces, num_cells_per_axis=None):
+        """
+        Parameters
+        ----------
+        vertices : numpy.array, shape(M, 3), float
+            The xyz-coordinates of the M vertices. The vertices are expected
+            to be on the unit-sphere.
+        faces : numpy.array, shape(N, 3), int
+            A list of N faces referencing their vertices.
+        num_cells_per_axis : int or None
+            The number of cells along x and along y. If None, it is chosen
+            so that there are about four cells for each face.
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        faces = np.asarray(faces, dtype=int)
+
+        if num_cells_per_axis is None:
+            num_cells_per_axis = int(np.ceil(np.sqrt(4.0 * len(faces))))
+        assert num_cells_per_axis > 0
+        self.num_cells_per_axis = int(num_cells_per_axis)
+
+        self.faces_edge_normals = mesh.estimate_faces_edge_normals(
+            vertices=vertices, faces=faces
+        )
+        self.cells_faces_indptr, self.cells_faces = make_cells_faces(
+            vertices=vertices,
+            faces=faces,
+            num_cells_per_axis=self.num_cells_per_axis,
+        )
+        self.max_num_faces_in_cell = np.max(np.diff(self.cells_faces_indptr))
+
+        # When all vertices are above the x-y plane, no face reaches below
+        # the lowest vertex.
+        self.min_cz = np.min(vertices[:, 2])
+        if self.min_cz < 0.0:
+            self.min_cz = -np.inf
+
+    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
+        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy(self, cx, cy):
+        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy_cz(self, cx, cy, cz):
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        size = len(cx)
+        face_ids = -1 * np.ones(size, dtype=int)
+
+        idx = np.flatnonzero(
+            (np.abs(cx) <= 1.0) & (np.abs(cy) <= 1.0) & (cz >= self.min_cz)
+        )
+        cells = make_cells(
+            cx=cx[idx], cy=cy[idx], num_cells_per_axis=self.num_cells_per_axis
+        )
+        start = self.cells_faces_indptr[cells]
+        num = self.cells_faces_indptr[cells + 1] - start
+        cxcycz = np.c_[cx[idx], cy[idx], cz[idx]]
+
+        for k in range(self.max_num_faces_in_cell):
+            has_candidate = num > k
+            idx = idx[has_candidate]
+            start = start[has_candidate]
+            num = num[has_candidate]
+            cxcycz = cxcycz[has_candidate]
+            if len(idx) == 0:
+                break
+
+            cand = self.cells_faces[start + k]
+            inside = mesh.is_direction_in_face(
+                faces_edge_normals=self.faces_edge_normals,
+                faces=cand,
+                directions=cxcycz,
+            )
+            face_ids[idx[inside]] = cand[inside]
+
+            outside = np.logical_not(inside)
+            idx = idx[outside]
+            start = start[outside]
+            num = num[outside]
+            cxcycz = cxcycz[outside]
+
+        return spherical_coordinates.dimensionality._out(
+            is_scalar=is_scalar,
+            x=face_ids,
+        )
+
+
+def estimate_faces_cx_cy_bounding_boxes(vertices, faces):
+    """
+    Returns for each face an axis aligned box in the x-y plane which contains
+    the face's projection onto the x-y plane.
+    A face is the part of the unit-sphere inside the cone spanned by its
+    three vertices. So its projection bulges outwards beyond the flat
+    triangle of its vertices. A point on the face is a point on the flat
+    triangle scaled by a factor between 1 and 1/h, where h is the distance of
+    the flat triangle's plane to the origin. Thus the face is contained in
+    the box around its vertices and its vertices scaled by 1/h.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    (x_min, x_max, y_min, y_max) : tuple of numpy.arrays, each shape(N, )
+    """
+    v0 = vertices[faces[:, 0]]
+    v1 = vertices[faces[:, 1]]
+    v2 = vertices[faces[:, 2]]
+
+    normal = np.cross(v1 - v0, v2 - v0)
+    normal /= np.linalg.norm(normal, axis=1)[:, np.newaxis]
+    h = np.abs(np.sum(normal * v0, axis=1))
+    with np.errstate(divide="ignore"):
+        scale = 1.0 / h
+
+    xy = np.zeros(shape=(len(faces), 6, 2), dtype=float)
+    for i, v in enumerate([v0, v1, v2]):
+        xy[:, i, :] = v[:, 0:2]
+        # limit the scale to stay finite, the box is clipped to +-1 later
+        xy[:, 3 + i, :] = v[:, 0:2] * np.minimum(scale, 1e3)[:, np.newaxis]
+
+    x_min = np.clip(np.min(xy[:, :, 0], axis=1), -1.0, 1.0)
+    x_max = np.clip(np.max(xy[:, :, 0], axis=1), -1.0, 1.0)
+    y_min = np.clip(np.min(xy[:, :, 1], axis=1), -1.0, 1.0)
+    y_max = np.clip(np.max(xy[:, :, 1], axis=1), -1.0, 1.0)
+    return x_min, x_max, y_min, y_max
+
+
+def make_cells_along_axis(c, num_cells_per_axis):
+    """
+    Returns the index of the cells along one axis for the coordinates c in
+    the range from -1 to +1.
+    """
+    cell_width = 2.0 / num_cells_per_axis
+    icell = np.floor((c + 1.0) / cell_width).astype(int)
+    return np.clip(icell, 0, num_cells_per_axis - 1)
+
+
+def make_cells(cx, cy, num_cells_per_axis):
+    """
+    Returns the index of the cells for the coordinates (cx, cy) in the range
+    from -1 to +1.
+    """
+    ix = make_cells_along_axis(c=cx, num_cells_per_axis=num_cells_per_axis)
+    iy = make_cells_along_axis(c=cy, num_cells_per_axis=num_cells_per_axis)
+    return iy * num_cells_per_axis + ix
+
+
+def make_cells_faces(vertices, faces, num_cells_per_axis):
+    """
+    Lists for each cell of the grid the faces which might overlap with it.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+    num_cells_per_axis : int
+        The number of cells along x and along y.
+
+    Returns
+    -------
+    (indptr, cells_faces) : (numpy.array, numpy.array)
+        The faces of cell c are cells_faces[indptr[c]:indptr[c + 1]].
+        The cell of (ix, iy) is c = iy * num_cells_per_axis + ix.
+    """
+    nc = num_cells_per_axis
+    x_min, x_max, y_min, y_max = estimate_faces_cx_cy_bounding_boxes(
+        vertices=vertices, faces=faces
+    )
+    ix0 = make_cells_along_axis(c=x_min, num_cells_per_axis=nc)
+    ix1 = make_cells_along_axis(c=x_max, num_cells_per_axis=nc)
+    iy0 = make_cells_along_axis(c=y_min, num_cells_per_axis=nc)
+    iy1 = make_cells_along_axis(c=y_max, num_cells_per_axis=nc)
+
+    num_x = ix1 - ix0 + 1
+    num_y = iy1 - iy0 + 1
+    num = num_x * num_y
+
+    face = np.repeat(np.arange(len(faces)), num)
+    first = np.cumsum(num) - num
+    local = np.arange(np.sum(num)) - np.repeat(first, num)
+    num_x = np.repeat(num_x, num)
+    cx = np.repeat(ix0, num) + local % num_x
+    cy = np.repeat(iy0, num) + local // num_x
+    cells = cy * nc + cx
+
+    # Within a cell, faces closer to the cell's center come first as they
+    # are more likely to contain a direction in this cell.
+    cell_width = 2.0 / nc
+    centroids = np.mean(vertices[faces], axis=1)
+    dx = centroids[face, 0] - (-1.0 + (cx + 0.5) * cell_width)
+    dy = centroids[face, 1] - (-1.0 + (cy + 0.5) * cell_width)
+    distance_sq = dx**2 + dy**2
+    within_cell = distance_sq / (1.0 + np.max(distance_sq))
+    order = np.argsort(cells + within_cell)
+    cells_faces = face[order].astype(np.int32)
+    indptr = np.zeros(nc * nc + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(cells, minlength=nc * nc))
+    return indptr, cells_faces
@@ -0,0 +1,286 @@
+"""
+A hierarchy of hemisphere geometries with increasing resolution.
+
+Each level subdivides every face of the level above into four children,
+see spherical_histogram.mesh.subdivide_faces(). The children of face f are
+the faces 4f, 4f + 1, 4f + 2, and 4f + 3 in the next level. So a histogram
+filled on a fine level is aggregated to a coarser level by summing groups of
+consecutive bins.
+"""
+from . import geometry
+from . import mesh
+
+import copy
+import spherical_coordinates
+import numpy as np
+
+
+class HierarchicalHemisphereGeometry:
+    """
+    Fields
+    ------
+    levels : list of spherical_histogram.geometry.HemisphereGeometry
+        From the coarsest, level 0, to the finest level.
+    """
+
+    def __init__(self, vertices, faces, num_levels, engine="merlict"):
+        """
+        Parameters
+        ----------
+        vertices : numpy.array, shape(M, 3), float
+            The vertices of the coarsest level.
+        faces : numpy.array, shape(N, 3), int
+            The faces of the coarsest level.
+        num_levels : int
+            The number of levels. Level l has N * 4**l faces.
+        engine : str
+            The engine to find the faces in the coarsest level.
+            See spherical_histogram.geometry.ENGINES. The finer levels
+            descend from there, but keep the engine's name so their tree can
+            be made again with it.
+        """
+        assert num_levels > 0
+        base = geometry.HemisphereGeometry(
+            vertices=vertices, faces=faces, engine=engine
+        )
+        self.levels = [base]
+        subdivision_normals = []
+
+        for level in range(1, num_levels):
+            parent = self.levels[-1]
+            subdivision_normals.append(
+                estimate_faces_subdivision_normals(
+                    vertices=parent.vertices, faces=parent.faces
+                )
+            )
+            vertices, faces = mesh.subdivide_faces(
+                vertices=parent.vertices, faces=parent.faces
+            )
+            self.levels.append(
+                geometry.HemisphereGeometry(
+                    vertices=vertices,
+                    faces=faces,
+                    # The engine of the base makes the tree again when
+                    # needed, e.g. after clip_at_zenith().
+                    engine=engine,
+                    tree=DescentTree(
+                        base_tree=base.tree,
+                        subdivision_normals=list(subdivision_normals),
+                    ),
+                )
+            )
+
+    @classmethod
+    def from_num_vertices_and_max_zenith_distance_rad(
+        cls,
+        num_vertices,
+        max_zenith_distance_rad,
+        num_levels,
+        engine="merlict",
+    ):
+        """
+        Makes the coarsest level with Fibonacci spaced vertices.
+        See HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad().
+        """
+        vertices = mesh.make_vertices(
+            num_vertices=num_vertices,
+            max_zenith_distance_rad=max_zenith_distance_rad,
+        )
+        faces = mesh.make_faces(vertices=vertices)
+        return cls(
+            vertices=vertices,
+            faces=faces,
+            num_levels=num_levels,
+            engine=engine,
+        )
+
+    @property
+    def num_levels(self):
+        return len(self.levels)
+
+    @property
+    def finest(self):
+        return self.levels[-1]
+
+    def parent_faces(self, faces, level, parent_level):
+        """
+        Returns the faces in parent_level which contain the faces in level.
+        """
+        assert 0 <= parent_level <= level < self.num_levels
+        faces = np.asarray(faces)
+        shift = 2 * (level - parent_level)
+        return np.where(faces >= 0, faces >> shift, faces)
+
+    def aggregate(self, bin_counts, level, to_level):
+        """
+        Sums the bin_counts of level into the bins of the coarser to_level.
+
+        Parameters
+        ----------
+        bin_counts : numpy.array, shape(..., num_faces in level)
+            E.g. the bin_counts of a histogram or a stack of histograms.
+        level : int
+            The level of the bin_counts.
+        to_level : int
+            The coarser level to aggregate to.
+
+        Returns
+        -------
+        bin_counts : numpy.array, shape(..., num_faces in to_level)
+        """
+        assert 0 <= to_level <= level < self.num_levels
+        bin_counts = np.asarray(bin_counts)
+        assert bin_counts.shape[-1] == len(self.levels[level].faces)
+        num_children = 4 ** (level - to_level)
+        shape = bin_counts.shape[:-1] + (-1, num_children)
+        return np.sum(
+            bin_counts.reshape(shape), axis=-1, dtype=bin_counts.dtype
+        )
+
+    def aggregate_histogram(self, hist, to_level):
+        """
+        Returns a new histogram with the content of hist aggregated to the
+        coarser to_level. For a HemisphereHistogramStack use aggregate() on
+        its bin_counts.
+
+        Parameters
+        ----------
+        hist : spherical_histogram.HemisphereHistogram
+            Filled on one of the levels.
+        to_level : int
+            The coarser level.
+        """
+        from . import HemisphereHistogram
+
+        level = self.find_level(hist.bin_geometry)
+        out = HemisphereHistogram(
+            bin_geometry=self.levels[to_level],
+            dtype=hist.dtype,
+            track_squared_weights=hist.track_squared_weights,
+        )
+        out.overflow = copy.copy(hist.overflow)
+        out.bin_counts[:] = self.aggregate(
+            bin_counts=hist.bin_counts, level=level, to_level=to_level
+        )
+        if hist.bin_squared_weights is not None:
+            out.bin_squared_weights[:] = self.aggregate(
+                bin_counts=hist.bin_squared_weights,
+                level=level,
+                to_level=to_level,
+            )
+        return out
+
+    def find_level(self, bin_geometry):
+        """
+        Returns the level which has the same bins as bin_geometry.
+        """
+        for level in range(self.num_levels):
+            if self.levels[level].has_same_bins(bin_geometry):
+                return level
+        raise ValueError("Expected bin_geometry to be one of the levels.")
+
+    def __repr__(self):
+        return "{:s}(num_levels={:d})".format(
+            self.__class__.__name__, self.num_levels
+        )
+
+
+class DescentTree:
+    """
+    Finds the face of a direction in a fine level by finding the face in the
+    coarsest level first and then descending into one of the four children
+    on each level. The cost grows with the number of levels, this is the
+    logarithm of the number of faces.
+    """
+
+    def __init__(self, base_tree, subdivision_normals):
+        """
+        Parameters
+        ----------
+        base_tree : tree
+            Finds the faces in the coarsest level.
+        subdivision_normals : list of numpy.arrays
+            For each level above the target level, see
+            estimate_faces_subdivision_normals().
+        """
+        self.base_tree = base_tree
+        self.subdivision_normals = subdivision_normals
+
+    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
+        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy(self, cx, cy):
+        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy_cz(self, cx, cy, cz):
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        face_ids = np.array(
+            self.base_tree.query_cx_cy_cz(cx=cx, cy=cy, cz=cz), dtype=int
+        )
+        idx = np.flatnonzero(face_ids >= 0)
+        directions = np.c_[cx[idx], cy[idx], cz[idx]]
+        faces = face_ids[idx]
+
+        for normals in self.subdivision_normals:
+            dots = np.einsum("nkj,nj->nk", normals[faces], directions)
+            in_corner = dots >= 0.0
+            # the center child 3 when in none of the corners
+            child = np.where(
+                np.any(in_corner, axis=1), np.argmax(in_corner, axis=1), 3
+            )
+            faces = 4 * faces + child
+
+        face_ids[idx] = faces
+        return spherical_coordinates.dimensionality._out(
+            is_scalar=is_scalar,
+            x=face_ids,
+        )
+
+
+def estimate_faces_subdivision_normals(vertices, faces):
+    """
+    For each face, the normals of the three planes which cut off the corner
+    children in mesh.subdivide_faces(). A direction d inside the face is in
+    the corner child k when dot(normal[k], d) >= 0, and in the center child 3
+    otherwise.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    normals : numpy.array, shape(N, 3, 3), float
+        The normals for the corners at the face's vertices 0, 1, and 2.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    corners = [vertices[faces[:, k]] for k in range(3)]
+
+    def _midpoint(x, y):
+        m = x + y
+        return m / np.linalg.norm(m, axis=1)[:, np.newaxis]
+
+    ab = _midpoint(corners[0], corners[1])
+    bc = _midpoint(corners[1], corners[2])
+    ca = _midpoint(corners[2], corners[0])
+
+    normals = np.zeros(shape=(len(faces), 3, 3))
+    for k, (m0, m1) in enumerate([(ab, ca), (ab, bc), (ca, bc)]):
+        n = np.cross(m0, m1)
+        towards_corner = np.sign(np.sum(n * corners[k], axis=1))
+        normals[:, k, :] = n * towards_corner[:, np.newaxis]
+    return normals
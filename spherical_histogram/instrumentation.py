@@ -0,0 +1,92 @@
+"""
+Opt-in timers and counters for the stages of filling a histogram.
+
+Instrumented code calls its stages through call(). When the instrumentation
+is None, call() only calls the function, so a disabled instrumentation costs
+one function call per stage and batch.
+"""
+import threading
+import time
+
+
+class Instrumentation:
+    """
+    Cumulative wall time, number of calls, and number of items for each
+    stage, and counters for the directions and the overflow.
+    The counters are guarded by a lock, so threads can add to the same
+    instrumentation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.num_directions = 0
+            self.num_overflow = 0
+
+    def add(self, stage, seconds, num_items=0):
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = {"seconds": 0.0, "calls": 0, "items": 0}
+            s = self.stages[stage]
+            s["seconds"] += seconds
+            s["calls"] += 1
+            s["items"] += int(num_items)
+
+    def count_directions(self, num_directions, num_overflow):
+        with self._lock:
+            self.num_directions += int(num_directions)
+            self.num_overflow += int(num_overflow)
+
+    def to_dict(self):
+        """
+        Returns the timers and counters as a dict of builtin types, e.g. to
+        be exported as JSON.
+        """
+        with self._lock:
+            if self.num_directions > 0:
+                overflow_rate = self.num_overflow / self.num_directions
+            else:
+                overflow_rate = 0.0
+            return {
+                "stages": {k: dict(self.stages[k]) for k in self.stages},
+                "num_directions": self.num_directions,
+                "num_overflow": self.num_overflow,
+                "overflow_rate": overflow_rate,
+            }
+
+    def __getstate__(self):
+        # A lock can not be pickled.
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "{:s}(num_stages={:d})".format(
+            self.__class__.__name__, len(self.stages)
+        )
+
+
+def call(instrumentation, stage, num_items, func, /, *args, **kwargs):
+    """
+    Returns func(*args, **kwargs). When instrumentation is not None, the
+    call is timed and added to the stage. The first arguments are
+    positional only, so func can take an argument named instrumentation.
+    """
+    if instrumentation is None:
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    out = func(*args, **kwargs)
+    instrumentation.add(
+        stage=stage,
+        seconds=time.perf_counter() - start,
+        num_items=num_items,
+    )
+    return out
@@ -1,11 +1,5 @@
-import binning_utils
-import scipy
-from scipy import spatial
 import numpy as np
-import solid_angle_utils
 import spherical_coordinates
-import triangle_mesh_io
-import svg_cartesian_plot
 
 
 def make_vertices(
@@ -36,6 +30,8 @@ def make_vertices(
     vertices : numpy.array, shape(N, 3)
         The xyz-coordinates of the vertices.
     """
+    import scipy.spatial
+
     PI = np.pi
     TAU = 2 * PI
 
@@ -43,7 +39,7 @@ def make_vertices(
     assert num_vertices > 0
     num_vertices = int(num_vertices)
 
-    inner_vertices = binning_utils.sphere.fibonacci_space(
+    inner_vertices = fibonacci_space(
         size=num_vertices,
         max_zenith_distance_rad=max_zenith_distance_rad,
     )
@@ -54,30 +50,60 @@ def make_vertices(
     _face_expected_edge_angle_rad = np.sqrt(_face_expected_solid_angle)
     num_horizon_vertices = int(np.ceil(TAU / _face_expected_edge_angle_rad))
 
-    horizon_vertices = []
-    for az_rad in np.linspace(0, TAU, num_horizon_vertices, endpoint=False):
-        uvec = np.array(
-            spherical_coordinates.az_zd_to_cx_cy_cz(
-                azimuth_rad=az_rad,
-                zenith_rad=max_zenith_distance_rad,
-            )
+    horizon_az_rad = np.linspace(0, TAU, num_horizon_vertices, endpoint=False)
+    horizon_vertices = np.array(
+        spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=horizon_az_rad,
+            zenith_rad=np.full(num_horizon_vertices, max_zenith_distance_rad),
         )
-        horizon_vertices.append(uvec)
-    horizon_vertices = np.array(horizon_vertices)
+    ).T
 
-    vertices = []
+    min_delta = 0.5 * _face_expected_edge_angle_rad
+
+    # Only inner vertices close to the horizon-ring can be too close to one
+    # of its vertices. The distance to the ring is at least the difference
+    # in zenith-distance, so all others are kept without querying the tree.
+    near_zenith_rad = max_zenith_distance_rad - 2.0 * min_delta
+    if near_zenith_rad > 0.0:
+        near = inner_vertices[:, 2] <= np.cos(near_zenith_rad)
+    else:
+        near = np.ones(len(inner_vertices), dtype=bool)
 
     _horizon_vertices_tree = scipy.spatial.cKDTree(data=horizon_vertices)
-    for inner_vertex in inner_vertices:
-        delta_rad, vidx = _horizon_vertices_tree.query(inner_vertex)
+    delta_rad, _ = _horizon_vertices_tree.query(inner_vertices[near])
+    keep = np.ones(len(inner_vertices), dtype=bool)
+    keep[near] = delta_rad > min_delta
+
+    return np.concatenate([inner_vertices[keep], horizon_vertices])
+
 
-        if delta_rad > 0.5 * _face_expected_edge_angle_rad:
-            vertices.append(inner_vertex)
+def fibonacci_space(size, max_zenith_distance_rad=np.pi):
+    """
+    Returns points on the unit-sphere which form a tiling where the tiles
+    are similar in solid angle and shape. The points are the same as in
+    binning_utils.sphere.fibonacci_space() but made in one go.
+
+    Parameters
+    ----------
+    size : int
+        Number of points.
+    max_zenith_distance_rad : float
+        Maximum zenith-distance to put points.
 
-    for horizon_vertex in horizon_vertices:
-        vertices.append(horizon_vertex)
+    Returns
+    -------
+    points : numpy.array, shape(size, 3)
+    """
+    phi = np.pi * (np.sqrt(5.0) - 1.0)  # golden angle in radians
+    z = np.linspace(1, np.cos(max_zenith_distance_rad), size)
+    radius = np.sqrt(1 - z * z)
+    theta = phi * np.arange(size)
 
-    return np.array(vertices)
+    points = np.zeros(shape=(size, 3))
+    points[:, 0] = np.cos(theta) * radius
+    points[:, 1] = np.sin(theta) * radius
+    points[:, 2] = z
+    return points
 
 
 def make_faces(vertices):
@@ -96,11 +122,70 @@ def make_faces(vertices):
         A list of N faces, where each face references the vertices it is made
         from.
     """
+    import scipy.spatial
+
     delaunay = scipy.spatial.Delaunay(points=vertices[:, 0:2])
     delaunay_faces = delaunay.simplices
     return delaunay_faces
 
 
+def estimate_vertices_to_faces(faces, num_vertices):
+    """
+    Finds for each vertex the faces it is connected to. The result is in the
+    compressed sparse row (CSR) format.
+
+    Parameters
+    ----------
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+    num_vertices : int
+        The total number of vertices in the mesh
+
+    Returns
+    -------
+    (indptr, indices) : (numpy.array, numpy.array), both int32
+        The faces connected to vertex v are indices[indptr[v]:indptr[v + 1]].
+        Faces are sorted in ascending order for each vertex.
+    """
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    flat = faces.ravel()
+    order = np.argsort(flat, kind="stable")
+    indices = (order // 3).astype(np.int32)
+
+    indptr = np.zeros(num_vertices + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(np.bincount(flat, minlength=num_vertices))
+    return indptr, indices
+
+
+def gather_csr(indptr, indices, rows):
+    """
+    Gathers the entries of many rows of a compressed sparse row (CSR)
+    structure at once.
+
+    Parameters
+    ----------
+    indptr : numpy.array, int
+        Row i has the entries indices[indptr[i]:indptr[i + 1]].
+    indices : numpy.array
+        The entries of all rows.
+    rows : numpy.array, int
+        The rows to be gathered.
+
+    Returns
+    -------
+    (entries, owners) : (numpy.array, numpy.array)
+        The concatenated entries of the rows, and for each entry the position
+        in rows it was gathered for.
+    """
+    rows = np.asarray(rows, dtype=int)
+    starts = indptr[rows].astype(int)
+    counts = indptr[rows + 1] - starts
+    owners = np.repeat(np.arange(len(rows)), counts)
+    firsts = np.cumsum(counts) - counts
+    positions = np.arange(len(owners)) - np.repeat(firsts - starts, counts)
+    return indices[positions], owners
+
+
 def estimate_vertices_to_faces_map(faces, num_vertices):
     """
     Parameters
@@ -114,19 +199,71 @@ def estimate_vertices_to_faces_map(faces, num_vertices):
     -------
     nn : dict of lists
         A dict with an entry for each vertex referencing the faces it is
-        connected to.
+        connected to. See also estimate_vertices_to_faces() for a more
+        compact representation.
+    """
+    indptr, indices = estimate_vertices_to_faces(
+        faces=faces, num_vertices=num_vertices
+    )
+    return vertices_to_faces_to_map(indptr=indptr, indices=indices)
+
+
+def vertices_to_faces_from_map(vertices_to_faces_map, num_vertices=None):
     """
-    nn = {}
-    for iv in range(num_vertices):
-        nn[iv] = set()
+    Returns the CSR representation of the vertices to faces relation given
+    as a dict of lists (or sets). The inverse of vertices_to_faces_to_map().
 
-    for iface, face in enumerate(faces):
-        for iv in face:
-            nn[iv].add(iface)
+    Parameters
+    ----------
+    vertices_to_faces_map : dict of lists
+        The faces connected to each vertex. Vertices without an entry have
+        no faces.
+    num_vertices : int or None
+        The total number of vertices. If None, the largest vertex in the
+        dict plus one.
 
+    Returns
+    -------
+    (indptr, indices) : (numpy.array, numpy.array), both int32
+        See estimate_vertices_to_faces().
+    """
+    if num_vertices is None:
+        num_vertices = max(vertices_to_faces_map, default=-1) + 1
+    counts = np.zeros(num_vertices, dtype=int)
+    for v in vertices_to_faces_map:
+        counts[v] = len(vertices_to_faces_map[v])
+
+    indptr = np.zeros(num_vertices + 1, dtype=np.int32)
+    indptr[1:] = np.cumsum(counts)
+    indices = np.zeros(indptr[-1], dtype=np.int32)
+    for v in vertices_to_faces_map:
+        indices[indptr[v] : indptr[v + 1]] = sorted(vertices_to_faces_map[v])
+    return indptr, indices
+
+
+def as_vertices_to_faces(vertices_to_faces, num_vertices=None):
+    """
+    Returns vertices_to_faces in the CSR representation. It may be given in
+    the CSR representation, see estimate_vertices_to_faces(), or as a dict
+    of lists, see estimate_vertices_to_faces_map().
+    """
+    if isinstance(vertices_to_faces, dict):
+        return vertices_to_faces_from_map(
+            vertices_to_faces_map=vertices_to_faces,
+            num_vertices=num_vertices,
+        )
+    return vertices_to_faces
+
+
+def vertices_to_faces_to_map(indptr, indices):
+    """
+    Returns the dict of lists representation of the vertices to faces
+    relation in CSR format. See estimate_vertices_to_faces().
+    """
+    indices = indices.tolist()
     out = {}
-    for key in nn:
-        out[key] = list(nn[key])
+    for iv in range(len(indptr) - 1):
+        out[iv] = indices[indptr[iv] : indptr[iv + 1]]
     return out
 
 
@@ -150,30 +287,56 @@ def estimate_solid_angles(vertices, faces, geometry="spherical"):
     solid : numpy.array, shape=(N, ), float
         The individual solid angles of the N faces in the mesh
     """
-    solid = np.nan * np.ones(len(faces))
-    for i in range(len(faces)):
-        face = faces[i]
-        if geometry == "spherical":
-            face_solid_angle = solid_angle_utils.triangle.solid_angle(
-                v0=vertices[face[0]],
-                v1=vertices[face[1]],
-                v2=vertices[face[2]],
-            )
-        elif geometry == "flat":
-            face_solid_angle = (
-                solid_angle_utils.triangle._area_of_flat_triangle(
-                    v0=vertices[face[0]],
-                    v1=vertices[face[1]],
-                    v2=vertices[face[2]],
-                )
-            )
-        else:
-            raise ValueError(
-                "Expected geometry to be either 'flat' or 'spherical'."
-            )
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int)
+    v0 = vertices[faces[:, 0]]
+    v1 = vertices[faces[:, 1]]
+    v2 = vertices[faces[:, 2]]
+
+    if geometry == "spherical":
+        return _solid_angles_van_oosterom_strackee(v0=v0, v1=v1, v2=v2)
+    elif geometry == "flat":
+        return 0.5 * np.linalg.norm(np.cross(v1 - v0, v1 - v2), axis=1)
+    else:
+        raise ValueError(
+            "Expected geometry to be either 'flat' or 'spherical'."
+        )
+
 
-        solid[i] = face_solid_angle
-    return solid
+def _solid_angles_van_oosterom_strackee(v0, v1, v2):
+    """
+    Returns the solid angles of the cones spanned by the triangles of the
+    vertices v0, v1, and v2 as seen from the origin.
+
+    Van Oosterom, A. and Strackee, J.,
+    'The Solid Angle of a Plane Triangle',
+    IEEE Transactions on Biomedical Engineering, 1983.
+
+    Parameters
+    ----------
+    v0 : numpy.array, shape(N, 3), float
+        First vertices of the N triangles.
+    v1 : numpy.array, shape(N, 3), float
+        Second vertices of the N triangles.
+    v2 : numpy.array, shape(N, 3), float
+        Third vertices of the N triangles.
+
+    Returns
+    -------
+    solid : numpy.array, shape=(N, ), float
+    """
+    n0 = np.linalg.norm(v0, axis=1)
+    n1 = np.linalg.norm(v1, axis=1)
+    n2 = np.linalg.norm(v2, axis=1)
+
+    triple = np.abs(np.sum(v0 * np.cross(v1, v2), axis=1))
+    denominator = (
+        n0 * n1 * n2
+        + np.sum(v0 * v1, axis=1) * n2
+        + np.sum(v0 * v2, axis=1) * n1
+        + np.sum(v1 * v2, axis=1) * n0
+    )
+    return 2.0 * np.arctan2(triple, denominator)
 
 
 def vertices_and_faces_to_obj(vertices, faces, mtlkey="sky"):
@@ -196,6 +359,8 @@ def vertices_and_faces_to_obj(vertices, faces, mtlkey="sky"):
     obj : dict representing an object-wavefront
         Includes vertices, vertex-normals, and materials ('mtl's) with faces.
     """
+    import triangle_mesh_io
+
     obj = triangle_mesh_io.obj.init()
     for vertex in vertices:
         obj["v"].append(vertex)
@@ -230,7 +395,7 @@ def plot(
     """
     Writes an svg figure to path.
     """
-    scp = svg_cartesian_plot
+    import svg_cartesian_plot as scp
 
     fig = scp.Fig(cols=1080, rows=1080)
     ax = scp.hemisphere.Ax(fig=fig)
@@ -256,88 +421,247 @@ def plot(
     scp.fig_write(fig=fig, path=path)
 
 
-def find_faces_potential_neighbors(faces, vertices_to_faces_map):
-    mm = {}
-    for iface in range(len(faces)):
-        pnn = set()
-        for v in faces[iface]:
-            for jface in vertices_to_faces_map[v]:
-                pnn.add(jface)
-        pnn.remove(iface)
-        mm[iface] = list(pnn)
+def _faces_sharing_vertices(faces, vertices_to_faces):
+    """
+    Returns the pairs of different faces (a, b) sharing at least one vertex,
+    and the number of vertices they share.
+    """
+    faces = np.asarray(faces, dtype=int)
+    indptr, indices = vertices_to_faces
+    others, owners = gather_csr(
+        indptr=indptr, indices=indices, rows=faces.ravel()
+    )
+    a = owners // 3
+    b = others.astype(int)
+    different = a != b
+    a = a[different]
+    b = b[different]
+    pairs, num_shared = np.unique(a * len(faces) + b, return_counts=True)
+    return pairs // len(faces), pairs % len(faces), num_shared
+
+
+def _pairs_to_dict_of_lists(a, b):
+    """
+    Returns a dict of lists with b[i] in the list of a[i].
+    Pairs must be sorted by a.
+    """
+    splits = np.flatnonzero(np.diff(a)) + 1
+    keys = a[np.r_[0, splits]] if len(a) > 0 else []
+    return {
+        int(key): group.tolist()
+        for key, group in zip(keys, np.split(b, splits))
+    }
+
+
+def find_faces_potential_neighbors(
+    faces, vertices_to_faces=None, vertices_to_faces_map=None
+):
+    """
+    Finds for each face the other faces which share at least one vertex
+    with it.
+
+    Parameters
+    ----------
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+    vertices_to_faces : (numpy.array, numpy.array) or dict of lists or None
+        See estimate_vertices_to_faces(). A dict of lists, see
+        estimate_vertices_to_faces_map(), is converted. If None, it is
+        estimated from the faces.
+    vertices_to_faces_map : dict of lists or None
+        The former name of vertices_to_faces. Still accepted.
+
+    Returns
+    -------
+    mm : dict of lists
+    """
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    num_vertices = np.max(faces) + 1 if len(faces) > 0 else 0
+    if vertices_to_faces is None:
+        vertices_to_faces = vertices_to_faces_map
+    if vertices_to_faces is None:
+        vertices_to_faces = estimate_vertices_to_faces(
+            faces=faces, num_vertices=num_vertices
+        )
+    vertices_to_faces = as_vertices_to_faces(
+        vertices_to_faces=vertices_to_faces, num_vertices=num_vertices
+    )
+    a, b, _ = _faces_sharing_vertices(
+        faces=faces, vertices_to_faces=vertices_to_faces
+    )
+    mm = {iface: [] for iface in range(len(faces))}
+    mm.update(_pairs_to_dict_of_lists(a=a, b=b))
     return mm
 
 
-def find_faces_neighbors(faces, vertices_to_faces_map):
-    pn = find_faces_potential_neighbors(
-        faces=faces,
-        vertices_to_faces_map=vertices_to_faces_map,
+def estimate_faces_neighbors(faces):
+    """
+    Finds for each face the neighboring faces which share an edge with it.
+    All 3N edges are sorted so that the two faces sharing an edge become
+    adjacent.
+
+    Parameters
+    ----------
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    faces_neighbors : numpy.array, shape(N, 3), int32
+        faces_neighbors[i, e] is the face sharing the edge from vertex
+        faces[i, e] to vertex faces[i, (e + 1) % 3] with face i, or -1 when
+        there is no such face.
+    """
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    num_faces = len(faces)
+    num_vertices = np.max(faces) + 1 if num_faces > 0 else 0
+
+    start = faces.ravel()
+    stop = np.roll(faces, shift=-1, axis=1).ravel()
+    edges = np.minimum(start, stop) * num_vertices + np.maximum(start, stop)
+
+    order = np.argsort(edges, kind="stable")
+    sorted_edges = edges[order]
+    same = np.flatnonzero(sorted_edges[1:] == sorted_edges[:-1])
+    a = order[same]
+    b = order[same + 1]
+
+    out = -1 * np.ones(3 * num_faces, dtype=np.int32)
+    out[a] = b // 3
+    out[b] = a // 3
+    return out.reshape((num_faces, 3))
+
+
+def faces_neighbors_to_map(faces_neighbors):
+    """
+    Returns the dict of lists representation of the faces_neighbors.
+    See estimate_faces_neighbors().
+
+    Parameters
+    ----------
+    faces_neighbors : numpy.array, shape(N, 3), int
+
+    Returns
+    -------
+    nn : dict of lists
+        Only faces with at least one neighbor have an entry.
+    """
+    faces_neighbors = np.asarray(faces_neighbors)
+    iface, _ = np.nonzero(faces_neighbors >= 0)
+    return _pairs_to_dict_of_lists(
+        a=iface, b=faces_neighbors[faces_neighbors >= 0]
     )
-    nn = {}
-    for iface in range(len(faces)):
-        iset = set(faces[iface])
-        for pface in pn[iface]:
-            pset = set(faces[pface])
-            if len(iset.intersection(pset)) == 2:
-                if iface not in nn:
-                    nn[iface] = [pface]
-                else:
-                    nn[iface].append(pface)
-    return nn
 
 
-def fill_faces_mask_if_two_neighbors_true(faces_mask, faces_neighbors):
-    assert len(faces_mask) == len(faces_neighbors)
-    out = np.asarray(faces_mask).copy()
-    num_neighbors_high = np.zeros(len(faces_mask), int)
+def faces_neighbors_from_map(faces_neighbors_map, num_faces):
+    """
+    Returns the faces_neighbors as array from a dict of lists. The inverse
+    of faces_neighbors_to_map().
 
-    for iface in range(len(faces_mask)):
-        for nface in faces_neighbors[iface]:
-            if faces_mask[nface]:
-                num_neighbors_high[iface] += 1
+    Parameters
+    ----------
+    faces_neighbors_map : dict of lists
+        The neighbors of each face. Faces without an entry have no
+        neighbors.
+    num_faces : int
+        The total number of faces.
 
-    for iface in range(len(faces_mask)):
-        if num_neighbors_high[iface] >= 2:
-            out[iface] = True
+    Returns
+    -------
+    faces_neighbors : numpy.array, shape(N, K), int32
+        Padded with -1. K is three for a mesh of triangles.
+    """
+    width = max((len(n) for n in faces_neighbors_map.values()), default=0)
+    out = -1 * np.ones(shape=(num_faces, max(width, 3)), dtype=np.int32)
+    for iface in faces_neighbors_map:
+        nn = list(faces_neighbors_map[iface])
+        out[iface, 0 : len(nn)] = nn
     return out
 
 
-def list_faces_inside_onedge_outside_zenith_distance(
-    faces, vertices, zenith_rad
-):
-    inside = []
-    onedge = []
-    outside = []
+def find_faces_neighbors(faces, vertices_to_faces_map=None):
+    """
+    Finds for each face the other faces which share an edge, i.e. two
+    vertices, with it. See also estimate_faces_neighbors() for a more
+    compact representation.
 
-    for iface in range(len(faces)):
-        v0 = vertices[faces[iface][0]]
-        v1 = vertices[faces[iface][1]]
-        v2 = vertices[faces[iface][2]]
+    Parameters
+    ----------
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+    vertices_to_faces_map : dict of lists or None
+        Accepted for compatibility. The neighbors are found from the faces
+        alone, so it is not used.
 
-        _, z0 = spherical_coordinates.cx_cy_cz_to_az_zd(
-            cx=v0[0], cy=v0[1], cz=v0[2]
-        )
-        _, z1 = spherical_coordinates.cx_cy_cz_to_az_zd(
-            cx=v1[0], cy=v1[1], cz=v1[2]
-        )
-        _, z2 = spherical_coordinates.cx_cy_cz_to_az_zd(
-            cx=v2[0], cy=v2[1], cz=v2[2]
+    Returns
+    -------
+    nn : dict of lists
+        Only faces with at least one neighbor have an entry.
+    """
+    return faces_neighbors_to_map(
+        faces_neighbors=estimate_faces_neighbors(faces=faces)
+    )
+
+
+def fill_faces_mask_if_two_neighbors_true(faces_mask, faces_neighbors):
+    """
+    Returns a copy of faces_mask where also the faces with at least two
+    neighbors in faces_mask are True.
+
+    Parameters
+    ----------
+    faces_mask : numpy.array, shape(N, ), bool
+    faces_neighbors : numpy.array, shape(N, 3), int
+        See estimate_faces_neighbors(). A dict of lists, see
+        find_faces_neighbors(), is converted.
+    """
+    faces_mask = np.asarray(faces_mask, dtype=bool)
+    if isinstance(faces_neighbors, dict):
+        faces_neighbors = faces_neighbors_from_map(
+            faces_neighbors_map=faces_neighbors, num_faces=len(faces_mask)
         )
+    faces_neighbors = np.asarray(faces_neighbors)
+    assert len(faces_mask) == len(faces_neighbors)
 
-        o0 = z0 >= zenith_rad
-        o1 = z1 >= zenith_rad
-        o2 = z2 >= zenith_rad
+    neighbor_is_high = np.logical_and(
+        faces_neighbors >= 0, faces_mask[faces_neighbors]
+    )
+    num_neighbors_high = np.sum(neighbor_is_high, axis=1)
+    return np.logical_or(faces_mask, num_neighbors_high >= 2)
 
-        if o0 and o1 and o2:
-            outside.append(iface)
-        elif not o0 and not o1 and not o2:
-            inside.append(iface)
-        else:
-            onedge.append(iface)
 
+def list_faces_inside_onedge_outside_zenith_distance(
+    faces, vertices, zenith_rad
+):
+    """
+    Sorts the faces by the zenith-distance of their vertices. A vertex is
+    outside when its zenith-distance is >= zenith_rad.
+
+    Returns
+    -------
+    (inside, onedge, outside) : (array of ints, array of ints, array of ints)
+        The faces with none, some, and all of their vertices outside.
+    """
+    num_outside = np.sum(
+        _vertices_outside_zenith(vertices=vertices, zenith_rad=zenith_rad)[
+            np.asarray(faces, dtype=int)
+        ],
+        axis=1,
+    )
+    inside = np.flatnonzero(num_outside == 0)
+    onedge = np.flatnonzero(np.logical_and(num_outside > 0, num_outside < 3))
+    outside = np.flatnonzero(num_outside == 3)
     return inside, onedge, outside
 
 
+def _vertices_outside_zenith(vertices, zenith_rad):
+    vertices = np.asarray(vertices, dtype=float)
+    _, zd = spherical_coordinates.cx_cy_cz_to_az_zd(
+        cx=vertices[:, 0], cy=vertices[:, 1], cz=vertices[:, 2]
+    )
+    return zd >= zenith_rad
+
+
 def estimate_intermediate_vertex_at_zenith(
     a,
     b,
@@ -345,60 +669,160 @@ def estimate_intermediate_vertex_at_zenith(
     epsilon_rad=1e-9,
     max_num_iterations=1000,
 ):
+    """
+    Returns the point on the great circle arc from a to b which has the
+    zenith-distance zenith_rad. See
+    estimate_intermediate_vertices_at_zenith(). The arguments epsilon_rad
+    and max_num_iterations are kept for compatibility, the point is found
+    in closed form.
+    """
     assert max_num_iterations > 0
     assert epsilon_rad > 0
+    return estimate_intermediate_vertices_at_zenith(
+        a=np.asarray(a, dtype=float).reshape((1, 3)),
+        b=np.asarray(b, dtype=float).reshape((1, 3)),
+        zenith_rad=zenith_rad,
+    )[0]
 
-    a = np.asarray(a)
-    b = np.asarray(b)
 
-    a = a / np.linalg.norm(a)
-    b = b / np.linalg.norm(b)
+def estimate_intermediate_vertices_at_zenith(a, b, zenith_rad):
+    """
+    Returns for each pair of a and b the point on the great circle arc from
+    a to b which has the zenith-distance zenith_rad. One of a and b must be
+    above, the other below zenith_rad.
 
-    _, a_zd = spherical_coordinates.cx_cy_cz_to_az_zd(
-        cx=a[0], cy=a[1], cz=a[2]
-    )
-    _, b_zd = spherical_coordinates.cx_cy_cz_to_az_zd(
-        cx=b[0], cy=b[1], cz=b[2]
-    )
+    On the arc p(t) = a cos(t) + u sin(t), with u the unit vector
+    orthogonal to a towards b, the z-component is R cos(t - phi). So t is
+    found in closed form.
 
-    assert np.abs(a_zd - b_zd) > epsilon_rad
+    Parameters
+    ----------
+    a : numpy.array, shape(N, 3)
+        Start of the arcs. Normalized to the unit-sphere.
+    b : numpy.array, shape(N, 3)
+        End of the arcs. Normalized to the unit-sphere.
+    zenith_rad : float
+        The zenith-distance of the points.
 
-    min_zd = min([a_zd, b_zd])
-    max_zd = max([a_zd, b_zd])
+    Returns
+    -------
+    points : numpy.array, shape(N, 3)
+        On the unit-sphere.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    a = a / np.linalg.norm(a, axis=1)[:, np.newaxis]
+    b = b / np.linalg.norm(b, axis=1)[:, np.newaxis]
 
-    axis = np.cross(a, b)
-    alpha = 0.5 * spherical_coordinates.angle_between_xyz(a, b)
-    inum = 0
-    delta_rad = 2 * np.pi
-    proto = [0, 0, 0]
+    u = _orthonormal(b, a)
+    arc_rad = np.arctan2(_dot(b, u), _dot(b, a))
 
-    rot_matrix = rot_matrix_from_axis_angle(axis=axis, angle_rad=alpha)
-    proto = np.dot(rot_matrix, a)
-    _, p_zd = spherical_coordinates.cx_cy_cz_to_az_zd(
-        proto[0], proto[1], proto[2]
-    )
-    if p_zd < min_zd or p_zd > max_zd:
-        alpha *= -1.0
+    R = np.hypot(a[:, 2], u[:, 2])
+    phi = np.arctan2(u[:, 2], a[:, 2])
+    delta = np.arccos(np.clip(np.cos(zenith_rad) / R, -1.0, 1.0))
 
-    while True:
-        inum += 1
-        assert inum <= max_num_iterations
+    # Of the two solutions, take the one on the arc.
+    t1 = np.mod(phi - delta + np.pi, 2.0 * np.pi) - np.pi
+    t2 = np.mod(phi + delta + np.pi, 2.0 * np.pi) - np.pi
+    off1 = np.maximum(np.maximum(-t1, t1 - arc_rad), 0.0)
+    off2 = np.maximum(np.maximum(-t2, t2 - arc_rad), 0.0)
+    t = np.clip(np.where(off1 <= off2, t1, t2), 0.0, arc_rad)
 
-        rot_matrix = rot_matrix_from_axis_angle(axis=axis, angle_rad=alpha)
-        proto = np.dot(rot_matrix, a)
+    return a * np.cos(t)[:, np.newaxis] + u * np.sin(t)[:, np.newaxis]
 
-        _, p_zd = spherical_coordinates.cx_cy_cz_to_az_zd(
-            proto[0], proto[1], proto[2]
-        )
 
-        delta_rad = zenith_rad - p_zd
+def clip_faces_at_zenith(vertices, faces, max_zenith_distance_rad):
+    """
+    Cuts the mesh at the max_zenith_distance_rad. Faces entirely beyond are
+    removed. Faces crossing the cut are replaced by the triangles of their
+    part above. The new vertices are on the great circle edges exactly at
+    max_zenith_distance_rad and shared by the faces next to the edge.
 
-        if np.abs(delta_rad) < epsilon_rad:
-            break
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+    max_zenith_distance_rad : float
+        Where to cut.
+
+    Returns
+    -------
+    (vertices, faces) : (numpy.array, numpy.array)
+        The clipped mesh. Only vertices used by the faces are kept. The
+        orientation of the faces is kept.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    num_vertices = len(vertices)
 
-        alpha = alpha + 0.5 * delta_rad
+    # Vertices on the cut are kept as they are.
+    _, zd = spherical_coordinates.cx_cy_cz_to_az_zd(
+        cx=vertices[:, 0], cy=vertices[:, 1], cz=vertices[:, 2]
+    )
+    outside = zd > max_zenith_distance_rad + 1e-12
+    on_cut = np.abs(zd - max_zenith_distance_rad) <= 1e-12
+
+    faces_outside = outside[faces]
+    num_outside = np.sum(faces_outside, axis=1)
+
+    # the edges crossing the cut, each only once
+    # ------------------------------------------
+    edges = np.stack([faces, np.roll(faces, -1, axis=1)], axis=2)
+    crossing = outside[edges[:, :, 0]] != outside[edges[:, :, 1]]
+    crossing_edges = np.sort(edges[crossing], axis=1)
+    keys, inverse = np.unique(
+        crossing_edges[:, 0] * num_vertices + crossing_edges[:, 1],
+        return_inverse=True,
+    )
+    ends = np.c_[keys // num_vertices, keys % num_vertices]
+    is_in = ~outside[ends]
+    v_in = np.where(is_in[:, 0], ends[:, 0], ends[:, 1])
+    v_out = np.where(is_in[:, 0], ends[:, 1], ends[:, 0])
+
+    intersections = estimate_intermediate_vertices_at_zenith(
+        a=vertices[v_in],
+        b=vertices[v_out],
+        zenith_rad=max_zenith_distance_rad,
+    )
+    # When the inside end is on the cut, it is the intersection itself.
+    new_index = num_vertices + np.cumsum(~on_cut[v_in]) - 1
+    new_index = np.where(on_cut[v_in], v_in, new_index)
+    all_vertices = np.r_[vertices, intersections[~on_cut[v_in]]]
+
+    edge_point = -1 * np.ones(shape=crossing.shape, dtype=int)
+    edge_point[crossing] = new_index[inverse]
+
+    # the new faces
+    # -------------
+    out = [faces[num_outside == 0]]
+    for k in range(3):
+        # rotate so the vertex k comes first
+        f = np.roll(faces, -k, axis=1)
+        p = np.roll(edge_point, -k, axis=1)
+        o = np.roll(faces_outside, -k, axis=1)
+
+        # only the first is inside: (a, ab, ca)
+        one_in = (num_outside == 2) & ~o[:, 0]
+        out.append(np.c_[f[one_in, 0], p[one_in, 0], p[one_in, 2]])
+
+        # only the last is outside: (a, b, bc) and (a, bc, ca)
+        one_out = (num_outside == 1) & o[:, 2]
+        out.append(np.c_[f[one_out, 0], f[one_out, 1], p[one_out, 1]])
+        out.append(np.c_[f[one_out, 0], p[one_out, 1], p[one_out, 2]])
+    new_faces = np.concatenate(out, axis=0)
+
+    # Drop the faces collapsed onto vertices on the cut.
+    degenerate = (
+        (new_faces[:, 0] == new_faces[:, 1])
+        | (new_faces[:, 1] == new_faces[:, 2])
+        | (new_faces[:, 2] == new_faces[:, 0])
+    )
+    new_faces = new_faces[~degenerate]
 
-    return proto
+    used, new_faces_flat = np.unique(new_faces, return_inverse=True)
+    return all_vertices[used], new_faces_flat.reshape(new_faces.shape)
 
 
 def rot_matrix_from_axis_angle(axis, angle_rad):
@@ -496,14 +920,536 @@ def is_point_in_triangle(a, b, c, p):
 
 
 def average(faces, vertices, faces_weights):
-    total = np.zeros(3)
+    """
+    Returns the weighted mean direction of the faces' centroids.
+    """
+    centroids = estimate_faces_centroids(vertices=vertices, faces=faces)
+    total = np.asarray(faces_weights, dtype=float) @ centroids
+    return total / np.linalg.norm(total)
 
-    for i in range(len(faces)):
-        v0 = vertices[faces[i]][0]
-        v1 = vertices[faces[i]][1]
-        v2 = vertices[faces[i]][2]
-        vm = (v0 + v1 + v2) / 3.0
-        vm = vm * (faces_weights[i] / np.linalg.norm(vm))
-        total += vm
 
-    return total / np.linalg.norm(total)
+def estimate_faces_centroids(vertices, faces):
+    """
+    Returns the mean of each face's vertices projected onto the unit-sphere.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    centroids : numpy.array, shape(N, 3), float
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    centroids = vertices[faces[:, 0]] + vertices[faces[:, 1]]
+    centroids += vertices[faces[:, 2]]
+    centroids /= np.linalg.norm(centroids, axis=1)[:, np.newaxis]
+    return centroids
+
+
+def estimate_faces_edge_normals(vertices, faces):
+    """
+    For each face, the normals of the three planes spanned by the origin and
+    the face's edges. The normals point towards the inside of the face.
+    A direction d is inside the face when all three dot(normal, d) >= 0.
+    Two faces sharing an edge have exactly opposite normals for this edge, so
+    there is no gap between neighboring faces.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    normals : numpy.array, shape(N, 3, 3), float
+        For each face, the three normals of the edges (0, 1), (1, 2), and
+        (2, 0).
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int)
+    v0 = vertices[faces[:, 0]]
+    v1 = vertices[faces[:, 1]]
+    v2 = vertices[faces[:, 2]]
+
+    normals = np.zeros(shape=(len(faces), 3, 3), dtype=float)
+    normals[:, 0, :] = np.cross(v0, v1)
+    normals[:, 1, :] = np.cross(v1, v2)
+    normals[:, 2, :] = np.cross(v2, v0)
+
+    orientation = np.sign(np.sum(normals[:, 0, :] * v2, axis=1))
+    normals *= orientation[:, np.newaxis, np.newaxis]
+    return normals
+
+
+def estimate_faces_edges_angles(vertices, faces):
+    """
+    Returns the angles between the vertices of each face.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    angles : numpy.array, shape(N, 3), float
+        For each face, the angles of the edges (0, 1), (1, 2), and (2, 0).
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int)
+    angles = np.zeros(shape=(len(faces), 3), dtype=float)
+    for e in range(3):
+        a = vertices[faces[:, e]]
+        b = vertices[faces[:, (e + 1) % 3]]
+        dot = np.sum(a * b, axis=1)
+        angles[:, e] = np.arccos(np.clip(dot, -1.0, 1.0))
+    return angles
+
+
+def is_direction_in_face(faces_edge_normals, faces, directions):
+    """
+    Tests whether each direction is inside its face.
+
+    Parameters
+    ----------
+    faces_edge_normals : numpy.array, shape(N, 3, 3), float
+        See estimate_faces_edge_normals().
+    faces : numpy.array, shape(S, ), int
+        For each of the S directions, the face to be tested.
+    directions : numpy.array, shape(S, 3), float
+        The directions.
+
+    Returns
+    -------
+    inside : numpy.array, shape(S, ), bool
+    """
+    normals = faces_edge_normals[faces]
+    inside = np.ones(len(faces), dtype=bool)
+    for e in range(3):
+        dot = (
+            normals[:, e, 0] * directions[:, 0]
+            + normals[:, e, 1] * directions[:, 1]
+            + normals[:, e, 2] * directions[:, 2]
+        )
+        inside &= dot >= 0.0
+    return inside
+
+
+def find_first_face_containing_direction(
+    faces_edge_normals, candidate_faces, directions
+):
+    """
+    Finds for each direction the first of its candidate faces which contains
+    the direction.
+
+    Parameters
+    ----------
+    faces_edge_normals : numpy.array, shape(N, 3, 3), float
+        See estimate_faces_edge_normals().
+    candidate_faces : numpy.array, shape(S, K), int
+        For each of the S directions, K candidate faces. Unused slots are -1
+        and must come after the used ones.
+    directions : numpy.array, shape(S, 3), float
+        The directions.
+
+    Returns
+    -------
+    faces : numpy.array, shape(S, ), int
+        The face containing the direction or -1 if none of the candidate
+        faces contains the direction.
+    """
+    num_directions, num_candidates = candidate_faces.shape
+    out = -1 * np.ones(num_directions, dtype=int)
+    todo = np.arange(num_directions)
+
+    for k in range(num_candidates):
+        cand = candidate_faces[todo, k]
+        valid = cand >= 0
+        todo = todo[valid]
+        cand = cand[valid]
+        if len(todo) == 0:
+            break
+
+        inside = is_direction_in_face(
+            faces_edge_normals=faces_edge_normals,
+            faces=cand,
+            directions=directions[todo],
+        )
+        out[todo[inside]] = cand[inside]
+        todo = todo[np.logical_not(inside)]
+    return out
+
+
+def walk_to_faces_containing_directions(
+    faces_edge_normals,
+    faces_neighbors,
+    start_faces,
+    directions,
+    max_num_steps,
+):
+    """
+    Walks for each direction from its start face over the faces' neighbors
+    towards the direction, until a face contains the direction. In each
+    step the walk crosses the edge whose plane the direction is furthest
+    behind. On a mesh covering a convex region of the sphere, e.g. a cap,
+    a walk which leaves the mesh shows that the direction is outside.
+
+    Parameters
+    ----------
+    faces_edge_normals : numpy.array, shape(N, 3, 3), float
+        See estimate_faces_edge_normals().
+    faces_neighbors : numpy.array, shape(N, 3), int
+        See estimate_faces_neighbors(). Must be ordered like the edges in
+        faces_edge_normals.
+    start_faces : numpy.array, shape(S, ), int
+        For each of the S directions, the face to start from.
+    directions : numpy.array, shape(S, 3), float
+        The directions.
+    max_num_steps : int
+        The walks stop after this many steps.
+
+    Returns
+    -------
+    faces : numpy.array, shape(S, ), int
+        The face containing the direction, -1 when the walk left the mesh,
+        or -2 when the walk did not end within max_num_steps.
+    """
+    out = -2 * np.ones(len(start_faces), dtype=int)
+    todo = np.arange(len(start_faces))
+    faces = np.asarray(start_faces, dtype=int).copy()
+
+    for step in range(int(max_num_steps)):
+        if len(todo) == 0:
+            break
+        dots = np.einsum(
+            "nkj,nj->nk", faces_edge_normals[faces], directions[todo]
+        )
+        edge = np.argmin(dots, axis=1)
+        inside = dots[np.arange(len(todo)), edge] >= 0.0
+        out[todo[inside]] = faces[inside]
+
+        todo = todo[~inside]
+        faces = faces_neighbors[faces[~inside], edge[~inside]]
+        left = faces < 0
+        out[todo[left]] = -1
+        todo = todo[~left]
+        faces = faces[~left]
+    return out
+
+
+def estimate_faces_bounding_caps(vertices, faces):
+    """
+    Finds for each face a cap on the unit-sphere which contains the face.
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    (centers, radii_rad) : (numpy.array, numpy.array)
+        The centers, shape(N, 3), of the caps are the normalized mean of the
+        face's vertices. The radii, shape(N, ), are the largest angles
+        between the center and the face's vertices.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int)
+    face_vertices = vertices[faces]
+    centers = estimate_faces_centroids(vertices=vertices, faces=faces)
+    cos_angles = np.sum(face_vertices * centers[:, np.newaxis, :], axis=2)
+    radii_rad = np.arccos(np.clip(np.min(cos_angles, axis=1), -1.0, 1.0))
+    return centers, radii_rad
+
+
+def make_cone_quadrature(
+    cone_axis, cone_half_angle_rad, num_rings, min_angle_rad=0.0
+):
+    """
+    Divides a cone, or the outer annulus of it, into cells of about equal
+    size. The cells are bounded by num_rings rings of equal width in the
+    angle to the cone's axis, and each ring is divided into equal segments
+    in azimuth. The cells are about as wide as their ring. The cells cover
+    the cone exactly, so the cells' solid angles sum up to the annulus'
+    solid angle. Because the cells scale with the cone, a small cone is
+    resolved as well as a large one.
+
+    Parameters
+    ----------
+    cone_axis : numpy.array, shape(3, ), float
+        The cone's pointing. Must be normalized.
+    cone_half_angle_rad : float
+        The cone's half angle.
+    num_rings : int
+        The number of rings between min_angle_rad and cone_half_angle_rad.
+    min_angle_rad : float
+        The inner angle of the annulus. Zero to cover the full cone.
+
+    Returns
+    -------
+    (directions, solid_angles) : (numpy.array, numpy.array)
+        The directions, shape(P, 3), to the cells' centers, and the solid
+        angles, shape(P, ), of the cells.
+    """
+    num_rings = int(num_rings)
+    assert num_rings > 0
+    assert 0.0 <= min_angle_rad <= cone_half_angle_rad
+    axis = np.asarray(cone_axis, dtype=float)
+
+    rings_edges = np.linspace(
+        min_angle_rad, cone_half_angle_rad, num_rings + 1
+    )
+    rings_width = rings_edges[1] - rings_edges[0]
+    # the centers split the rings into two halves of equal solid angle
+    rings_centers = np.arccos(
+        0.5 * (np.cos(rings_edges[:-1]) + np.cos(rings_edges[1:]))
+    )
+    rings_solid_angles = (
+        2.0 * np.pi * (np.cos(rings_edges[:-1]) - np.cos(rings_edges[1:]))
+    )
+    if rings_width > 0.0:
+        circumference = 2.0 * np.pi * np.sin(rings_centers)
+        num_segments = np.ceil(circumference / rings_width).astype(int)
+    else:
+        num_segments = np.ones(num_rings, dtype=int)
+    num_segments = np.maximum(num_segments, 3)
+
+    rings = np.repeat(np.arange(num_rings), num_segments)
+    segment_starts = np.cumsum(num_segments) - num_segments
+    segments = np.arange(len(rings)) - segment_starts[rings]
+    phi = 2.0 * np.pi * (segments + 0.5) / num_segments[rings]
+    theta = rings_centers[rings]
+    solid_angles = rings_solid_angles[rings] / num_segments[rings]
+
+    # two unit vectors orthogonal to the axis
+    helper = np.eye(3)[np.argmin(np.abs(axis))]
+    ex = helper - np.dot(helper, axis) * axis
+    ex /= np.linalg.norm(ex)
+    ey = _cross3(axis, ex)
+
+    sin_theta = np.sin(theta)
+    directions = (
+        np.cos(theta)[:, np.newaxis] * axis
+        + (sin_theta * np.cos(phi))[:, np.newaxis] * ex
+        + (sin_theta * np.sin(phi))[:, np.newaxis] * ey
+    )
+    return directions, solid_angles
+
+
+def draw_points_on_spherical_triangles(prng, vertices, faces):
+    """
+    Draws one point uniformly distributed on the unit-sphere within each
+    spherical triangle. Follows J. Arvo, 'Stratified sampling of spherical
+    triangles', SIGGRAPH 1995.
+
+    Parameters
+    ----------
+    prng : numpy.random.Generator
+        Pseudo random number generator.
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        The spherical triangle to draw each of the N points in.
+
+    Returns
+    -------
+    points : numpy.array, shape(N, 3), float
+        Points on the unit-sphere.
+    """
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    table = make_spherical_triangles_sampling_table(
+        vertices=vertices, faces=faces
+    )
+    return draw_points_with_sampling_table(
+        prng=prng, table=table, faces=np.arange(len(faces))
+    )
+
+
+def make_spherical_triangles_sampling_table(vertices, faces):
+    """
+    Precomputes the properties of the spherical triangles needed to draw
+    points in them. See draw_points_with_sampling_table().
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    table : dict of numpy.arrays
+        Each with N rows.
+    """
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    a = vertices[faces[:, 0]]
+    b = vertices[faces[:, 1]]
+    c = vertices[faces[:, 2]]
+
+    alpha = _spherical_angle_at(a, b, c)
+    beta = _spherical_angle_at(b, c, a)
+    gamma = _spherical_angle_at(c, a, b)
+
+    table = {}
+    table["a"] = a
+    table["b"] = b
+    table["c_ortho_a"] = _orthonormal(c, a)
+    table["area"] = alpha + beta + gamma - np.pi
+    table["alpha"] = alpha
+    table["cos_alpha"] = np.cos(alpha)
+    table["sin_alpha"] = np.sin(alpha)
+    table["cos_ab"] = _dot(a, b)
+    return table
+
+
+def draw_points_with_sampling_table(prng, table, faces):
+    """
+    Draws one point uniformly distributed within each of the spherical
+    triangles faces.
+
+    Parameters
+    ----------
+    prng : numpy.random.Generator
+        Pseudo random number generator.
+    table : dict of numpy.arrays
+        See make_spherical_triangles_sampling_table().
+    faces : numpy.array, shape(N, ), int
+        The rows in the table to draw the N points in.
+
+    Returns
+    -------
+    points : numpy.array, shape(N, 3), float
+        Points on the unit-sphere.
+    """
+    faces = np.asarray(faces, dtype=int)
+    size = len(faces)
+    a = table["a"][faces]
+    b = table["b"][faces]
+    cos_alpha = table["cos_alpha"][faces]
+    sin_alpha = table["sin_alpha"][faces]
+
+    u1 = prng.uniform(size=size)
+    u2 = prng.uniform(size=size)
+
+    # Find the point c_hat on the arc from a to c so that the sub triangle
+    # (a, b, c_hat) has the area u1 * area.
+    sub_area = u1 * table["area"][faces] - table["alpha"][faces]
+    s = np.sin(sub_area)
+    t = np.cos(sub_area)
+    u = t - cos_alpha
+    v = s + sin_alpha * table["cos_ab"][faces]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q = ((v * t - u * s) * cos_alpha - v) / ((v * s + u * t) * sin_alpha)
+    q = np.clip(np.nan_to_num(q, nan=1.0), -1.0, 1.0)
+    c_hat = q[:, np.newaxis] * a
+    c_hat += np.sqrt(1.0 - q**2)[:, np.newaxis] * table["c_ortho_a"][faces]
+
+    # Draw the point on the arc from b to c_hat.
+    z = 1.0 - u2 * (1.0 - _dot(c_hat, b))
+    z = np.clip(z, -1.0, 1.0)
+    points = _orthonormal(c_hat, b)
+    points *= np.sqrt(1.0 - z**2)[:, np.newaxis]
+    points += z[:, np.newaxis] * b
+    return points
+
+
+def _cross3(a, b):
+    return np.array(
+        [
+            a[1] * b[2] - a[2] * b[1],
+            a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0],
+        ]
+    )
+
+
+def _dot(x, y):
+    return np.einsum("ij,ij->i", x, y)
+
+
+def _orthonormal(x, y):
+    """
+    The normalized part of x which is orthogonal to the unit vector y.
+    """
+    out = x - _dot(x, y)[:, np.newaxis] * y
+    norm = np.sqrt(_dot(out, out))
+    norm[norm == 0.0] = 1.0
+    out /= norm[:, np.newaxis]
+    return out
+
+
+def _spherical_angle_at(a, b, c):
+    """
+    The angle at vertex a of the spherical triangle (a, b, c).
+    """
+    tb = _orthonormal(b, a)
+    tc = _orthonormal(c, a)
+    return np.arccos(np.clip(_dot(tb, tc), -1.0, 1.0))
+
+
+def subdivide_faces(vertices, faces):
+    """
+    Subdivides each face into four faces using the midpoints of its edges
+    projected onto the unit-sphere. The midpoints are on the great circles
+    of the edges, so the four children cover their parent exactly.
+    Neighboring faces share the midpoints of their common edges.
+
+        c
+        |\\
+        | \\
+      ca---bc
+        |\\ |\\
+        | \\| \\
+        a--ab--b
+
+    Parameters
+    ----------
+    vertices : numpy.array, shape(M, 3), float
+        The xyz-coordinates of the M vertices on the unit-sphere.
+    faces : numpy.array, shape(N, 3), int
+        A list of N faces referencing their vertices.
+
+    Returns
+    -------
+    (vertices, faces) : (numpy.array, numpy.array)
+        The vertices start with the original M vertices followed by the
+        midpoints. The children of face f are the faces 4f + k where k is
+        0: (a, ab, ca), 1: (ab, b, bc), 2: (ca, bc, c), 3: (ab, bc, ca).
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    faces = np.asarray(faces, dtype=int).reshape((-1, 3))
+    num_faces = len(faces)
+
+    edges = np.concatenate(
+        [faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]
+    )
+    edges = np.sort(edges, axis=1)
+    unique_edges, inverse = np.unique(edges, axis=0, return_inverse=True)
+    midpoints = vertices[unique_edges[:, 0]] + vertices[unique_edges[:, 1]]
+    midpoints /= np.linalg.norm(midpoints, axis=1)[:, np.newaxis]
+
+    m = len(vertices) + inverse.reshape((3, num_faces)).T
+    a, b, c = faces[:, 0], faces[:, 1], faces[:, 2]
+    ab, bc, ca = m[:, 0], m[:, 1], m[:, 2]
+    children = np.stack(
+        [
+            np.c_[a, ab, ca],
+            np.c_[ab, b, bc],
+            np.c_[ca, bc, c],
+            np.c_[ab, bc, ca],
+        ],
+        axis=1,
+    )
+    return np.concatenate([vertices, midpoints]), children.reshape((-1, 3))
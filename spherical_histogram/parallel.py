@@ -0,0 +1,92 @@
+"""
+Assign large batches of directions in parallel.
+
+The batch is split into one part for each worker. Each worker assigns its
+part to a private, empty copy of the histogram. In the end the partial
+histograms are merged. A thread pool is used by default. The engines "grid"
+and "vertex" spend much of their time in numpy and scipy, which release the
+GIL in parts of their work, so threads can overlap. How much this gains
+depends on the engine, the batch, and the machine. Measure it with the
+benchmark "assign_parallel_cx_cy_cz" in spherical_histogram.benchmark. The
+engine "merlict" holds the GIL, use a process pool for it.
+"""
+
+import concurrent.futures
+import os
+import numpy as np
+
+
+def assign(
+    hist,
+    kind,
+    columns,
+    num_workers=None,
+    executor=None,
+    chunk_size=None,
+):
+    """
+    Assigns the directions in columns to hist using a pool of workers.
+
+    Parameters
+    ----------
+    hist : spherical_histogram.HemisphereHistogram
+        The histogram to assign to.
+    kind : str
+        One of "cx_cy_cz", "cx_cy", or "azimuth_zenith".
+    columns : tuple of array like
+        The columns of the directions in the order expected by
+        hist.assign_{kind}() and optional weights as the last column.
+    num_workers : int or None
+        The number of parts. If None, it is the number of cpus.
+    executor : concurrent.futures.Executor or None
+        If None, a ThreadPoolExecutor with num_workers is used. When a
+        ProcessPoolExecutor is given, the histogram's geometry is pickled
+        for each part.
+    chunk_size : int or None
+        Each worker assigns its part in batches of this size. If None, it is
+        the chunk_size of the histogram's bin_geometry.
+    """
+    assert kind in ["cx_cy_cz", "cx_cy", "azimuth_zenith"]
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    assert num_workers > 0
+
+    columns = [np.atleast_1d(np.asarray(c)) for c in columns]
+    size = max(len(c) for c in columns)
+    columns = [np.broadcast_to(c, (size,)) for c in columns]
+
+    # make the engine once before the workers need it
+    hist.bin_geometry.tree
+
+    stops = np.linspace(0, size, num_workers + 1).astype(int)
+    parts = []
+    for start, stop in zip(stops[:-1], stops[1:]):
+        if stop > start:
+            parts.append(tuple(c[start:stop] for c in columns))
+
+    if executor is None:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_workers
+        ) as pool:
+            results = _map(pool, hist, kind, parts, chunk_size)
+    else:
+        results = _map(executor, hist, kind, parts, chunk_size)
+
+    for result in results:
+        hist._merge_dict(result)
+
+
+def _map(executor, hist, kind, parts, chunk_size):
+    futures = [
+        executor.submit(
+            _assign_part, hist._empty_like(), kind, part, chunk_size
+        )
+        for part in parts
+    ]
+    return [future.result() for future in futures]
+
+
+def _assign_part(partial, kind, columns, chunk_size):
+    assign_stream = getattr(partial, "assign_stream_" + kind)
+    assign_stream(chunks=[columns], chunk_size=chunk_size)
+    return partial.to_dict()
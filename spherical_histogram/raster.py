@@ -0,0 +1,168 @@
+"""
+Raster images of the bins on the hemisphere.
+
+The svg plots draw each face as a path, what gets slow for fine geometries
+and for many images. Here the face seen in each pixel is looked up once for
+a geometry and a size of the image. Coloring an image is then a single
+fancy-index of the faces' colors.
+
+Like the svg plots, the image shows the hemisphere from above. The rows go
+from cy = +1 down to cy = -1, the columns from cx = -1 to cx = +1.
+"""
+import struct
+import zlib
+import numpy as np
+
+
+ROYAL_BLUE = (65, 105, 225)
+WHITE = (255, 255, 255)
+
+
+def make_pixel_to_face(bin_geometry, num_pixel):
+    """
+    Returns the face seen in each pixel.
+
+    Parameters
+    ----------
+    bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+        The faces are looked up with the geometry's engine.
+    num_pixel : int
+        The number of rows and columns of the square image.
+
+    Returns
+    -------
+    pixel_to_face : numpy.array, shape(num_pixel, num_pixel), dtype int32
+        The index of the face seen in each pixel. -1 when the pixel is
+        outside of the hemisphere or beyond the max zenith distance.
+    """
+    num_pixel = int(num_pixel)
+    assert num_pixel > 0
+    centers = -1.0 + (2.0 * np.arange(num_pixel) + 1.0) / num_pixel
+    cx, cy = np.meshgrid(centers, centers[::-1])
+    inside = cx**2 + cy**2 < 1.0
+
+    pixel_to_face = np.full(
+        shape=(num_pixel, num_pixel), fill_value=-1, dtype=np.int32
+    )
+    pixel_to_face[inside] = bin_geometry.query_cx_cy(
+        cx=cx[inside], cy=cy[inside]
+    )
+    return pixel_to_face
+
+
+def normalized(bin_counts):
+    """
+    Returns the bin_counts divided by their maximum, or zeros when empty.
+    """
+    faces_values = np.asarray(bin_counts, dtype=float)
+    vmax = np.max(faces_values) if faces_values.size else 0.0
+    if vmax > 0:
+        faces_values = faces_values / vmax
+    return faces_values
+
+
+def render(
+    pixel_to_face,
+    faces_values,
+    fill_color=ROYAL_BLUE,
+    background_color=WHITE,
+):
+    """
+    Returns an image with the faces filled according to their values.
+
+    Parameters
+    ----------
+    pixel_to_face : numpy.array, shape(rows, cols)
+        See make_pixel_to_face().
+    faces_values : numpy.array, shape(num_faces, )
+        The opacity of the fill_color in each face. Clipped to [0, 1].
+    fill_color : (r, g, b)
+        Color of a face with value one, in 0 to 255.
+    background_color : (r, g, b)
+        Color of a face with value zero, in 0 to 255. Pixels without a
+        face get this color and are fully transparent.
+
+    Returns
+    -------
+    rgba : numpy.array, shape(rows, cols, 4), dtype uint8
+    """
+    faces_values = np.clip(np.asarray(faces_values, dtype=float), 0.0, 1.0)
+    fill = np.asarray(fill_color, dtype=float)
+    background = np.asarray(background_color, dtype=float)
+
+    # The last color is for the pixels without a face, index -1.
+    colors = np.zeros(shape=(len(faces_values) + 1, 4), dtype=np.uint8)
+    colors[:-1, 0:3] = np.round(
+        background + faces_values[:, np.newaxis] * (fill - background)
+    )
+    colors[:-1, 3] = 255
+    colors[-1, 0:3] = background
+
+    # One uint32 for each color makes the fancy-index a lot faster than
+    # indexing rows of four uint8.
+    colors_u32 = colors.view(np.uint32).reshape(-1)
+    rgba = colors_u32[pixel_to_face]
+    return rgba.view(np.uint8).reshape(pixel_to_face.shape + (4,))
+
+
+def write(path, rgba):
+    """
+    Writes the image to path. The format is chosen by the extension of the
+    path, either '.png' or '.ppm'.
+    """
+    if path.lower().endswith(".png"):
+        write_png(path=path, rgba=rgba)
+    elif path.lower().endswith(".ppm"):
+        write_ppm(path=path, rgba=rgba)
+    else:
+        raise ValueError(
+            "Expected path '{:s}' to end with '.png' or '.ppm'.".format(path)
+        )
+
+
+def write_png(path, rgba, compression_level=1):
+    """
+    Writes the image to path as PNG with 8bit RGBA.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to be written.
+    rgba : numpy.array, shape(rows, cols, 4), dtype uint8
+        The image.
+    compression_level : int
+        Of zlib, from 0 (none) to 9 (best). Low levels are fast.
+    """
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    rows, cols, _ = rgba.shape
+
+    # Each row starts with its filter type, zero for no filter.
+    raw = np.zeros(shape=(rows, 1 + 4 * cols), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape((rows, 4 * cols))
+
+    # width, height, bit depth, color type RGBA, compression, filter,
+    # interlace
+    header = struct.pack(">IIBBBBB", cols, rows, 8, 6, 0, 0, 0)
+    data = zlib.compress(raw.tobytes(), compression_level)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", header))
+        f.write(_png_chunk(b"IDAT", data))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def write_ppm(path, rgba):
+    """
+    Writes the image to path as binary PPM. The alpha channel is dropped.
+    """
+    rgba = np.asarray(rgba, dtype=np.uint8)
+    rows, cols, _ = rgba.shape
+    with open(path, "wb") as f:
+        f.write("P6\n{:d} {:d}\n255\n".format(cols, rows).encode())
+        f.write(np.ascontiguousarray(rgba[:, :, 0:3]).tobytes())
+
+
+def _png_chunk(kind, data):
+    crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
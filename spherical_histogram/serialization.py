@@ -0,0 +1,161 @@
+"""
+A compact binary format for the content of a HemisphereHistogram.
+
+A file starts with the MAGIC bytes, followed by the length of the header as
+a little endian uint64 and the header itself as JSON. The header holds the
+overflow, the fingerprint of the geometry, and the dtype, shape, and offset
+of each array. The raw arrays follow, each aligned to ALIGNMENT bytes, so
+they can be memory mapped without copying.
+
+The geometry itself is not written. When reading, the geometry must be
+provided and its fingerprint must match the one in the file.
+"""
+import json
+import struct
+import numpy as np
+
+
+MAGIC = b"SPHHIST\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARRAY_KEYS = ["bin_counts", "bin_squared_weights"]
+
+
+def write(path, hist):
+    """
+    Writes the content of the histogram to path.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to be written.
+    hist : spherical_histogram.HemisphereHistogram
+        The histogram.
+    """
+    arrays = {}
+    for key in ARRAY_KEYS:
+        a = getattr(hist, key)
+        if a is not None:
+            a = np.asarray(a)
+            arrays[key] = np.ascontiguousarray(
+                a, dtype=a.dtype.newbyteorder("<")
+            )
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "fingerprint": hist.bin_geometry.fingerprint,
+        "overflow": _to_json_number(hist.overflow),
+        "arrays": {},
+    }
+    offset = 0
+    for key in arrays:
+        header["arrays"][key] = {
+            "dtype": arrays[key].dtype.str,
+            "shape": list(arrays[key].shape),
+            "offset": offset,
+        }
+        offset = _align(offset + arrays[key].nbytes)
+
+    header_bytes = json.dumps(header, sort_keys=True).encode()
+    start = _data_start(header_length=len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for key in arrays:
+            pos = start + header["arrays"][key]["offset"]
+            f.write(b"\x00" * (pos - f.tell()))
+            f.write(arrays[key].tobytes())
+
+
+def read_header(path):
+    """
+    Reads only the header. E.g. to find the fingerprint of the geometry.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file written by write().
+
+    Returns
+    -------
+    header : dict
+    """
+    header, _ = _read_header(path)
+    return header
+
+
+def read_arrays(path, fingerprint=None, mmap_mode="r"):
+    """
+    Reads the header and the arrays.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file written by write().
+    fingerprint : str or None
+        If not None, a ValueError is raised when the fingerprint of the
+        geometry in the file is different.
+    mmap_mode : str or None
+        Passed on to numpy.memmap(). If None, the arrays are read into
+        memory.
+
+    Returns
+    -------
+    (header, arrays) : (dict, dict of numpy.arrays)
+    """
+    header, start = _read_header(path)
+    if fingerprint is not None and header["fingerprint"] != fingerprint:
+        raise ValueError(
+            "The fingerprint of the geometry in '{:s}' does not match. "
+            "The histogram has other bins.".format(path)
+        )
+
+    arrays = {}
+    for key in header["arrays"]:
+        a = header["arrays"][key]
+        dtype = np.dtype(a["dtype"])
+        shape = tuple(a["shape"])
+        offset = start + a["offset"]
+        if mmap_mode is None:
+            arrays[key] = np.fromfile(
+                path, dtype=dtype, count=int(np.prod(shape)), offset=offset
+            ).reshape(shape)
+        else:
+            arrays[key] = np.memmap(
+                path, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape
+            )
+    return header, arrays
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(
+                "Expected '{:s}' to be a spherical_histogram.".format(path)
+            )
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length).decode())
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(
+            "Expected format_version {:d}, but '{:s}' has {:d}.".format(
+                FORMAT_VERSION, path, header["format_version"]
+            )
+        )
+    return header, _data_start(header_length=header_length)
+
+
+def _data_start(header_length):
+    return _align(len(MAGIC) + 8 + header_length)
+
+
+def _align(offset):
+    return ALIGNMENT * ((offset + ALIGNMENT - 1) // ALIGNMENT)
+
+
+def _to_json_number(x):
+    if isinstance(x, np.generic):
+        x = x.item()
+    return x
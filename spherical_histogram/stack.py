@@ -0,0 +1,321 @@
+from . import geometry
+from . import accumulate
+from . import summary
+from . import raster
+from . import stream
+
+import os
+import numpy as np
+
+
+class HemisphereHistogramStack:
+    """
+    Many histograms of pointings/directions in a hemisphere which all share
+    the same bins. E.g. one histogram for each event.
+
+    Fields
+    ------
+    bin_counts : numpy.array, shape(num_histograms, num_bins)
+        The content of the bins of all histograms.
+    bin_squared_weights : numpy.array, shape(num_histograms, num_bins) or None
+        The sum of the squared weights in each bin. Only if
+        track_squared_weights is True.
+    overflow : numpy.array, shape(num_histograms, )
+        The number (sum of weights) of the directions in each histogram which
+        did not hit any bin.
+    bin_geometry : spherical_histogram.geometry.HemisphereGeometry
+        The geometry of the bins shared by all histograms.
+    """
+
+    def __init__(
+        self,
+        num_histograms,
+        num_vertices=2047,
+        max_zenith_distance_rad=np.deg2rad(89.0),
+        bin_geometry=None,
+        engine="merlict",
+        cache_dir=None,
+        dtype=int,
+        track_squared_weights=False,
+        mmap_dir=None,
+    ):
+        """
+        See HemisphereHistogram.__init__() for the bin_geometry.
+
+        Parameters
+        ----------
+        num_histograms : int
+            The number of histograms in the stack.
+        mmap_dir : str or None
+            If not None, the bins are memory mapped '.npy' files in this
+            directory. So the stack can be larger than the memory.
+        """
+        if bin_geometry is None:
+            self.bin_geometry = geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+                num_vertices=num_vertices,
+                max_zenith_distance_rad=max_zenith_distance_rad,
+                engine=engine,
+                cache_dir=cache_dir,
+            )
+        else:
+            self.bin_geometry = bin_geometry
+
+        assert num_histograms >= 0
+        self.num_histograms = int(num_histograms)
+        self.dtype = np.dtype(dtype)
+        self.track_squared_weights = bool(track_squared_weights)
+        self.mmap_dir = mmap_dir
+        self.reset()
+
+    @property
+    def num_bins(self):
+        return len(self.bin_geometry.faces)
+
+    def reset(self):
+        """
+        Resets the bin content ``bin_counts`` and  the ``overflow`` of all
+        histograms to zero.
+        """
+        shape = (self.num_histograms, self.num_bins)
+        self.overflow = np.zeros(self.num_histograms, dtype=self.dtype)
+        self.bin_counts = self._zeros(
+            key="bin_counts", shape=shape, dtype=self.dtype
+        )
+        if self.track_squared_weights:
+            self.bin_squared_weights = self._zeros(
+                key="bin_squared_weights", shape=shape, dtype=float
+            )
+        else:
+            self.bin_squared_weights = None
+
+    def _zeros(self, key, shape, dtype):
+        if self.mmap_dir is None:
+            return np.zeros(shape=shape, dtype=dtype)
+        os.makedirs(self.mmap_dir, exist_ok=True)
+        out = np.lib.format.open_memmap(
+            os.path.join(self.mmap_dir, key + ".npy"),
+            mode="w+",
+            dtype=dtype,
+            shape=shape,
+        )
+        out[:] = 0
+        return out
+
+    def __len__(self):
+        return self.num_histograms
+
+    def __getitem__(self, i):
+        """
+        Returns a copy of the i-th histogram as a HemisphereHistogram.
+        """
+        from . import HemisphereHistogram
+
+        hist = HemisphereHistogram(
+            bin_geometry=self.bin_geometry,
+            dtype=self.dtype,
+            track_squared_weights=self.track_squared_weights,
+        )
+        hist.bin_counts[:] = self.bin_counts[i]
+        if self.track_squared_weights:
+            hist.bin_squared_weights[:] = self.bin_squared_weights[i]
+        hist.overflow = self.overflow[i].item()
+        return hist
+
+    def solid_angle(self, threshold=1):
+        """
+        Returns for each histogram the total solid angle of all bins with a
+        content >= threshold.
+
+        Parameters
+        ----------
+        threshold : int / float or array of ints / floats
+            Minimum content of a bin in order to sum its solid angle.
+
+        Returns
+        -------
+        solid_angle : numpy.array, shape(num_histograms, ) + threshold.shape
+        """
+        return summary.solid_angle_above(
+            bin_counts=self.bin_counts,
+            faces_solid_angles=self.bin_geometry.faces_solid_angles,
+            threshold=threshold,
+        )
+
+    def containment_solid_angle(self, fraction):
+        """
+        Returns for each histogram the smallest solid angle which contains
+        the fraction of its content. See
+        HemisphereHistogram.containment_solid_angle().
+
+        Returns
+        -------
+        solid_angle : numpy.array, shape(num_histograms, ) + fraction.shape
+        """
+        return summary.containment_solid_angle(
+            bin_counts=self.bin_counts,
+            faces_solid_angles=self.bin_geometry.faces_solid_angles,
+            fraction=fraction,
+        )
+
+    def moments(self):
+        """
+        Returns the moments of each histogram.
+        See spherical_histogram.summary.moments().
+
+        The histograms are processed in chunks of rows with about
+        spherical_histogram.stream.CHUNK_SIZE bins each to limit the memory
+        of the intermediate arrays.
+        """
+        num_histograms, num_bins = self.bin_counts.shape
+        num_rows = max(1, stream.CHUNK_SIZE // max(1, num_bins))
+        if num_histograms <= num_rows:
+            return summary.moments(
+                bin_counts=self.bin_counts,
+                faces_centroids=self.bin_geometry.faces_centroids,
+            )
+        chunks = []
+        for start in range(0, num_histograms, num_rows):
+            chunks.append(
+                summary.moments(
+                    bin_counts=self.bin_counts[start : start + num_rows],
+                    faces_centroids=self.bin_geometry.faces_centroids,
+                )
+            )
+        return {
+            key: np.concatenate([chunk[key] for chunk in chunks])
+            for key in chunks[0]
+        }
+
+    def assign_cx_cy_cz(self, histograms, cx, cy, cz, weights=None):
+        """
+        Assigns directions to the histograms.
+
+        Parameters
+        ----------
+        histograms : int or array of ints
+            The index of the histogram of each direction.
+        cx, cy, cz : float or array of floats
+            The directions.
+        weights : float or array of floats or None
+            The optional weights of the directions.
+        """
+        faces = self.bin_geometry.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+        self._assign(histograms=histograms, faces=faces, weights=weights)
+
+    def assign_cx_cy(self, histograms, cx, cy, weights=None):
+        faces = self.bin_geometry.query_cx_cy(cx=cx, cy=cy)
+        self._assign(histograms=histograms, faces=faces, weights=weights)
+
+    def assign_azimuth_zenith(
+        self, histograms, azimuth_rad, zenith_rad, weights=None
+    ):
+        faces = self.bin_geometry.query_azimuth_zenith(
+            azimuth_rad=azimuth_rad,
+            zenith_rad=zenith_rad,
+        )
+        self._assign(histograms=histograms, faces=faces, weights=weights)
+
+    def assign_cone_cx_cy_cz(
+        self, histograms, cx, cy, cz, half_angle_rad, weights=None
+    ):
+        """
+        Assigns each face touching a cone once to the cone's histogram.
+        """
+        self._assign_cones(
+            histograms=histograms,
+            faces=self.bin_geometry.query_cone_cx_cy_cz(
+                cx=cx, cy=cy, cz=cz, half_angle_rad=half_angle_rad
+            ),
+            weights=weights,
+        )
+
+    def assign_cone_cx_cy(
+        self, histograms, cx, cy, half_angle_rad, weights=None
+    ):
+        self._assign_cones(
+            histograms=histograms,
+            faces=self.bin_geometry.query_cone_cx_cy(
+                cx=cx, cy=cy, half_angle_rad=half_angle_rad
+            ),
+            weights=weights,
+        )
+
+    def assign_cone_azimuth_zenith(
+        self, histograms, azimuth_rad, zenith_rad, half_angle_rad, weights=None
+    ):
+        self._assign_cones(
+            histograms=histograms,
+            faces=self.bin_geometry.query_cone_azimuth_zenith(
+                azimuth_rad=azimuth_rad,
+                zenith_rad=zenith_rad,
+                half_angle_rad=half_angle_rad,
+            ),
+            weights=weights,
+        )
+
+    def _assign_cones(self, histograms, faces, weights=None):
+        if isinstance(faces, tuple):
+            # many cones in (indptr, faces)
+            indptr, faces = faces
+            num_cones = len(indptr) - 1
+            num_faces = np.diff(indptr)
+            histograms = np.broadcast_to(np.asarray(histograms), (num_cones,))
+            histograms = np.repeat(histograms, num_faces)
+            if weights is not None:
+                weights = np.broadcast_to(np.asarray(weights), (num_cones,))
+                weights = np.repeat(weights, num_faces)
+        self._assign(histograms=histograms, faces=faces, weights=weights)
+
+    def _assign(self, histograms, faces, weights=None):
+        faces = np.asarray(faces, dtype=int).reshape(-1)
+        histograms = np.asarray(histograms, dtype=int).reshape(-1)
+        histograms = np.broadcast_to(histograms, faces.shape)
+        if np.any(histograms < 0) or np.any(histograms >= self.num_histograms):
+            raise IndexError(
+                "Expected histograms in range 0 to {:d}.".format(
+                    self.num_histograms
+                )
+            )
+
+        hit = faces >= 0
+        flat_bins = np.where(hit, histograms * self.num_bins + faces, -1)
+        accumulate.add_to_bins(
+            bin_counts=self.bin_counts.reshape(-1),
+            bins=flat_bins,
+            weights=weights,
+            bin_squared_weights=(
+                None
+                if self.bin_squared_weights is None
+                else self.bin_squared_weights.reshape(-1)
+            ),
+        )
+        accumulate.add_to_bins(
+            bin_counts=self.overflow,
+            bins=np.where(hit, -1, histograms),
+            weights=weights,
+        )
+
+    def plot_raster(
+        self, i, path, num_pixel=1080, fill_color=raster.ROYAL_BLUE
+    ):
+        """
+        Writes a raster image of the i-th histogram to path.
+        See HemisphereHistogram.plot_raster().
+        """
+        rgba = raster.render(
+            pixel_to_face=self.bin_geometry.pixel_to_face(num_pixel),
+            faces_values=raster.normalized(self.bin_counts[i]),
+            fill_color=fill_color,
+        )
+        raster.write(path=path, rgba=rgba)
+
+    def to_dict(self):
+        out = {"overflow": self.overflow, "bin_counts": self.bin_counts}
+        if self.bin_squared_weights is not None:
+            out["bin_squared_weights"] = self.bin_squared_weights
+        return out
+
+    def __repr__(self):
+        return "{:s}(num_histograms={:d})".format(
+            self.__class__.__name__, self.num_histograms
+        )
@@ -0,0 +1,94 @@
+"""
+Re-chunk streams of directions into batches of constant size.
+
+The engines to find the bins of directions are most efficient for batches of
+some ten thousand directions. Smaller batches pay the overhead of the python
+calls, larger batches fall out of the cache. A stream of chunks, e.g. read
+from event files, is cut and joined into batches of chunk_size, so the peak
+memory does not depend on the total number of directions.
+
+The histograms take the chunk_size from their bin_geometry. It defaults to
+CHUNK_SIZE for all engines, and can be set per geometry. For 2**20 directions
+on geometries with 2047 and 10**5 vertices, all engines took about the same
+time for chunk sizes from 2**14 to 2**18, and were up to two times slower
+for 2**10.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 2**16
+
+
+def rechunk(chunks, chunk_size=CHUNK_SIZE):
+    """
+    Yields the columns in chunks in batches of chunk_size rows.
+
+    Parameters
+    ----------
+    chunks : iterable of tuples of array like
+        Each chunk is a tuple of columns, e.g. (cx, cy, cz). All columns in a
+        chunk must have the same length. Columns may also be scalars which
+        are repeated for each row of the chunk, e.g. a weight.
+    chunk_size : int
+        The number of rows in each batch. Only the last batch can be
+        smaller.
+
+    Yields
+    ------
+    batch : tuple of numpy.arrays
+        The columns of the batch.
+    """
+    chunk_size = int(chunk_size)
+    assert chunk_size > 0
+    buffer = []
+    num_buffered = 0
+
+    for chunk in chunks:
+        chunk = _columns(chunk)
+        size = len(chunk[0])
+        start = 0
+
+        if num_buffered > 0:
+            take = min(chunk_size - num_buffered, size)
+            buffer.append(tuple(np.array(c[0:take]) for c in chunk))
+            num_buffered += take
+            start = take
+            if num_buffered == chunk_size:
+                yield _concatenate(buffer)
+                buffer = []
+                num_buffered = 0
+
+        while size - start >= chunk_size:
+            yield tuple(c[start : start + chunk_size] for c in chunk)
+            start += chunk_size
+
+        if start < size:
+            # copy, so the chunk can be released
+            buffer.append(tuple(np.array(c[start:]) for c in chunk))
+            num_buffered += size - start
+
+    if num_buffered > 0:
+        yield _concatenate(buffer)
+
+
+def _columns(chunk):
+    columns = tuple(np.atleast_1d(np.asarray(c)) for c in chunk)
+    assert len(columns) > 0
+    for c in columns:
+        if c.ndim != 1:
+            raise ValueError("Expected the columns to be one dimensional.")
+    try:
+        # scalars, e.g. a weight for the whole chunk, are repeated
+        return tuple(np.broadcast_arrays(*columns))
+    except ValueError:
+        raise ValueError(
+            "Expected the columns in a chunk to have the same length, "
+            "but got lengths {:s}.".format(str([len(c) for c in columns]))
+        )
+
+
+def _concatenate(buffer):
+    num_columns = len(buffer[0])
+    return tuple(
+        np.concatenate([b[i] for b in buffer]) for i in range(num_columns)
+    )
@@ -0,0 +1,185 @@
+"""
+Summaries of the content of histograms.
+
+The functions accept the bin_counts of one histogram, shape(num_bins, ), or
+of a stack of histograms, shape(num_histograms, num_bins).
+"""
+import numpy as np
+
+
+def solid_angle_above(bin_counts, faces_solid_angles, threshold):
+    """
+    Returns the total solid angle of all bins with a content >= threshold.
+
+    Parameters
+    ----------
+    bin_counts : numpy.array, shape(num_bins, ) or (num_histograms, num_bins)
+        The content of the bins.
+    faces_solid_angles : numpy.array, shape(num_bins, )
+        The solid angle of the bins.
+    threshold : float or array of floats
+        Minimum content of a bin in order to sum its solid angle.
+
+    Returns
+    -------
+    solid_angle : float or numpy.array
+        Shape is bin_counts.shape[:-1] + threshold.shape.
+    """
+    bin_counts = np.asarray(bin_counts)
+    faces_solid_angles = np.asarray(faces_solid_angles, dtype=float)
+    threshold = np.asarray(threshold)
+
+    if bin_counts.ndim == 1:
+        # one sort for all thresholds
+        order = np.argsort(bin_counts, kind="stable")
+        sorted_counts = bin_counts[order]
+        above_sr = np.zeros(len(order) + 1)
+        above_sr[:-1] = np.cumsum(faces_solid_angles[order][::-1])[::-1]
+        first = np.searchsorted(sorted_counts, threshold, side="left")
+        out = above_sr[first]
+    else:
+        out = np.zeros(bin_counts.shape[:-1] + threshold.shape)
+        for it in np.ndindex(threshold.shape):
+            above = bin_counts >= threshold[it]
+            out[(Ellipsis,) + it] = above @ faces_solid_angles
+
+    if out.ndim == 0:
+        return float(out)
+    return out
+
+
+def containment_solid_angle(bin_counts, faces_solid_angles, fraction):
+    """
+    Returns the smallest solid angle which contains the fraction of the
+    total content. The bins are added in the order of their density, this
+    is content over solid angle, starting with the densest bin.
+
+    Parameters
+    ----------
+    bin_counts : numpy.array, shape(num_bins, ) or (num_histograms, num_bins)
+        The content of the bins.
+    faces_solid_angles : numpy.array, shape(num_bins, )
+        The solid angle of the bins.
+    fraction : float or array of floats
+        The fraction of the total content, e.g. 0.68.
+
+    Returns
+    -------
+    solid_angle : float or numpy.array
+        Shape is bin_counts.shape[:-1] + fraction.shape. Zero for a
+        histogram without content.
+    """
+    bin_counts = np.asarray(bin_counts, dtype=float)
+    faces_solid_angles = np.asarray(faces_solid_angles, dtype=float)
+    fraction = np.asarray(fraction, dtype=float)
+    assert np.all(fraction >= 0.0) and np.all(fraction <= 1.0)
+
+    is_single = bin_counts.ndim == 1
+    counts = np.atleast_2d(bin_counts)
+    counts = counts.reshape((-1, counts.shape[-1]))
+
+    density = counts / faces_solid_angles
+    order = np.argsort(-density, axis=1, kind="stable")
+    cum_counts = np.cumsum(np.take_along_axis(counts, order, axis=1), axis=1)
+    cum_sr = np.cumsum(faces_solid_angles[order], axis=1)
+    total = cum_counts[:, -1]
+
+    out = np.zeros(shape=(len(counts),) + fraction.shape)
+    rows = np.arange(len(counts))
+    for it in np.ndindex(fraction.shape):
+        target = fraction[it] * total
+        # The first bin where the content is reached. The factor protects
+        # against the round off in the cumsum.
+        reached = cum_counts >= target[:, np.newaxis] * (1.0 - 1e-12)
+        first = np.argmax(reached, axis=1)
+        out[(Ellipsis,) + it] = np.where(
+            target > 0.0, cum_sr[rows, first], 0.0
+        )
+
+    out = out.reshape(bin_counts.shape[:-1] + fraction.shape)
+    if is_single and out.ndim == 0:
+        return float(out)
+    return out
+
+
+def moments(bin_counts, faces_centroids):
+    """
+    Estimates the mean direction and the spread of the content. Each bin's
+    content is located at the bin's centroid.
+
+    Parameters
+    ----------
+    bin_counts : numpy.array, shape(num_bins, ) or (num_histograms, num_bins)
+        The content of the bins.
+    faces_centroids : numpy.array, shape(num_bins, 3)
+        The centroids of the bins on the unit-sphere.
+
+    Returns
+    -------
+    moments : dict
+        mean_direction : shape(..., 3)
+            The normalized sum of the centroids weighted with the content.
+        resultant_length : shape(...)
+            The length of the weighted sum over the sum of the weights.
+            One when all content is in one direction.
+        spread_rad : shape(...)
+            The root mean square of the angle between the centroids and the
+            mean_direction.
+        tangent_basis : shape(..., 2, 3)
+            Two unit vectors perpendicular to the mean_direction. The first
+            is perpendicular to the z-axis, or to the x-axis when the
+            mean_direction is close to the z-axis.
+        tangent_covariance : shape(..., 2, 2)
+            The covariance of the centroids in the tangent_basis. The
+            centroids are mapped into the tangent plane keeping their angle
+            to the mean_direction (azimuthal equidistant projection).
+        All are NaN for a histogram without content.
+    """
+    bin_counts = np.asarray(bin_counts, dtype=float)
+    centroids = np.asarray(faces_centroids, dtype=float)
+    shape = bin_counts.shape[:-1]
+    w = bin_counts.reshape((-1, bin_counts.shape[-1]))
+
+    total = np.sum(w, axis=1)
+    resultant = w @ centroids
+    norm = np.linalg.norm(resultant, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = resultant / norm[:, np.newaxis]
+        resultant_length = norm / total
+
+    # tangent basis
+    ref = np.zeros(shape=mean.shape)
+    near_z = np.abs(mean[:, 2]) > 0.9
+    ref[near_z, 0] = 1.0
+    ref[~near_z, 2] = 1.0
+    u1 = np.cross(ref, mean)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        u1 /= np.linalg.norm(u1, axis=1)[:, np.newaxis]
+    u2 = np.cross(mean, u1)
+
+    # azimuthal equidistant projection of the centroids
+    cos_theta = np.clip(mean @ centroids.T, -1.0, 1.0)
+    theta = np.arccos(cos_theta)
+    sin_theta = np.sqrt(1.0 - cos_theta**2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(sin_theta > 1e-12, theta / sin_theta, 1.0)
+    x = scale * (u1 @ centroids.T)
+    y = scale * (u2 @ centroids.T)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spread_rad = np.sqrt(np.sum(w * theta**2, axis=1) / total)
+        mx = np.sum(w * x, axis=1) / total
+        my = np.sum(w * y, axis=1) / total
+        cov = np.zeros(shape=(len(w), 2, 2))
+        cov[:, 0, 0] = np.sum(w * x * x, axis=1) / total - mx * mx
+        cov[:, 1, 1] = np.sum(w * y * y, axis=1) / total - my * my
+        cov[:, 0, 1] = np.sum(w * x * y, axis=1) / total - mx * my
+        cov[:, 1, 0] = cov[:, 0, 1]
+
+    return {
+        "mean_direction": mean.reshape(shape + (3,)),
+        "resultant_length": resultant_length.reshape(shape),
+        "spread_rad": spread_rad.reshape(shape),
+        "tangent_basis": np.stack([u1, u2], axis=1).reshape(shape + (2, 3)),
+        "tangent_covariance": cov.reshape(shape + (2, 2)),
+    }
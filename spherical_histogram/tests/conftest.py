@@ -0,0 +1,114 @@
+import spherical_histogram as sh
+import spherical_coordinates as sc
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geom():
+    """
+    A small geometry with the engine "grid". Modules which need an other
+    geometry define their own fixture geom.
+    """
+    return sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(80),
+        engine="grid",
+    )
+
+
+def _draw_az_zd(
+    prng,
+    size=None,
+    min_zenith_distance_rad=0.0,
+    max_zenith_distance_rad=np.deg2rad(70),
+):
+    az = prng.uniform(low=-np.pi, high=np.pi, size=size)
+    zd = prng.uniform(
+        low=min_zenith_distance_rad, high=max_zenith_distance_rad, size=size
+    )
+    return az, zd
+
+
+def _draw_cx_cy_cz(prng, size=None, max_zenith_distance_rad=np.deg2rad(70)):
+    az, zd = _draw_az_zd(
+        prng=prng, size=size, max_zenith_distance_rad=max_zenith_distance_rad
+    )
+    return sc.az_zd_to_cx_cy_cz(azimuth_rad=az, zenith_rad=zd)
+
+
+def _draw_cx_cy_cz_on_sphere(prng, size):
+    xyz = prng.normal(size=(size, 3))
+    xyz /= np.linalg.norm(xyz, axis=1)[:, np.newaxis]
+    return xyz[:, 0], xyz[:, 1], xyz[:, 2]
+
+
+def _make_hist(
+    dtype=int,
+    track_squared_weights=False,
+    seed=8,
+    size=1000,
+    max_zenith_distance_rad=np.deg2rad(70),
+):
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+        dtype=dtype,
+        track_squared_weights=track_squared_weights,
+    )
+    prng = np.random.Generator(np.random.PCG64(seed))
+    az, zd = _draw_az_zd(
+        prng=prng, size=size, max_zenith_distance_rad=max_zenith_distance_rad
+    )
+    if np.issubdtype(dtype, np.integer):
+        weights = None
+    else:
+        weights = prng.uniform(size=size)
+    hist.assign_azimuth_zenith(azimuth_rad=az, zenith_rad=zd, weights=weights)
+    return hist
+
+
+def _assert_same_faces_except_on_edges(faces, expected, max_num_differing):
+    # Directions right on an edge may be assigned to either face.
+    assert np.sum(faces != expected) < max_num_differing
+
+
+@pytest.fixture(scope="session")
+def draw_az_zd():
+    """
+    Draws azimuth uniform and zenith distance uniform in a range, by
+    default from 0 to 70 deg.
+    """
+    return _draw_az_zd
+
+
+@pytest.fixture(scope="session")
+def draw_cx_cy_cz():
+    """
+    Like draw_az_zd but returns (cx, cy, cz).
+    """
+    return _draw_cx_cy_cz
+
+
+@pytest.fixture(scope="session")
+def draw_cx_cy_cz_on_sphere():
+    """
+    Draws directions uniform on the full sphere, also below the horizon.
+    """
+    return _draw_cx_cy_cz_on_sphere
+
+
+@pytest.fixture(scope="session")
+def make_hist():
+    """
+    Makes a histogram with 200 bins up to 60 deg, engine "grid", and fills
+    it with directions up to max_zenith_distance_rad, so some overflow.
+    Weighted when dtype is not an integer.
+    """
+    return _make_hist
+
+
+@pytest.fixture(scope="session")
+def assert_same_faces_except_on_edges():
+    return _assert_same_faces_except_on_edges
@@ -0,0 +1,24 @@
+import spherical_histogram as sh
+import spherical_histogram.benchmark
+import json
+import os
+
+
+def test_benchmark_runs_and_writes_json(tmp_path):
+    path = os.path.join(tmp_path, "results.json")
+    sh.benchmark.main(
+        ["--out", path, "--engines", "grid", "--repeat", "1", "--quick"]
+    )
+    with open(path, "rt") as f:
+        report = json.loads(f.read())
+
+    names = set(r["name"] for r in report["results"])
+    assert "geometry_build" in names
+    assert "query_cx_cy_cz" in names
+    assert "query_cone_cx_cy_cz" in names
+    assert "query_cone_weiths_azimuth_zenith" in names
+    assert "assign" in names
+    assert "assign_parallel_cx_cy_cz" in names
+    assert "plot" in names
+    for r in report["results"]:
+        assert len(r["seconds"]) == 1
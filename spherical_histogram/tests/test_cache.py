@@ -0,0 +1,61 @@
+import spherical_histogram as sh
+import numpy as np
+
+
+def test_read_or_make(tmp_path):
+    cache_dir = str(tmp_path)
+    made = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(80),
+        cache_dir=cache_dir,
+    )
+
+    for engine in ["merlict", "grid"]:
+        read = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+            num_vertices=200,
+            max_zenith_distance_rad=np.deg2rad(80),
+            engine=engine,
+            cache_dir=cache_dir,
+        )
+        assert read.engine == engine
+        np.testing.assert_array_equal(read.vertices, made.vertices)
+        np.testing.assert_array_equal(read.faces, made.faces)
+        np.testing.assert_array_equal(
+            read.faces_solid_angles, made.faces_solid_angles
+        )
+        assert read.vertices_to_faces_map == made.vertices_to_faces_map
+        np.testing.assert_array_equal(
+            read.faces_neighbors, made.faces_neighbors
+        )
+
+        az = np.linspace(-3.0, 3.0, 100)
+        zd = np.linspace(np.deg2rad(1), np.deg2rad(85), 100)
+        np.testing.assert_array_equal(
+            read.query_azimuth_zenith(azimuth_rad=az, zenith_rad=zd),
+            made.query_azimuth_zenith(azimuth_rad=az, zenith_rad=zd),
+        )
+
+
+def test_write_does_not_build_lazy_tree(tmp_path):
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(80),
+        engine="grid",
+    )
+    path = str(tmp_path / "geometry")
+    sh.cache.write(path=path, bin_geometry=geom)
+    assert geom._tree is None
+
+    read = sh.cache.read(path=path, engine="grid")
+    np.testing.assert_array_equal(read.faces, geom.faces)
+
+
+def test_key_depends_on_parameters():
+    a = sh.cache.make_key(num_vertices=200, max_zenith_distance_rad=1.0)
+    b = sh.cache.make_key(num_vertices=201, max_zenith_distance_rad=1.0)
+    c = sh.cache.make_key(num_vertices=200, max_zenith_distance_rad=1.1)
+    assert a != b
+    assert a != c
+    assert a == sh.cache.make_key(
+        num_vertices=200, max_zenith_distance_rad=1.0
+    )
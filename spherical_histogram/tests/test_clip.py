@@ -0,0 +1,129 @@
+import spherical_histogram as sh
+import spherical_coordinates as sc
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geom():
+    return sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=1000,
+        max_zenith_distance_rad=np.deg2rad(89),
+        engine="grid",
+    )
+
+
+def zenith_distances(vertices):
+    _, zd = sc.cx_cy_cz_to_az_zd(
+        cx=vertices[:, 0], cy=vertices[:, 1], cz=vertices[:, 2]
+    )
+    return zd
+
+
+def test_intermediate_vertices_on_arc():
+    prng = np.random.Generator(np.random.PCG64(1))
+    size = 1000
+    cut = np.deg2rad(70)
+    a = np.array(
+        sc.az_zd_to_cx_cy_cz(
+            azimuth_rad=prng.uniform(-np.pi, np.pi, size),
+            zenith_rad=prng.uniform(0, cut, size),
+        )
+    ).T
+    b = np.array(
+        sc.az_zd_to_cx_cy_cz(
+            azimuth_rad=prng.uniform(-np.pi, np.pi, size),
+            zenith_rad=prng.uniform(cut, np.pi, size),
+        )
+    ).T
+    flip = prng.uniform(size=size) < 0.5
+    a[flip], b[flip] = b[flip].copy(), a[flip].copy()
+
+    p = sh.mesh.estimate_intermediate_vertices_at_zenith(
+        a=a, b=b, zenith_rad=cut
+    )
+    np.testing.assert_allclose(zenith_distances(p), cut, atol=1e-12)
+    # on the great circle, and between a and b
+    np.testing.assert_allclose(
+        np.einsum("ij,ij->i", np.cross(a, b), p), 0.0, atol=1e-12
+    )
+    assert np.all(
+        np.einsum("ij,ij->i", np.cross(a, p), np.cross(p, b)) > -1e-12
+    )
+
+
+def test_classify_faces(geom):
+    cut = np.deg2rad(60)
+    classes = sh.mesh.list_faces_inside_onedge_outside_zenith_distance(
+        faces=geom.faces, vertices=geom.vertices, zenith_rad=cut
+    )
+    inside, onedge, outside = classes
+    zd = zenith_distances(geom.vertices)
+    num_outside = np.sum(zd[geom.faces] >= cut, axis=1)
+    np.testing.assert_array_equal(inside, np.flatnonzero(num_outside == 0))
+    np.testing.assert_array_equal(outside, np.flatnonzero(num_outside == 3))
+    assert len(inside) + len(onedge) + len(outside) == len(geom.faces)
+
+
+@pytest.mark.parametrize("cut_deg", [30, 60, 80])
+def test_clipped_mesh_ends_at_cut(geom, cut_deg):
+    cut = np.deg2rad(cut_deg)
+    vertices, faces = sh.mesh.clip_faces_at_zenith(
+        vertices=geom.vertices,
+        faces=geom.faces,
+        max_zenith_distance_rad=cut,
+    )
+    zd = zenith_distances(vertices)
+    assert np.all(zd <= cut + 1e-12)
+
+    # the vertices on the boundary are on the cut
+    edges = np.sort(
+        np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2),
+        axis=1,
+    )
+    keys, counts = np.unique(
+        edges[:, 0] * len(vertices) + edges[:, 1], return_counts=True
+    )
+    assert np.all(counts <= 2)
+    boundary = keys[counts == 1]
+    boundary = np.unique(
+        np.r_[boundary // len(vertices), boundary % len(vertices)]
+    )
+    np.testing.assert_allclose(zd[boundary], cut, atol=1e-12)
+
+    # orientation is kept
+    normals = np.cross(
+        vertices[faces[:, 1]] - vertices[faces[:, 0]],
+        vertices[faces[:, 2]] - vertices[faces[:, 0]],
+    )
+    assert np.all(np.einsum("ij,ij->i", normals, vertices[faces[:, 0]]) > 0)
+
+    solid_angles = sh.mesh.estimate_solid_angles(
+        vertices=vertices, faces=faces
+    )
+    assert np.all(solid_angles > 0)
+    np.testing.assert_allclose(
+        np.sum(solid_angles), 2 * np.pi * (1 - np.cos(cut)), rtol=1e-3
+    )
+
+
+def test_clip_beyond_mesh_changes_nothing(geom):
+    clipped = geom.clip_at_zenith(max_zenith_distance_rad=np.deg2rad(89))
+    assert len(clipped.faces) == len(geom.faces)
+    np.testing.assert_allclose(
+        clipped.faces_solid_angles, geom.faces_solid_angles
+    )
+
+
+def test_histogram_on_clipped_geometry(geom):
+    cut = np.deg2rad(45)
+    clipped = geom.clip_at_zenith(max_zenith_distance_rad=cut)
+    assert clipped.engine == geom.engine
+
+    prng = np.random.Generator(np.random.PCG64(2))
+    zd = prng.uniform(0, np.deg2rad(89), 10000)
+    az = prng.uniform(-np.pi, np.pi, 10000)
+    hist = sh.HemisphereHistogram(bin_geometry=clipped)
+    hist.assign_azimuth_zenith(azimuth_rad=az, zenith_rad=zd)
+    # Only the thin gaps between the boundary edges and the cut differ.
+    assert abs(hist.overflow - np.sum(zd > cut)) < 0.01 * len(zd)
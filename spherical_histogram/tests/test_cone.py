@@ -0,0 +1,123 @@
+import spherical_histogram as sh
+import numpy as np
+import pytest
+
+
+def test_many_cones_same_as_one_by_one():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+    )
+    prng = np.random.Generator(np.random.PCG64(7))
+    num = 50
+    az = prng.uniform(low=-np.pi, high=np.pi, size=num)
+    zd = prng.uniform(low=0.0, high=np.deg2rad(80), size=num)
+    ha = prng.uniform(low=0.0, high=np.deg2rad(20), size=num)
+
+    indptr, faces = hist.bin_geometry.query_cone_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, half_angle_rad=ha
+    )
+    assert len(indptr) == num + 1
+
+    expected_bin_counts = np.zeros(len(hist.bin_counts), dtype=int)
+    for i in range(num):
+        single = hist.bin_geometry.query_cone_azimuth_zenith(
+            azimuth_rad=az[i], zenith_rad=zd[i], half_angle_rad=ha[i]
+        )
+        assert len(single) >= 1
+        np.testing.assert_array_equal(single, faces[indptr[i] : indptr[i + 1]])
+        expected_bin_counts[single] += 1
+
+    hist.assign_cone_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, half_angle_rad=ha
+    )
+    np.testing.assert_array_equal(hist.bin_counts, expected_bin_counts)
+
+
+def test_one_half_angle_for_many_cones():
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+    )
+    indptr, faces = geom.query_cone_cx_cy(
+        cx=[0.0, 0.1], cy=[0.0, 0.2], half_angle_rad=np.deg2rad(30)
+    )
+    assert len(indptr) == 3
+    assert indptr[1] > 3
+    assert indptr[2] - indptr[1] > 3
+
+
+def test_cone_weights_quadrature():
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+    )
+    kwargs = {
+        "azimuth_rad": 0.3,
+        "zenith_rad": 0.4,
+        "half_angle_rad": np.deg2rad(25),
+    }
+    faces, weights = geom.query_cone_weiths_azimuth_zenith(
+        method="quadrature", num_subdivisions=64, **kwargs
+    )
+    faces_again, weights_again = geom.query_cone_weiths_azimuth_zenith(
+        method="quadrature", num_subdivisions=64, **kwargs
+    )
+    np.testing.assert_array_equal(faces, faces_again)
+    np.testing.assert_array_equal(weights, weights_again)
+    assert np.abs(np.sum(weights) - 1.0) < 1e-3
+
+    mc_faces, mc_weights = geom.query_cone_weiths_azimuth_zenith(
+        method="monte_carlo", **kwargs
+    )
+    expected = np.zeros(len(geom.faces))
+    expected[mc_faces] = mc_weights
+    found = np.zeros(len(geom.faces))
+    found[faces] = weights
+    np.testing.assert_allclose(found, expected, atol=5e-3)
+
+
+def test_cone_weights_quadrature_tiny_cone():
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+    )
+    center = np.mean(geom.vertices[geom.faces[13]], axis=0)
+    center /= np.linalg.norm(center)
+    az, zd = sh.spherical_coordinates.cx_cy_cz_to_az_zd(*center)
+    faces, weights = geom.query_cone_weiths_azimuth_zenith(
+        azimuth_rad=az,
+        zenith_rad=zd,
+        half_angle_rad=np.deg2rad(0.5),
+        method="quadrature",
+    )
+    np.testing.assert_array_equal(faces, [13])
+
+
+@pytest.mark.parametrize("half_angle_deg", [0.01, 0.05, 0.1, 0.2])
+def test_cone_weights_quadrature_cone_much_smaller_than_faces(half_angle_deg):
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+    )
+    a, b = geom.vertices[geom.faces[13][0:2]]
+    center_of_face = np.mean(geom.vertices[geom.faces[13]], axis=0)
+    center_of_edge = a + b
+
+    for center in [center_of_face, center_of_edge]:
+        center /= np.linalg.norm(center)
+        az, zd = sh.spherical_coordinates.cx_cy_cz_to_az_zd(*center)
+        faces, weights = geom.query_cone_weiths_azimuth_zenith(
+            azimuth_rad=az,
+            zenith_rad=zd,
+            half_angle_rad=np.deg2rad(half_angle_deg),
+            method="quadrature",
+        )
+        assert 13 in faces
+        assert len(faces) <= 2
+        assert np.sum(weights) == pytest.approx(1.0, abs=1e-6)
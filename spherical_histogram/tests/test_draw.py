@@ -0,0 +1,71 @@
+import spherical_histogram as sh
+import spherical_coordinates
+import numpy as np
+import pytest
+
+
+def test_points_are_uniform_in_spherical_triangle(geom):
+    prng = np.random.Generator(np.random.PCG64(12))
+    iface = 17
+    size = 100 * 1000
+    faces = np.array([geom.faces[iface]] * size)
+    points = sh.mesh.draw_points_on_spherical_triangles(
+        prng=prng, vertices=geom.vertices, faces=faces
+    )
+    np.testing.assert_allclose(np.linalg.norm(points, axis=1), 1.0)
+    found = geom.query_cx_cy_cz(points[:, 0], points[:, 1], points[:, 2])
+    assert np.all(found == iface)
+
+    # the fraction of points inside a cone equals the fraction of area
+    axis = np.mean(geom.vertices[geom.faces[iface]], axis=0)
+    axis /= np.linalg.norm(axis)
+    cos_half_angle = np.cos(0.05)
+    fraction = np.mean(points @ axis >= cos_half_angle)
+    az, zd = spherical_coordinates.cx_cy_cz_to_az_zd(
+        cx=axis[0], cy=axis[1], cz=axis[2]
+    )
+    faces, weights = geom.query_cone_weiths_azimuth_zenith(
+        azimuth_rad=az,
+        zenith_rad=zd,
+        half_angle_rad=0.05,
+        method="quadrature",
+        num_subdivisions=64,
+    )
+    cone_solid_angle_sr = 2.0 * np.pi * (1.0 - cos_half_angle)
+    overlap = weights[faces == iface][0] * cone_solid_angle_sr
+    assert fraction == pytest.approx(
+        overlap / geom.faces_solid_angles[iface], abs=0.01
+    )
+
+
+def test_draw_from_histogram(geom):
+    hist = sh.HemisphereHistogram(bin_geometry=geom)
+    prng = np.random.Generator(np.random.PCG64(13))
+
+    with pytest.raises(ValueError):
+        hist.draw(prng=prng)
+
+    hist.bin_counts[3] = 1
+    hist.bin_counts[5] = 3
+
+    cx, cy, cz = hist.draw(prng=prng, size=40 * 1000)
+    faces = geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert set(np.unique(faces)) == {3, 5}
+    assert np.mean(faces == 5) == pytest.approx(0.75, abs=0.01)
+
+    cx, cy, cz = hist.draw(prng=prng)
+    assert geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz) in [3, 5]
+
+    # the table follows the content
+    hist.reset()
+    hist.assign_cx_cy(cx=0.0, cy=0.0)
+    cx, cy, cz = hist.draw(prng=prng, size=100)
+    faces = geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert np.all(faces == geom.query_cx_cy(cx=0.0, cy=0.0))
+
+    # also when the bins are written to directly
+    hist.bin_counts[:] = 0
+    hist.bin_counts[7] = 2
+    cx, cy, cz = hist.draw(prng=prng, size=100)
+    faces = geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert np.all(faces == 7)
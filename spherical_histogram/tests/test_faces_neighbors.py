@@ -0,0 +1,70 @@
+from spherical_histogram import mesh
+import numpy as np
+
+
+def test_neighbors_share_edge():
+    vertices = mesh.make_vertices(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(80)
+    )
+    faces = mesh.make_faces(vertices=vertices)
+    faces_neighbors = mesh.estimate_faces_neighbors(faces=faces)
+    assert faces_neighbors.shape == (len(faces), 3)
+    assert faces_neighbors.dtype == np.int32
+
+    for iface in range(len(faces)):
+        iset = set(faces[iface])
+        expected = []
+        for jface in range(len(faces)):
+            if jface != iface and len(iset.intersection(faces[jface])) == 2:
+                expected.append(jface)
+        nn = faces_neighbors[iface]
+        assert sorted(nn[nn >= 0]) == sorted(expected)
+
+        for e in range(3):
+            if nn[e] >= 0:
+                edge = {faces[iface, e], faces[iface, (e + 1) % 3]}
+                assert edge.issubset(faces[nn[e]])
+
+    nn_map = mesh.find_faces_neighbors(faces=faces)
+    for iface in nn_map:
+        nn = faces_neighbors[iface]
+        assert sorted(nn_map[iface]) == sorted(nn[nn >= 0])
+
+
+def test_fill_faces_mask():
+    # 0 is neighbor of 1 and 2, which are neighbors of 0 only.
+    faces_neighbors = np.array([[1, 2, -1], [0, -1, -1], [-1, 0, -1]])
+    out = mesh.fill_faces_mask_if_two_neighbors_true(
+        faces_mask=[False, True, True], faces_neighbors=faces_neighbors
+    )
+    np.testing.assert_array_equal(out, [True, True, True])
+    out = mesh.fill_faces_mask_if_two_neighbors_true(
+        faces_mask=[False, True, False], faces_neighbors=faces_neighbors
+    )
+    np.testing.assert_array_equal(out, [False, True, False])
+
+
+def test_old_call_forms():
+    vertices = mesh.make_vertices(
+        num_vertices=100, max_zenith_distance_rad=np.deg2rad(80)
+    )
+    faces = mesh.make_faces(vertices=vertices)
+    vertices_to_faces_map = mesh.estimate_vertices_to_faces_map(
+        faces=faces, num_vertices=len(vertices)
+    )
+    nn_map = mesh.find_faces_neighbors(
+        faces=faces, vertices_to_faces_map=vertices_to_faces_map
+    )
+    assert nn_map == mesh.find_faces_neighbors(faces=faces)
+
+    prng = np.random.Generator(np.random.PCG64(1))
+    faces_mask = prng.uniform(size=len(faces)) < 0.3
+    np.testing.assert_array_equal(
+        mesh.fill_faces_mask_if_two_neighbors_true(
+            faces_mask=faces_mask, faces_neighbors=nn_map
+        ),
+        mesh.fill_faces_mask_if_two_neighbors_true(
+            faces_mask=faces_mask,
+            faces_neighbors=mesh.estimate_faces_neighbors(faces=faces),
+        ),
+    )
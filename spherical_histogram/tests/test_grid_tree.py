@@ -0,0 +1,55 @@
+import spherical_histogram as sh
+import numpy as np
+
+
+def test_same_faces_as_merlict(
+    draw_cx_cy_cz_on_sphere, assert_same_faces_except_on_edges
+):
+    prng = np.random.Generator(np.random.PCG64(9))
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+    )
+    gtree = sh.grid_tree.GridTree(vertices=geom.vertices, faces=geom.faces)
+
+    cx, cy, cz = draw_cx_cy_cz_on_sphere(prng=prng, size=100 * 1000)
+    expected = geom.tree.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    faces = gtree.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    assert_same_faces_except_on_edges(
+        faces=faces, expected=expected, max_num_differing=10
+    )
+    assert np.sum(faces < 0) == np.sum(expected < 0)
+
+
+def test_bounding_boxes_contain_faces():
+    prng = np.random.Generator(np.random.PCG64(9))
+    vertices = sh.mesh.make_vertices(
+        num_vertices=20, max_zenith_distance_rad=np.deg2rad(90)
+    )
+    faces = sh.mesh.make_faces(vertices=vertices)
+    boxes = sh.grid_tree.estimate_faces_cx_cy_bounding_boxes(
+        vertices=vertices, faces=faces
+    )
+    x_min, x_max, y_min, y_max = boxes
+
+    for iface in range(len(faces)):
+        a, b, c = vertices[faces[iface]]
+        for i in range(100):
+            p = sh.mesh.draw_point_on_triangle(prng=prng, a=a, b=b, c=c)
+            p /= np.linalg.norm(p)
+            assert x_min[iface] <= p[0] <= x_max[iface]
+            assert y_min[iface] <= p[1] <= y_max[iface]
+
+
+def test_single_face():
+    vertices = np.array([[0, 0, 1], [0, 0.02, 1], [0.02, 0, 1]], dtype=float)
+    vertices /= np.linalg.norm(vertices, axis=1)[:, np.newaxis]
+    geom = sh.geometry.HemisphereGeometry(
+        vertices=vertices,
+        faces=[[0, 1, 2]],
+        engine="grid",
+    )
+    assert geom.query_cx_cy(cx=0.001, cy=0.001) == 0
+    assert geom.query_cx_cy(cx=-0.001, cy=0.001) == -1
+    assert geom.query_cx_cy(cx=0.5, cy=0.5) == -1
@@ -0,0 +1,100 @@
+import spherical_histogram as sh
+import numpy as np
+import pickle
+import pytest
+
+
+@pytest.fixture(scope="module")
+def hgeom():
+    return sh.hierarchy.HierarchicalHemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=100,
+        max_zenith_distance_rad=np.deg2rad(80),
+        num_levels=3,
+        engine="grid",
+    )
+
+
+def test_subdivision_covers_parent(hgeom):
+    for level in range(1, hgeom.num_levels):
+        parent = hgeom.levels[level - 1]
+        child = hgeom.levels[level]
+        assert len(child.faces) == 4 * len(parent.faces)
+        solid_angles = child.faces_solid_angles.reshape((-1, 4))
+        np.testing.assert_allclose(
+            np.sum(solid_angles, axis=1), parent.faces_solid_angles
+        )
+        # watertight, all inner edges are shared
+        num_open_edges = np.sum(child.faces_neighbors < 0)
+        assert num_open_edges == 2 * np.sum(parent.faces_neighbors < 0)
+
+
+def test_descent_same_as_flat_lookup(
+    hgeom, draw_cx_cy_cz_on_sphere, assert_same_faces_except_on_edges
+):
+    prng = np.random.Generator(np.random.PCG64(16))
+    cx, cy, cz = draw_cx_cy_cz_on_sphere(prng=prng, size=100 * 1000)
+    finest = hgeom.finest
+    flat = sh.grid_tree.GridTree(vertices=finest.vertices, faces=finest.faces)
+
+    found = finest.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    expected = flat.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert_same_faces_except_on_edges(
+        faces=found, expected=expected, max_num_differing=10
+    )
+
+    for level in range(hgeom.num_levels):
+        coarse = hgeom.levels[level].query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+        parents = hgeom.parent_faces(
+            faces=found, level=hgeom.num_levels - 1, parent_level=level
+        )
+        np.testing.assert_array_equal(parents, coarse)
+
+
+def test_aggregate_same_as_coarse_histogram(hgeom, draw_cx_cy_cz_on_sphere):
+    prng = np.random.Generator(np.random.PCG64(17))
+    cx, cy, cz = draw_cx_cy_cz_on_sphere(prng=prng, size=10 * 1000)
+
+    fine = sh.HemisphereHistogram(bin_geometry=hgeom.finest)
+    fine.assign_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    for level in range(hgeom.num_levels):
+        coarse = sh.HemisphereHistogram(bin_geometry=hgeom.levels[level])
+        coarse.assign_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+        aggregated = hgeom.aggregate_histogram(hist=fine, to_level=level)
+        np.testing.assert_array_equal(aggregated.bin_counts, coarse.bin_counts)
+        assert aggregated.overflow == coarse.overflow
+        assert aggregated.bin_geometry is hgeom.levels[level]
+
+    stack_counts = np.array([fine.bin_counts, 2 * fine.bin_counts])
+    aggregated = hgeom.aggregate(
+        bin_counts=stack_counts, level=hgeom.num_levels - 1, to_level=0
+    )
+    assert aggregated.shape == (2, len(hgeom.levels[0].faces))
+    np.testing.assert_array_equal(aggregated[1], 2 * aggregated[0])
+
+
+def test_levels_can_make_their_tree_again(
+    hgeom, tmp_path, draw_cx_cy_cz_on_sphere, assert_same_faces_except_on_edges
+):
+    prng = np.random.Generator(np.random.PCG64(18))
+    cx, cy, cz = draw_cx_cy_cz_on_sphere(prng=prng, size=1000)
+    finest = hgeom.finest
+    assert finest.engine in sh.geometry.ENGINES
+    expected = finest.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    clipped = finest.clip_at_zenith(max_zenith_distance_rad=np.deg2rad(45))
+    assert len(clipped.faces) > 0
+    clipped.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    back = pickle.loads(pickle.dumps(finest))
+    np.testing.assert_array_equal(
+        back.query_cx_cy_cz(cx=cx, cy=cy, cz=cz), expected
+    )
+
+    path = str(tmp_path / "finest")
+    sh.cache.write(path=path, bin_geometry=finest)
+    again = sh.cache.read(path=path, engine=finest.engine)
+    found = again.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert_same_faces_except_on_edges(
+        faces=found, expected=expected, max_num_differing=3
+    )
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+
+HEAVY = [
+    "merlict",
+    "svg_cartesian_plot",
+    "triangle_mesh_io",
+    "binning_utils",
+    "solid_angle_utils",
+    "scipy",
+]
+
+
+def _modules_after(code):
+    script = code + "\nimport sys\nprint(' '.join(sys.modules))\n"
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return set(m.split(".")[0] for m in out.stdout.split())
+
+
+def test_import_does_not_load_heavy_dependencies():
+    loaded = _modules_after("import spherical_histogram")
+    for name in HEAVY:
+        assert name not in loaded, name
+
+
+def test_summing_bins_does_not_load_heavy_dependencies():
+    loaded = _modules_after(
+        "import numpy as np\n"
+        "from spherical_histogram import summary\n"
+        "summary.solid_angle_above(np.arange(4), np.ones(4), threshold=2)\n"
+    )
+    for name in HEAVY:
+        assert name not in loaded, name
@@ -0,0 +1,95 @@
+import spherical_histogram as sh
+import numpy as np
+import pickle
+import threading
+
+
+def test_instrumentation_of_merlict():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(60)
+    )
+    assert hist.instrumentation is None
+    hist.assign_cx_cy(cx=[0.0, 0.1], cy=[0.0, 0.0])
+
+    ins = hist.enable_instrumentation()
+    hist.assign_cx_cy(cx=[0.0, 0.1, 0.95], cy=[0.0, 0.0, 0.0])
+    hist.assign_azimuth_zenith(azimuth_rad=[0.0], zenith_rad=[0.1])
+
+    report = ins.to_dict()
+    assert report["num_directions"] == 4
+    assert report["num_overflow"] == 1
+    assert report["overflow_rate"] == 0.25
+
+    stages = report["stages"]
+    assert stages["query"]["calls"] == 2
+    assert stages["query"]["items"] == 4
+    assert stages["accumulate"]["calls"] == 2
+    assert stages["tree.restore_cz"]["calls"] == 1
+    assert stages["tree.az_zd_to_cx_cy_cz"]["calls"] == 1
+    assert stages["tree.make_probing_rays"]["items"] == 4
+    assert stages["tree.query_intersection"]["calls"] == 2
+    for key in stages:
+        assert stages[key]["seconds"] >= 0.0
+
+    hist.disable_instrumentation()
+    assert hist.instrumentation is None
+    hist.assign_cx_cy(cx=0.0, cy=0.0)
+    assert ins.to_dict()["num_directions"] == 4
+
+
+def test_instrumentation_of_other_engine():
+    hist = sh.HemisphereHistogram(num_vertices=200, engine="grid")
+    ins = hist.enable_instrumentation()
+    hist.assign_cone_cx_cy(cx=0.0, cy=0.0, half_angle_rad=0.2)
+    hist.assign_cx_cy(cx=0.0, cy=0.0)
+    report = ins.to_dict()
+    assert report["num_directions"] == 1
+    assert set(report["stages"].keys()) == {
+        "cone_query",
+        "query",
+        "accumulate",
+    }
+    assert report["stages"]["cone_query"]["calls"] == 1
+    assert report["stages"]["accumulate"]["calls"] == 2
+
+
+def test_instrumentation_is_not_shared_with_other_histograms():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(60)
+    )
+    other = sh.HemisphereHistogram(bin_geometry=hist.bin_geometry)
+    ins = hist.enable_instrumentation()
+    other_ins = other.enable_instrumentation()
+
+    other.assign_cx_cy(cx=[0.0, 0.1], cy=[0.0, 0.0])
+    assert ins.to_dict()["stages"] == {}
+
+    hist.assign_cx_cy(cx=[0.0], cy=[0.0])
+    assert ins.to_dict()["stages"]["tree.make_probing_rays"]["items"] == 1
+    stages = other_ins.to_dict()["stages"]
+    assert stages["tree.make_probing_rays"]["items"] == 2
+
+
+def test_instrumentation_add_from_threads():
+    ins = sh.instrumentation.Instrumentation()
+    num_threads = 8
+    num_adds = 1000
+
+    def work():
+        for i in range(num_adds):
+            ins.add(stage="a", seconds=0.0, num_items=2)
+            ins.count_directions(num_directions=1, num_overflow=0)
+
+    threads = [threading.Thread(target=work) for t in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = ins.to_dict()
+    assert report["stages"]["a"]["calls"] == num_threads * num_adds
+    assert report["stages"]["a"]["items"] == 2 * num_threads * num_adds
+    assert report["num_directions"] == num_threads * num_adds
+
+    ins_back = pickle.loads(pickle.dumps(ins))
+    assert ins_back.to_dict() == report
@@ -0,0 +1,49 @@
+import spherical_histogram as sh
+import numpy as np
+
+
+def test_structures_are_made_on_first_access():
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+    assert geom._tree is None
+    assert geom._faces_neighbors is None
+    assert geom._faces_solid_angles is None
+
+    geom.query_cx_cy(cx=0.0, cy=0.0)
+    assert geom._tree is not None
+    assert geom._faces_neighbors is None
+    assert geom._faces_solid_angles is None
+
+    tree = geom.tree
+    assert geom.tree is tree
+
+    assert geom.warm() is geom
+    assert geom._faces_neighbors is not None
+    assert geom._faces_solid_angles is not None
+    assert geom._vertices_tree is not None
+
+
+def test_lazy_same_as_warm():
+    kwargs = {
+        "num_vertices": 200,
+        "max_zenith_distance_rad": np.deg2rad(60),
+        "engine": "vertex",
+    }
+    lazy = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        **kwargs
+    )
+    warm = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        **kwargs
+    ).warm()
+    np.testing.assert_array_equal(lazy.faces_neighbors, warm.faces_neighbors)
+    np.testing.assert_array_equal(
+        lazy.faces_solid_angles, warm.faces_solid_angles
+    )
+    cx = np.linspace(-0.5, 0.5, 101)
+    np.testing.assert_array_equal(
+        lazy.query_cx_cy(cx=cx, cy=0.5 * cx),
+        warm.query_cx_cy(cx=cx, cy=0.5 * cx),
+    )
@@ -0,0 +1,65 @@
+import spherical_histogram
+import binning_utils
+import scipy
+from scipy import spatial
+import spherical_coordinates
+import numpy as np
+
+
+def make_vertices_reference(num_vertices, max_zenith_distance_rad):
+    inner_vertices = binning_utils.sphere.fibonacci_space(
+        size=num_vertices,
+        max_zenith_distance_rad=max_zenith_distance_rad,
+    )
+    edge_angle_rad = np.sqrt(2.0 * np.pi / (2.0 * num_vertices))
+    num_horizon_vertices = int(np.ceil(2.0 * np.pi / edge_angle_rad))
+
+    horizon_vertices = []
+    for az_rad in np.linspace(
+        0, 2.0 * np.pi, num_horizon_vertices, endpoint=False
+    ):
+        horizon_vertices.append(
+            spherical_coordinates.az_zd_to_cx_cy_cz(
+                azimuth_rad=az_rad,
+                zenith_rad=max_zenith_distance_rad,
+            )
+        )
+    horizon_vertices = np.array(horizon_vertices)
+
+    vertices = []
+    tree = scipy.spatial.cKDTree(data=horizon_vertices)
+    for inner_vertex in inner_vertices:
+        delta_rad, _ = tree.query(inner_vertex)
+        if delta_rad > 0.5 * edge_angle_rad:
+            vertices.append(inner_vertex)
+    for horizon_vertex in horizon_vertices:
+        vertices.append(horizon_vertex)
+    return np.array(vertices)
+
+
+def test_fibonacci_space_same_as_binning_utils():
+    for size in [1, 2, 10, 1000]:
+        for max_zd in [0.1, np.pi / 2, np.pi]:
+            np.testing.assert_array_equal(
+                spherical_histogram.mesh.fibonacci_space(
+                    size=size, max_zenith_distance_rad=max_zd
+                ),
+                binning_utils.sphere.fibonacci_space(
+                    size=size, max_zenith_distance_rad=max_zd
+                ),
+            )
+
+
+def test_make_vertices_same_as_reference():
+    for num_vertices in [1, 3, 100, 2047, 20000]:
+        for max_zd in [0.01, 0.5, np.deg2rad(89), np.pi / 2]:
+            np.testing.assert_array_equal(
+                spherical_histogram.mesh.make_vertices(
+                    num_vertices=num_vertices,
+                    max_zenith_distance_rad=max_zd,
+                ),
+                make_vertices_reference(
+                    num_vertices=num_vertices,
+                    max_zenith_distance_rad=max_zd,
+                ),
+            )
@@ -0,0 +1,99 @@
+import spherical_histogram as sh
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geom():
+    return sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=500,
+        max_zenith_distance_rad=np.deg2rad(80),
+        engine="grid",
+    )
+
+
+def test_average_same_as_loop(geom):
+    prng = np.random.Generator(np.random.PCG64(14))
+    weights = prng.uniform(size=len(geom.faces))
+
+    total = np.zeros(3)
+    for i in range(len(geom.faces)):
+        vm = np.mean(geom.vertices[geom.faces[i]], axis=0)
+        total += vm * (weights[i] / np.linalg.norm(vm))
+    expected = total / np.linalg.norm(total)
+
+    found = sh.mesh.average(
+        faces=geom.faces, vertices=geom.vertices, faces_weights=weights
+    )
+    np.testing.assert_allclose(found, expected, atol=1e-12)
+
+
+def test_moments_of_cone(geom):
+    hist = sh.HemisphereHistogram(bin_geometry=geom, dtype=float)
+    prng = np.random.Generator(np.random.PCG64(15))
+    az = 0.7
+    zd = np.deg2rad(40)
+    cx, cy, cz = sh.geometry.draw_in_cone(
+        prng=prng,
+        azimuth_rad=az,
+        zenith_rad=zd,
+        half_angle_rad=np.deg2rad(10),
+        size=100 * 1000,
+    )
+    hist.assign_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    m = hist.moments()
+    expected = np.array(
+        sh.spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=az, zenith_rad=zd
+        )
+    )
+    delta = np.arccos(np.dot(m["mean_direction"], expected))
+    assert delta < np.deg2rad(1.0)
+    assert 0.9 < m["resultant_length"] <= 1.0
+
+    # rms angle in a uniform cone is half_angle / sqrt(2)
+    assert m["spread_rad"] == pytest.approx(
+        np.deg2rad(10) / np.sqrt(2), rel=0.1
+    )
+
+    basis = m["tangent_basis"]
+    np.testing.assert_allclose(basis @ m["mean_direction"], 0.0, atol=1e-12)
+    np.testing.assert_allclose(basis @ basis.T, np.eye(2), atol=1e-12)
+    cov = m["tangent_covariance"]
+    np.testing.assert_allclose(np.trace(cov), m["spread_rad"] ** 2, rtol=0.05)
+
+
+def test_moments_of_stack(geom):
+    hstack = sh.HemisphereHistogramStack(num_histograms=3, bin_geometry=geom)
+    hstack.assign_cx_cy(
+        histograms=[1, 1, 2], cx=[0.1, 0.2, 0.0], cy=[0.0, 0.0, 0.1]
+    )
+    m = hstack.moments()
+    assert m["mean_direction"].shape == (3, 3)
+    assert m["tangent_covariance"].shape == (3, 2, 2)
+    assert np.all(np.isnan(m["mean_direction"][0]))
+
+    for i in [1, 2]:
+        single = hstack[i].moments()
+        for key in single:
+            np.testing.assert_allclose(m[key][i], single[key])
+
+
+def test_moments_of_stack_in_chunks_same_as_at_once(geom):
+    prng = np.random.Generator(np.random.PCG64(15))
+    num_histograms = 3 * sh.stream.CHUNK_SIZE // len(geom.faces)
+    hstack = sh.HemisphereHistogramStack(
+        num_histograms=num_histograms, bin_geometry=geom, dtype=float
+    )
+    hstack.bin_counts[:] = prng.uniform(size=hstack.bin_counts.shape)
+    hstack.bin_counts[7] = 0.0
+
+    m = hstack.moments()
+    expected = sh.summary.moments(
+        bin_counts=hstack.bin_counts,
+        faces_centroids=geom.faces_centroids,
+    )
+    for key in expected:
+        assert m[key].shape == expected[key].shape
+        np.testing.assert_allclose(m[key], expected[key])
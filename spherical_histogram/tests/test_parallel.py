@@ -0,0 +1,92 @@
+import spherical_histogram as sh
+import numpy as np
+import concurrent.futures
+import pytest
+
+
+def test_add_and_merge(draw_az_zd):
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+    prng = np.random.Generator(np.random.PCG64(5))
+    az, zd = draw_az_zd(prng=prng, size=1000)
+
+    full = sh.HemisphereHistogram(bin_geometry=geom)
+    full.assign_azimuth_zenith(azimuth_rad=az, zenith_rad=zd)
+
+    a = sh.HemisphereHistogram(bin_geometry=geom)
+    a.assign_azimuth_zenith(azimuth_rad=az[:300], zenith_rad=zd[:300])
+    b = sh.HemisphereHistogram(bin_geometry=geom)
+    b.assign_azimuth_zenith(azimuth_rad=az[300:], zenith_rad=zd[300:])
+
+    c = a + b
+    np.testing.assert_array_equal(c.bin_counts, full.bin_counts)
+    assert c.overflow == full.overflow
+    assert np.sum(a.bin_counts) + a.overflow == 300
+
+    a += b
+    np.testing.assert_array_equal(a.bin_counts, full.bin_counts)
+    assert a.overflow == full.overflow
+
+
+def test_merge_other_bins_raises():
+    a = sh.HemisphereHistogram(num_vertices=200, engine="grid")
+    b = sh.HemisphereHistogram(num_vertices=300, engine="grid")
+    with pytest.raises(ValueError):
+        a.merge(b)
+
+    # same bins, but made twice
+    c = sh.HemisphereHistogram(num_vertices=200, engine="vertex")
+    a.merge(c)
+
+
+def test_parallel_same_as_serial(draw_az_zd):
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+    prng = np.random.Generator(np.random.PCG64(6))
+    az, zd = draw_az_zd(prng=prng, size=10 * 1000)
+    weights = prng.uniform(size=len(az))
+
+    serial = sh.HemisphereHistogram(
+        bin_geometry=geom, dtype=float, track_squared_weights=True
+    )
+    serial.assign_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, weights=weights
+    )
+
+    para = sh.HemisphereHistogram(
+        bin_geometry=geom, dtype=float, track_squared_weights=True
+    )
+    para.assign_parallel_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, weights=weights, num_workers=3
+    )
+    np.testing.assert_allclose(para.bin_counts, serial.bin_counts)
+    np.testing.assert_allclose(
+        para.bin_squared_weights, serial.bin_squared_weights
+    )
+    np.testing.assert_allclose(para.overflow, serial.overflow)
+
+
+def test_parallel_process_pool_with_merlict(draw_az_zd):
+    hist = sh.HemisphereHistogram(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(60)
+    )
+    prng = np.random.Generator(np.random.PCG64(7))
+    az, zd = draw_az_zd(prng=prng, size=1000)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as pool:
+        hist.assign_parallel_azimuth_zenith(
+            azimuth_rad=az, zenith_rad=zd, num_workers=2, executor=pool
+        )
+
+    faces = hist.bin_geometry.query_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd
+    )
+    expected = np.bincount(faces[faces >= 0], minlength=len(hist.bin_counts))
+    np.testing.assert_array_equal(hist.bin_counts, expected)
+    assert hist.overflow == np.sum(faces < 0)
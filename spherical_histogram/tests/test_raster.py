@@ -0,0 +1,114 @@
+import spherical_histogram as sh
+import numpy as np
+import os
+import struct
+import tempfile
+import zlib
+import pytest
+
+
+def read_png(path):
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content[0:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    chunks = {}
+    while pos < len(content):
+        (length,) = struct.unpack(">I", content[pos : pos + 4])
+        kind = content[pos + 4 : pos + 8]
+        data = content[pos + 8 : pos + 8 + length]
+        end = pos + 8 + length
+        (crc,) = struct.unpack(">I", content[end : end + 4])
+        assert crc == zlib.crc32(kind + data) & 0xFFFFFFFF
+        chunks[kind] = data
+        pos += 12 + length
+    cols, rows, depth, color_type = struct.unpack(
+        ">IIBB", chunks[b"IHDR"][0:10]
+    )
+    assert depth == 8 and color_type == 6
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    raw = raw.reshape((rows, 1 + 4 * cols))
+    assert np.all(raw[:, 0] == 0)
+    return raw[:, 1:].reshape((rows, cols, 4))
+
+
+def test_pixel_to_face_matches_orientation(geom):
+    num_pixel = 64
+    pixel_to_face = geom.pixel_to_face(num_pixel)
+    assert pixel_to_face.shape == (num_pixel, num_pixel)
+    assert geom.pixel_to_face(num_pixel) is pixel_to_face
+
+    # corners are outside of the hemisphere
+    assert pixel_to_face[0, 0] == -1
+    assert pixel_to_face[-1, -1] == -1
+
+    # top right is +cx, +cy
+    face = pixel_to_face[num_pixel // 4, 3 * num_pixel // 4]
+    assert face >= 0
+    centroid = geom.faces_centroids[face]
+    assert centroid[0] > 0 and centroid[1] > 0
+
+    # all faces are seen
+    seen = np.unique(geom.pixel_to_face(512))
+    assert set(seen[seen >= 0]) == set(range(len(geom.faces)))
+
+
+def test_render_colors(geom):
+    pixel_to_face = geom.pixel_to_face(32)
+    faces_values = np.zeros(len(geom.faces))
+    faces_values[0] = 1.0
+    rgba = sh.raster.render(
+        pixel_to_face=pixel_to_face,
+        faces_values=faces_values,
+        fill_color=(10, 20, 30),
+        background_color=(200, 210, 220),
+    )
+    assert rgba.shape == (32, 32, 4)
+    assert rgba.dtype == np.uint8
+    no_face = pixel_to_face == -1
+    assert np.all(rgba[no_face, 3] == 0)
+    assert np.all(rgba[~no_face, 3] == 255)
+    assert np.all(rgba[pixel_to_face == 0, 0:3] == [10, 20, 30])
+    others = pixel_to_face > 0
+    assert np.all(rgba[others, 0:3] == [200, 210, 220])
+
+
+def test_histogram_plot_raster_png_and_ppm(geom):
+    hist = sh.HemisphereHistogram(bin_geometry=geom)
+    hist.bin_counts[:] = np.arange(len(geom.faces))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        png_path = os.path.join(tmp, "hist.png")
+        hist.plot_raster(path=png_path, num_pixel=48)
+        rgba = read_png(png_path)
+        expected = sh.raster.render(
+            pixel_to_face=geom.pixel_to_face(48),
+            faces_values=hist.bin_counts / np.max(hist.bin_counts),
+        )
+        np.testing.assert_array_equal(rgba, expected)
+
+        ppm_path = os.path.join(tmp, "hist.ppm")
+        hist.plot_raster(path=ppm_path, num_pixel=48)
+        with open(ppm_path, "rb") as f:
+            content = f.read()
+        header = b"P6\n48 48\n255\n"
+        assert content.startswith(header)
+        rgb = np.frombuffer(content[len(header) :], dtype=np.uint8)
+        np.testing.assert_array_equal(
+            rgb.reshape((48, 48, 3)), expected[:, :, 0:3]
+        )
+
+        with pytest.raises(ValueError):
+            hist.plot_raster(path=os.path.join(tmp, "hist.jpg"))
+
+
+def test_stack_plot_raster(geom):
+    stack = sh.HemisphereHistogramStack(num_histograms=2, bin_geometry=geom)
+    stack.bin_counts[1, 3] = 5
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "1.png")
+        stack.plot_raster(i=1, path=path, num_pixel=32)
+        rgba = read_png(path)
+    pixel_to_face = geom.pixel_to_face(32)
+    assert np.any(pixel_to_face == 3)
+    assert np.all(rgba[pixel_to_face == 3, 0:3] == sh.raster.ROYAL_BLUE)
@@ -0,0 +1,73 @@
+import spherical_histogram as sh
+import numpy as np
+import os
+import pytest
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", "c", None])
+@pytest.mark.parametrize(
+    "dtype,track", [(np.uint32, False), (np.float32, True), (float, True)]
+)
+def test_save_load(tmp_path, make_hist, dtype, track, mmap_mode):
+    hist = make_hist(dtype=dtype, track_squared_weights=track)
+    path = os.path.join(tmp_path, "hist.sphhist")
+    hist.save(path)
+
+    back = sh.HemisphereHistogram.load(
+        path=path, bin_geometry=hist.bin_geometry, mmap_mode=mmap_mode
+    )
+    assert back.bin_counts.dtype == hist.bin_counts.dtype
+    np.testing.assert_array_equal(back.bin_counts, hist.bin_counts)
+    assert back.overflow == hist.overflow
+    if track:
+        np.testing.assert_array_equal(
+            back.bin_squared_weights, hist.bin_squared_weights
+        )
+    else:
+        assert back.bin_squared_weights is None
+
+    header = sh.serialization.read_header(path)
+    assert header["fingerprint"] == hist.bin_geometry.fingerprint
+
+    total = hist + back
+    np.testing.assert_array_equal(total.bin_counts, 2 * hist.bin_counts)
+
+
+def test_assign_to_read_only_raises(tmp_path, make_hist):
+    hist = make_hist(dtype=int, track_squared_weights=False)
+    path = os.path.join(tmp_path, "hist.sphhist")
+    hist.save(path)
+
+    back = sh.HemisphereHistogram.load(
+        path=path, bin_geometry=hist.bin_geometry
+    )
+    with pytest.raises(ValueError):
+        back.assign_cx_cy(cx=0.0, cy=0.0)
+
+    back = sh.HemisphereHistogram.load(
+        path=path, bin_geometry=hist.bin_geometry, mmap_mode="c"
+    )
+    back.assign_cx_cy(cx=0.0, cy=0.0)
+    assert np.sum(back.bin_counts) == np.sum(hist.bin_counts) + 1
+
+
+def test_load_other_bins_raises(tmp_path, make_hist):
+    hist = make_hist(dtype=int, track_squared_weights=False)
+    path = os.path.join(tmp_path, "hist.sphhist")
+    hist.save(path)
+
+    other = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=300,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+    with pytest.raises(ValueError):
+        sh.HemisphereHistogram.load(path=path, bin_geometry=other)
+
+
+def test_not_a_histogram_raises(tmp_path):
+    path = os.path.join(tmp_path, "something.txt")
+    with open(path, "wt") as f:
+        f.write("something else entirely")
+    with pytest.raises(ValueError):
+        sh.serialization.read_header(path)
@@ -0,0 +1,48 @@
+from spherical_histogram import mesh
+import numpy as np
+import solid_angle_utils
+
+
+def test_same_as_one_by_one():
+    vertices = mesh.make_vertices(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(90)
+    )
+    faces = mesh.make_faces(vertices=vertices)
+
+    spherical = mesh.estimate_solid_angles(
+        vertices=vertices, faces=faces, geometry="spherical"
+    )
+    flat = mesh.estimate_solid_angles(
+        vertices=vertices, faces=faces, geometry="flat"
+    )
+
+    for i in range(len(faces)):
+        v0, v1, v2 = vertices[faces[i]]
+        expected = solid_angle_utils.triangle.solid_angle(v0=v0, v1=v1, v2=v2)
+        np.testing.assert_allclose(spherical[i], expected, rtol=1e-9)
+        expected = solid_angle_utils.triangle._area_of_flat_triangle(
+            v0=v0, v1=v1, v2=v2
+        )
+        np.testing.assert_allclose(flat[i], expected, rtol=1e-9)
+
+    np.testing.assert_allclose(np.sum(spherical), 2 * np.pi, rtol=1e-2)
+
+
+def test_tiny_triangle():
+    eps = 1e-6
+    v = np.array([[0, 0, 1], [eps, 0, 1], [0, eps, 1]], dtype=float)
+    v /= np.linalg.norm(v, axis=1)[:, np.newaxis]
+    solid = mesh.estimate_solid_angles(vertices=v, faces=[[0, 1, 2]])
+    np.testing.assert_allclose(solid[0], 0.5 * eps**2, rtol=1e-6)
+
+
+def test_bad_geometry():
+    try:
+        mesh.estimate_solid_angles(
+            vertices=[[0, 0, 1], [0, 1, 0], [1, 0, 0]],
+            faces=[[0, 1, 2]],
+            geometry="curvy",
+        )
+        assert False
+    except ValueError:
+        pass
@@ -0,0 +1,128 @@
+import spherical_histogram as sh
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geom():
+    return sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+
+
+def test_same_as_many_histograms(geom, tmp_path, draw_az_zd):
+    num_histograms = 7
+    prng = np.random.Generator(np.random.PCG64(10))
+    size = 5000
+    az, zd = draw_az_zd(prng=prng, size=size)
+    weights = prng.uniform(size=size)
+    histograms = prng.integers(low=0, high=num_histograms, size=size)
+
+    for mmap_dir in [None, str(tmp_path)]:
+        hstack = sh.HemisphereHistogramStack(
+            num_histograms=num_histograms,
+            bin_geometry=geom,
+            dtype=float,
+            track_squared_weights=True,
+            mmap_dir=mmap_dir,
+        )
+        hstack.assign_azimuth_zenith(
+            histograms=histograms,
+            azimuth_rad=az,
+            zenith_rad=zd,
+            weights=weights,
+        )
+        assert hstack.bin_counts.shape == (num_histograms, len(geom.faces))
+
+        for i in range(num_histograms):
+            mask = histograms == i
+            hist = sh.HemisphereHistogram(
+                bin_geometry=geom, dtype=float, track_squared_weights=True
+            )
+            hist.assign_azimuth_zenith(
+                azimuth_rad=az[mask],
+                zenith_rad=zd[mask],
+                weights=weights[mask],
+            )
+            np.testing.assert_allclose(hstack.bin_counts[i], hist.bin_counts)
+            np.testing.assert_allclose(
+                hstack.bin_squared_weights[i], hist.bin_squared_weights
+            )
+            np.testing.assert_allclose(hstack.overflow[i], hist.overflow)
+            np.testing.assert_allclose(hstack[i].bin_counts, hist.bin_counts)
+            expected_sr = np.sum(geom.faces_solid_angles[hist.bin_counts >= 1])
+            assert hstack.solid_angle()[i] == pytest.approx(expected_sr)
+
+
+def test_cones_and_scalar_histogram(geom):
+    hstack = sh.HemisphereHistogramStack(num_histograms=3, bin_geometry=geom)
+    hstack.assign_cone_cx_cy(
+        histograms=[0, 2], cx=[0.0, 0.1], cy=[0.0, 0.0], half_angle_rad=0.2
+    )
+    hstack.assign_cx_cy(histograms=1, cx=[0.0, 0.1, 0.9], cy=[0.0, 0.0, 0.0])
+
+    faces = geom.query_cone_cx_cy(cx=0.0, cy=0.0, half_angle_rad=0.2)
+    assert np.sum(hstack.bin_counts[0]) == len(faces)
+    assert np.sum(hstack.bin_counts[1]) == 2
+    assert hstack.overflow[1] == 1
+    assert np.sum(hstack.bin_counts[2]) > 0
+
+    with pytest.raises(IndexError):
+        hstack.assign_cx_cy(histograms=3, cx=0.0, cy=0.0)
+
+
+def test_cones_with_histograms_and_weights_for_each_cone(geom):
+    cx = np.array([0.0, 0.1, -0.3, 0.2])
+    cy = np.array([0.0, 0.0, 0.2, -0.4])
+    half_angle_rad = np.array([0.2, 0.05, 0.3, 0.1])
+    histograms = np.array([2, 0, 2, 1])
+    weights = np.array([1.0, 2.0, 3.0, 4.0])
+
+    expected = np.zeros(shape=(3, len(geom.faces)))
+    for i in range(len(cx)):
+        faces = geom.query_cone_cx_cy(
+            cx=cx[i], cy=cy[i], half_angle_rad=half_angle_rad[i]
+        )
+        expected[histograms[i], faces] += weights[i]
+
+    # the cones touch different numbers of faces
+    indptr, _ = geom.query_cone_cx_cy(
+        cx=cx, cy=cy, half_angle_rad=half_angle_rad
+    )
+    assert len(np.unique(np.diff(indptr))) > 1
+
+    hstack = sh.HemisphereHistogramStack(
+        num_histograms=3, bin_geometry=geom, dtype=float
+    )
+    hstack.assign_cone_cx_cy(
+        histograms=histograms,
+        cx=cx,
+        cy=cy,
+        half_angle_rad=half_angle_rad,
+        weights=weights,
+    )
+    np.testing.assert_array_equal(hstack.bin_counts, expected)
+
+    az, zd = sh.spherical_coordinates.cx_cy_to_az_zd(cx=cx, cy=cy)
+    expected = np.zeros(shape=(3, len(geom.faces)))
+    for i in range(len(az)):
+        faces = geom.query_cone_azimuth_zenith(
+            azimuth_rad=az[i],
+            zenith_rad=zd[i],
+            half_angle_rad=half_angle_rad[i],
+        )
+        expected[histograms[i], faces] += 0.5
+
+    hstack = sh.HemisphereHistogramStack(
+        num_histograms=3, bin_geometry=geom, dtype=float
+    )
+    hstack.assign_cone_azimuth_zenith(
+        histograms=histograms,
+        azimuth_rad=az,
+        zenith_rad=zd,
+        half_angle_rad=half_angle_rad,
+        weights=0.5,
+    )
+    np.testing.assert_array_equal(hstack.bin_counts, expected)
@@ -0,0 +1,83 @@
+import spherical_histogram as sh
+import numpy as np
+import pytest
+
+
+def test_rechunk_sizes_and_order():
+    prng = np.random.Generator(np.random.PCG64(3))
+    sizes = prng.integers(low=0, high=40, size=100)
+    sizes[0] = 0
+    sizes[1] = 200
+    x = np.arange(np.sum(sizes))
+    starts = np.cumsum(sizes) - sizes
+    chunks = [(x[s : s + n], -x[s : s + n]) for s, n in zip(starts, sizes)]
+
+    batches = list(sh.stream.rechunk(chunks=chunks, chunk_size=32))
+    for batch in batches[:-1]:
+        assert len(batch[0]) == 32
+    assert 0 < len(batches[-1][0]) <= 32
+
+    np.testing.assert_array_equal(np.concatenate([b[0] for b in batches]), x)
+    np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), -x)
+
+
+def test_rechunk_scalars_and_empty():
+    assert list(sh.stream.rechunk(chunks=[], chunk_size=4)) == []
+    batches = list(sh.stream.rechunk(chunks=[(1, 2), (3, 4)], chunk_size=4))
+    assert len(batches) == 1
+    np.testing.assert_array_equal(batches[0][0], [1, 3])
+    np.testing.assert_array_equal(batches[0][1], [2, 4])
+
+
+def test_rechunk_scalar_weight_with_array_directions():
+    chunks = [([1, 2, 3], 2.0), ([4], 0.5), ([5, 6], [7.0, 8.0])]
+    batches = list(sh.stream.rechunk(chunks=chunks, chunk_size=4))
+    assert len(batches) == 2
+    np.testing.assert_array_equal(batches[0][0], [1, 2, 3, 4])
+    np.testing.assert_array_equal(batches[0][1], [2.0, 2.0, 2.0, 0.5])
+    np.testing.assert_array_equal(batches[1][1], [7.0, 8.0])
+
+    with pytest.raises(ValueError):
+        list(sh.stream.rechunk(chunks=[([1, 2, 3], [1.0, 2.0])]))
+
+
+def test_stream_same_as_batch(draw_az_zd):
+    prng = np.random.Generator(np.random.PCG64(4))
+    size = 1000
+    az, zd = draw_az_zd(prng=prng, size=size)
+    weights = prng.uniform(size=size)
+
+    expected = sh.HemisphereHistogram(
+        num_vertices=200, engine="grid", dtype=float
+    )
+    expected.assign_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, weights=weights
+    )
+
+    def generate_chunks():
+        for s in range(0, size, 77):
+            yield az[s : s + 77], zd[s : s + 77], weights[s : s + 77]
+
+    hist = sh.HemisphereHistogram(num_vertices=200, engine="grid", dtype=float)
+    hist.assign_stream_azimuth_zenith(chunks=generate_chunks(), chunk_size=100)
+
+    np.testing.assert_allclose(hist.bin_counts, expected.bin_counts)
+    np.testing.assert_allclose(hist.overflow, expected.overflow)
+
+
+def test_stream_takes_chunk_size_from_geometry():
+    hist = sh.HemisphereHistogram(num_vertices=200, engine="grid")
+    assert hist.bin_geometry.chunk_size == sh.stream.CHUNK_SIZE
+    hist.bin_geometry.chunk_size = 100
+
+    sizes = []
+    assign_cx_cy = hist.assign_cx_cy
+
+    def assign_and_record(cx, cy):
+        sizes.append(len(cx))
+        assign_cx_cy(cx=cx, cy=cy)
+
+    hist.assign_cx_cy = assign_and_record
+    hist.assign_stream_cx_cy(chunks=[(np.zeros(250), np.zeros(250))])
+    assert sizes == [100, 100, 50]
+    assert np.sum(hist.bin_counts) == 250
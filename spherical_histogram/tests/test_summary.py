@@ -0,0 +1,75 @@
+import spherical_histogram as sh
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def hist(make_hist):
+    return make_hist(
+        seed=11, size=2000, max_zenith_distance_rad=np.deg2rad(30)
+    )
+
+
+def test_solid_angle_thresholds(hist):
+    sa = hist.bin_geometry.faces_solid_angles
+    thresholds = [0, 1, 2, 10, 30, 10**6]
+    found = hist.solid_angle(threshold=thresholds)
+    assert found.shape == (len(thresholds),)
+    for i, t in enumerate(thresholds):
+        expected = np.sum(sa[hist.bin_counts >= t])
+        assert found[i] == pytest.approx(expected)
+        assert hist.solid_angle(threshold=t) == pytest.approx(expected)
+    assert hist.solid_angle(threshold=0) == pytest.approx(np.sum(sa))
+    assert hist.solid_angle(threshold=10**6) == 0.0
+
+
+def test_containment(hist):
+    sa = hist.bin_geometry.faces_solid_angles
+    assert hist.containment_solid_angle(fraction=0.0) == 0.0
+    assert hist.containment_solid_angle(fraction=1.0) == pytest.approx(
+        np.sum(sa[hist.bin_counts > 0])
+    )
+
+    fractions = [0.1, 0.5, 0.68, 0.95]
+    found = hist.containment_solid_angle(fraction=fractions)
+    assert np.all(np.diff(found) >= 0.0)
+
+    # brute force
+    density = hist.bin_counts / sa
+    order = np.argsort(-density, kind="stable")
+    for i, f in enumerate(fractions):
+        content = 0.0
+        total_sr = 0.0
+        for iface in order:
+            content += hist.bin_counts[iface]
+            total_sr += sa[iface]
+            if content >= f * np.sum(hist.bin_counts):
+                break
+        assert found[i] == pytest.approx(total_sr)
+
+
+def test_stack_same_as_histograms(hist):
+    hstack = sh.HemisphereHistogramStack(
+        num_histograms=3, bin_geometry=hist.bin_geometry
+    )
+    hstack.bin_counts[1] = hist.bin_counts
+    hstack.bin_counts[2] = hist.bin_counts[::-1]
+
+    thresholds = [1, 5]
+    fractions = [0.5, 0.9]
+    sa = hstack.solid_angle(threshold=thresholds)
+    co = hstack.containment_solid_angle(fraction=fractions)
+    assert sa.shape == (3, 2)
+    assert co.shape == (3, 2)
+    np.testing.assert_allclose(sa[0], 0.0)
+    np.testing.assert_allclose(co[0], 0.0)
+    for i in [1, 2]:
+        np.testing.assert_allclose(
+            sa[i],
+            sh.summary.solid_angle_above(
+                bin_counts=hstack.bin_counts[i],
+                faces_solid_angles=hist.bin_geometry.faces_solid_angles,
+                threshold=thresholds,
+            ),
+        )
+    np.testing.assert_allclose(co[1], hist.containment_solid_angle(fractions))
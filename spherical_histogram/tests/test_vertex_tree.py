@@ -0,0 +1,87 @@
+import spherical_histogram as sh
+import numpy as np
+
+
+def test_same_faces_as_merlict(
+    draw_cx_cy_cz_on_sphere, assert_same_faces_except_on_edges
+):
+    prng = np.random.Generator(np.random.PCG64(9))
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(80),
+    )
+    vtree = sh.vertex_tree.VertexTree(
+        vertices=geom.vertices,
+        faces=geom.faces,
+        vertices_tree=geom.vertices_tree,
+        vertices_to_faces=geom.vertices_to_faces,
+    )
+
+    cx, cy, cz = draw_cx_cy_cz_on_sphere(prng=prng, size=100 * 1000)
+    expected = geom.tree.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    faces = vtree.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    assert_same_faces_except_on_edges(
+        faces=faces, expected=expected, max_num_differing=10
+    )
+    assert np.sum(faces < 0) == np.sum(expected < 0)
+
+
+def test_scalar_and_overflow():
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="vertex",
+    )
+    assert geom.query_cx_cy_cz(cx=0.0, cy=0.0, cz=1.0) >= 0
+    assert geom.query_cx_cy_cz(cx=0.0, cy=0.0, cz=-1.0) == -1
+    assert geom.query_azimuth_zenith(azimuth_rad=0.0, zenith_rad=1.2) == -1
+
+    faces = geom.query_cx_cy(cx=[0.0, 0.1, 0.99], cy=[0.0, 0.2, 0.0])
+    assert faces[0] >= 0
+    assert faces[1] >= 0
+    assert faces[2] == -1
+
+
+def test_same_faces_as_merlict_close_to_horizon_of_fine_mesh(
+    draw_az_zd, assert_same_faces_except_on_edges
+):
+    prng = np.random.Generator(np.random.PCG64(10))
+    geom = sh.geometry.HemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=10 * 1000,
+        max_zenith_distance_rad=np.deg2rad(89),
+    )
+    vtree = sh.vertex_tree.VertexTree(
+        vertices=geom.vertices,
+        faces=geom.faces,
+        vertices_tree=geom.vertices_tree,
+        vertices_to_faces=geom.vertices_to_faces,
+        faces_neighbors=geom.faces_neighbors,
+    )
+
+    size = 1000 * 1000
+    az, zd = draw_az_zd(
+        prng=prng,
+        size=size,
+        min_zenith_distance_rad=np.deg2rad(80),
+        max_zenith_distance_rad=np.deg2rad(89.5),
+    )
+    expected = geom.tree.query_azimuth_zenith(azimuth_rad=az, zenith_rad=zd)
+    faces = vtree.query_azimuth_zenith(azimuth_rad=az, zenith_rad=zd)
+
+    assert_same_faces_except_on_edges(
+        faces=faces, expected=expected, max_num_differing=100
+    )
+
+    # A direction is only overflow when it is outside of the mesh, or
+    # right on the edge of the mesh.
+    missed = np.flatnonzero(np.logical_and(faces < 0, expected >= 0))
+    normals = vtree.faces_edge_normals[expected[missed]]
+    normals /= np.linalg.norm(normals, axis=2)[:, :, np.newaxis]
+    directions = np.array(
+        sh.spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=az[missed], zenith_rad=zd[missed]
+        )
+    ).T
+    distances = np.abs(np.einsum("nkj,nj->nk", normals, directions))
+    assert np.all(np.min(distances, axis=1) < 1e-6)
@@ -0,0 +1,84 @@
+import spherical_histogram as sh
+from spherical_histogram import mesh
+import numpy as np
+
+
+def test_csr_matches_faces():
+    vertices = mesh.make_vertices(
+        num_vertices=200, max_zenith_distance_rad=np.deg2rad(80)
+    )
+    faces = mesh.make_faces(vertices=vertices)
+    indptr, indices = mesh.estimate_vertices_to_faces(
+        faces=faces, num_vertices=len(vertices)
+    )
+    assert indptr.dtype == np.int32
+    assert indices.dtype == np.int32
+    assert indptr[-1] == 3 * len(faces)
+
+    for iv in range(len(vertices)):
+        expected = np.flatnonzero(np.any(faces == iv, axis=1))
+        np.testing.assert_array_equal(
+            indices[indptr[iv] : indptr[iv + 1]], expected
+        )
+
+
+def test_gather_csr():
+    indptr = np.array([0, 2, 2, 5])
+    indices = np.array([10, 11, 20, 21, 22])
+
+    entries, owners = mesh.gather_csr(
+        indptr=indptr, indices=indices, rows=[2, 1, 0, 2]
+    )
+    np.testing.assert_array_equal(entries, [20, 21, 22, 10, 11, 20, 21, 22])
+    np.testing.assert_array_equal(owners, [0, 0, 0, 2, 2, 3, 3, 3])
+
+    entries, owners = mesh.gather_csr(indptr=indptr, indices=indices, rows=[])
+    assert len(entries) == 0
+    assert len(owners) == 0
+
+
+def test_old_dict_form_is_accepted():
+    vertices = mesh.make_vertices(
+        num_vertices=100, max_zenith_distance_rad=np.deg2rad(80)
+    )
+    faces = mesh.make_faces(vertices=vertices)
+    vertices_to_faces = mesh.estimate_vertices_to_faces(
+        faces=faces, num_vertices=len(vertices)
+    )
+    vertices_to_faces_map = mesh.estimate_vertices_to_faces_map(
+        faces=faces, num_vertices=len(vertices)
+    )
+
+    csr = mesh.vertices_to_faces_from_map(
+        vertices_to_faces_map=vertices_to_faces_map,
+        num_vertices=len(vertices),
+    )
+    for a, b in zip(csr, vertices_to_faces):
+        np.testing.assert_array_equal(a, b)
+
+    expected = mesh.find_faces_potential_neighbors(
+        faces=faces, vertices_to_faces=vertices_to_faces
+    )
+    assert expected == mesh.find_faces_potential_neighbors(
+        faces=faces, vertices_to_faces_map=vertices_to_faces_map
+    )
+    assert expected == mesh.find_faces_potential_neighbors(
+        faces, vertices_to_faces_map
+    )
+    assert expected == mesh.find_faces_potential_neighbors(faces=faces)
+
+    geom = sh.geometry.HemisphereGeometry(
+        vertices=vertices,
+        faces=faces,
+        engine="grid",
+        vertices_to_faces_map=vertices_to_faces_map,
+    )
+    assert geom.vertices_to_faces_map == vertices_to_faces_map
+    geom = sh.geometry.HemisphereGeometry(
+        vertices=vertices,
+        faces=faces,
+        engine="grid",
+        vertices_to_faces=vertices_to_faces_map,
+    )
+    for a, b in zip(geom.vertices_to_faces, vertices_to_faces):
+        np.testing.assert_array_equal(a, b)
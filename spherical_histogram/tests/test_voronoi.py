@@ -0,0 +1,140 @@
+import spherical_histogram as sh
+import numpy as np
+import pickle
+import pytest
+
+
+@pytest.fixture(scope="module")
+def geom():
+    return sh.voronoi.VoronoiHemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=300,
+        max_zenith_distance_rad=np.deg2rad(70),
+    )
+
+
+def draw_directions(prng, size, min_cz=-0.2):
+    cz = prng.uniform(low=min_cz, high=1.0, size=size)
+    az = prng.uniform(low=-np.pi, high=np.pi, size=size)
+    r = np.sqrt(1.0 - cz**2)
+    return r * np.cos(az), r * np.sin(az), cz
+
+
+def test_query_is_nearest_point(geom):
+    prng = np.random.Generator(np.random.PCG64(1))
+    cx, cy, cz = draw_directions(prng=prng, size=10000)
+    faces = geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    expected = np.argmax(np.c_[cx, cy, cz] @ geom.points.T, axis=1)
+    expected[cz < np.cos(geom.max_zenith_distance_rad)] = -1
+    np.testing.assert_array_equal(faces, expected)
+
+    assert geom.query_cx_cy_cz(cx[0], cy[0], cz[0]) == expected[0]
+    assert geom.query_azimuth_zenith(azimuth_rad=0.0, zenith_rad=0.0) == 0
+
+
+@pytest.mark.parametrize("max_zd_deg", [30, 70, 89, 90])
+def test_solid_angles_add_up_to_cap(max_zd_deg):
+    max_zd = np.deg2rad(max_zd_deg)
+    geom = sh.voronoi.VoronoiHemisphereGeometry.from_num_vertices_and_max_zenith_distance_rad(
+        num_vertices=200,
+        max_zenith_distance_rad=max_zd,
+    )
+    assert np.all(geom.faces_solid_angles > 0)
+    np.testing.assert_allclose(
+        np.sum(geom.faces_solid_angles),
+        2.0 * np.pi * (1.0 - np.cos(max_zd)),
+        rtol=1e-6,
+    )
+
+
+def test_solid_angles_match_monte_carlo(geom):
+    prng = np.random.Generator(np.random.PCG64(2))
+    size = 1000 * 1000
+    min_cz = np.cos(geom.max_zenith_distance_rad)
+    cx, cy, cz = draw_directions(prng=prng, size=size, min_cz=min_cz)
+    counts = np.bincount(
+        geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz), minlength=len(geom.faces)
+    )
+    expected = size * geom.faces_solid_angles / (2.0 * np.pi * (1 - min_cz))
+    z = (counts - expected) / np.sqrt(expected)
+    assert np.mean(z**2) < 1.5
+
+
+def test_polygon_solid_angle_above():
+    # The corner on the zenith has no azimuth, what costs some precision.
+    octant = np.eye(3)
+    np.testing.assert_allclose(
+        sh.voronoi.estimate_polygon_solid_angle_above(
+            polygon=octant, min_cz=0.5
+        ),
+        np.pi / 4,
+        rtol=1e-4,
+    )
+    np.testing.assert_allclose(
+        sh.voronoi.estimate_polygon_solid_angle_above(
+            polygon=octant, min_cz=0.0
+        ),
+        np.pi / 2,
+        rtol=1e-4,
+    )
+
+
+def test_histogram_on_voronoi(geom):
+    prng = np.random.Generator(np.random.PCG64(3))
+    cx, cy, cz = draw_directions(prng=prng, size=1000)
+    hist = sh.HemisphereHistogram(bin_geometry=geom)
+    hist.assign_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    assert hist.overflow == np.sum(cz < np.cos(geom.max_zenith_distance_rad))
+    assert np.sum(hist.bin_counts) + hist.overflow == 1000
+
+    other = sh.HemisphereHistogram(
+        num_vertices=300, max_zenith_distance_rad=np.deg2rad(70), engine="grid"
+    )
+    with pytest.raises(ValueError):
+        hist.merge(other)
+
+    copy = pickle.loads(pickle.dumps(hist))
+    np.testing.assert_array_equal(
+        copy.bin_geometry.query_cx_cy_cz(cx=cx, cy=cy, cz=cz),
+        geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz),
+    )
+
+
+def test_draw_stays_in_cell(geom):
+    prng = np.random.Generator(np.random.PCG64(4))
+    ring_cell = np.argmin(geom.points[:, 2])
+    for cell in [0, 17, ring_cell]:
+        hist = sh.HemisphereHistogram(bin_geometry=geom)
+        hist.bin_counts[cell] = 1
+        cx, cy, cz = hist.draw(prng=prng, size=2000)
+        assert np.all(geom.query_cx_cy_cz(cx=cx, cy=cy, cz=cz) == cell)
+
+
+def test_cone_contains_cells_of_directions_in_cone(geom):
+    prng = np.random.Generator(np.random.PCG64(5))
+    half_angle_rad = np.deg2rad(8)
+    for pointing in [[0.0, 0.0, 1.0], [0.5, 0.3, np.sqrt(1 - 0.34)]]:
+        pointing = np.array(pointing)
+        faces = geom.query_cone_cx_cy_cz(
+            cx=pointing[0],
+            cy=pointing[1],
+            cz=pointing[2],
+            half_angle_rad=half_angle_rad,
+        )
+        d = prng.normal(size=(100000, 3))
+        d /= np.linalg.norm(d, axis=1)[:, np.newaxis]
+        in_cone = d @ pointing >= np.cos(half_angle_rad)
+        seen = geom.query_cx_cy_cz(*d[in_cone].T)
+        assert set(seen[seen >= 0]) <= set(faces)
+
+    indptr, faces = geom.query_cone_cx_cy_cz(
+        cx=[0.0, 0.5],
+        cy=[0.0, 0.3],
+        cz=[1.0, np.sqrt(1 - 0.34)],
+        half_angle_rad=half_angle_rad,
+    )
+    assert len(indptr) == 3
+    np.testing.assert_array_equal(
+        faces[indptr[0] : indptr[1]],
+        geom.query_cone_cx_cy_cz(0.0, 0.0, 1.0, half_angle_rad),
+    )
@@ -0,0 +1,90 @@
+import spherical_histogram as sh
+import numpy as np
+
+
+def test_unweighted_same_as_unique():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+        dtype=np.uint32,
+        track_squared_weights=True,
+    )
+    prng = np.random.Generator(np.random.PCG64(1))
+    for size in [1, 10, 10 * 1000]:
+        cx = prng.uniform(low=-0.7, high=0.7, size=size)
+        cy = prng.uniform(low=-0.7, high=0.7, size=size)
+        hist.assign_cx_cy(cx=cx, cy=cy)
+
+    faces = hist.bin_geometry.query_cx_cy(cx=0.1, cy=0.2)
+    hist.assign_cx_cy(cx=0.1, cy=0.2)
+
+    assert hist.bin_counts.dtype == np.uint32
+    assert np.sum(hist.bin_counts) + hist.overflow == 1 + 10 + 10 * 1000 + 1
+    assert hist.bin_counts[faces] >= 1
+    np.testing.assert_array_equal(hist.bin_counts, hist.bin_squared_weights)
+
+
+def test_weighted():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+        dtype=np.float64,
+        track_squared_weights=True,
+    )
+    prng = np.random.Generator(np.random.PCG64(2))
+    size = 10 * 1000
+    cx = prng.uniform(low=-0.7, high=0.7, size=size)
+    cy = prng.uniform(low=-0.7, high=0.7, size=size)
+    weights = prng.uniform(low=0, high=1, size=size)
+    hist.assign_cx_cy(cx=cx, cy=cy, weights=weights)
+
+    faces = hist.bin_geometry.query_cx_cy(cx=cx, cy=cy)
+    expected = np.zeros(len(hist.bin_counts))
+    expected_sq = np.zeros(len(hist.bin_counts))
+    for i in range(size):
+        if faces[i] >= 0:
+            expected[faces[i]] += weights[i]
+            expected_sq[faces[i]] += weights[i] ** 2
+
+    np.testing.assert_allclose(hist.bin_counts, expected)
+    np.testing.assert_allclose(hist.bin_squared_weights, expected_sq)
+    np.testing.assert_allclose(hist.overflow, np.sum(weights[faces < 0]))
+
+
+def test_weighted_cones():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(90),
+        engine="grid",
+        dtype=np.float32,
+    )
+    az = [0.0, 1.0]
+    zd = [0.2, 0.5]
+    ha = np.deg2rad(10)
+    hist.assign_cone_azimuth_zenith(
+        azimuth_rad=az, zenith_rad=zd, half_angle_rad=ha, weights=[2.0, 0.5]
+    )
+
+    expected = np.zeros(len(hist.bin_counts))
+    for i, w in enumerate([2.0, 0.5]):
+        faces = hist.bin_geometry.query_cone_azimuth_zenith(
+            azimuth_rad=az[i], zenith_rad=zd[i], half_angle_rad=ha
+        )
+        expected[faces] += w
+    np.testing.assert_allclose(hist.bin_counts, expected)
+
+
+def test_float_weights_into_int_counts_raises():
+    hist = sh.HemisphereHistogram(
+        num_vertices=200,
+        max_zenith_distance_rad=np.deg2rad(60),
+        engine="grid",
+    )
+    try:
+        hist.assign_cx_cy(cx=0.0, cy=0.0, weights=0.5)
+        raised = False
+    except TypeError:
+        raised = True
+    assert raised
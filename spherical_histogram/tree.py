@@ -1,11 +1,15 @@
 from . import mesh
+from . import instrumentation as _instrumentation
 
-import merlict
+import os
+import tempfile
 import spherical_coordinates
 import numpy as np
 
 
 def make_merlict_scenery_py(vertices, faces):
+    import merlict
+
     scenery_py = merlict.scenery.init()
     scenery_py["geometry"]["objects"][
         "hemisphere"
@@ -66,6 +70,11 @@ class Tree:
     """
     An acceleration structure to allow fast queries for rays hitting a
     mesh defined by vertices and faces.
+
+    The queries take an optional instrumentation, see
+    spherical_histogram.instrumentation.Instrumentation. If not None, the
+    stages of the query are timed. The instrumentation is an argument and
+    not a field because the tree is shared by all histograms of a geometry.
     """
 
     def __init__(self, vertices, faces):
@@ -78,10 +87,60 @@ class Tree:
         faces : numpy.array, shape(N, 3), int
             A list of N faces referencing their vertices.
         """
+        import merlict
+
         scenery_py = make_merlict_scenery_py(vertices=vertices, faces=faces)
         self._tree = merlict.compile(sceneryPy=scenery_py)
 
+    @classmethod
+    def from_dump(cls, path):
+        """
+        Reads a Tree from a dump written with dump(). This skips the
+        compilation of the tree.
+
+        Parameters
+        ----------
+        path : str
+            Path to the dump.
+        """
+        import merlict
+
+        Merlict = merlict.c89.wrapper.Merlict
+        out = cls.__new__(cls)
+        out._tree = Merlict.__new__(Merlict)
+        out._tree.init_from_dump(path)
+        return out
+
+    def dump(self, path):
+        """
+        Writes the compiled tree to path. The dump is specific to the platform
+        and to merlict's version. Use it only for local caching.
+
+        Parameters
+        ----------
+        path : str
+            Path to write the dump to.
+        """
+        self._tree.dump(path)
+
+    def __getstate__(self):
+        # The compiled tree can not be pickled directly, but its dump can.
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.dump")
+            self.dump(path)
+            with open(path, "rb") as f:
+                return {"dump": f.read()}
+
+    def __setstate__(self, state):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tree.dump")
+            with open(path, "wb") as f:
+                f.write(state["dump"])
+            self._tree = Tree.from_dump(path)._tree
+
     def _make_probing_rays(self, cx, cy, cz):
+        import merlict
+
         size = len(cx)
         rays = merlict.ray.init(size)
         rays["support.x"] = np.zeros(size)
@@ -92,17 +151,35 @@ class Tree:
         rays["direction.z"] = cz
         return rays
 
-    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
-        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
-            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+    def query_azimuth_zenith(
+        self, azimuth_rad, zenith_rad, instrumentation=None
+    ):
+        cx, cy, cz = _instrumentation.call(
+            instrumentation,
+            "tree.az_zd_to_cx_cy_cz",
+            np.size(azimuth_rad),
+            spherical_coordinates.az_zd_to_cx_cy_cz,
+            azimuth_rad=azimuth_rad,
+            zenith_rad=zenith_rad,
+        )
+        return self.query_cx_cy_cz(
+            cx=cx, cy=cy, cz=cz, instrumentation=instrumentation
         )
-        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
 
-    def query_cx_cy(self, cx, cy):
-        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
-        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+    def query_cx_cy(self, cx, cy, instrumentation=None):
+        cz = _instrumentation.call(
+            instrumentation,
+            "tree.restore_cz",
+            np.size(cx),
+            spherical_coordinates.restore_cz,
+            cx=cx,
+            cy=cy,
+        )
+        return self.query_cx_cy_cz(
+            cx=cx, cy=cy, cz=cz, instrumentation=instrumentation
+        )
 
-    def query_cx_cy_cz(self, cx, cy, cz):
+    def query_cx_cy_cz(self, cx, cy, cz, instrumentation=None):
         cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
         cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
         cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
@@ -110,8 +187,22 @@ class Tree:
         assert cx_is_scalar == cz_is_scalar
         is_scalar = cx_is_scalar
 
-        rays = self._make_probing_rays(cx=cx, cy=cy, cz=cz)
-        _hits, _intersecs = self._tree.query_intersection(rays)
+        rays = _instrumentation.call(
+            instrumentation,
+            "tree.make_probing_rays",
+            len(cx),
+            self._make_probing_rays,
+            cx=cx,
+            cy=cy,
+            cz=cz,
+        )
+        _hits, _intersecs = _instrumentation.call(
+            instrumentation,
+            "tree.query_intersection",
+            len(rays),
+            self._tree.query_intersection,
+            rays,
+        )
         size = len(rays)
 
         face_ids = np.zeros(size, dtype=int)
@@ -0,0 +1,181 @@
+from . import mesh
+
+import spherical_coordinates
+import numpy as np
+
+
+class VertexTree:
+    """
+    An acceleration structure to allow fast queries for directions hitting a
+    mesh defined by vertices and faces. Other than the Tree, this does not
+    use ray tracing but only numpy. First the nearest vertices of a direction
+    are found, then the faces touching these vertices are tested for
+    containing the direction. The few directions which are in none of the
+    faces of their nearest vertices, e.g. close to the horizon of a fine
+    mesh, walk over the faces' neighbors to their face.
+    """
+
+    def __init__(
+        self,
+        vertices,
+        faces,
+        vertices_tree,
+        vertices_to_faces,
+        num_nearest_vertices=12,
+        faces_neighbors=None,
+    ):
+        """
+        Parameters
+        ----------
+        vertices : numpy.array, shape(M, 3), float
+            The xyz-coordinates of the M vertices. The vertices are expected
+            to be on the unit-sphere.
+        faces : numpy.array, shape(N, 3), int
+            A list of N faces referencing their vertices.
+        vertices_tree : scipy.spatial.cKDTree
+            A tree of the vertices to find the nearest vertices of a
+            direction.
+        vertices_to_faces : (numpy.array, numpy.array)
+            For each vertex, the faces the vertex is connected to.
+            See spherical_histogram.mesh.estimate_vertices_to_faces().
+        num_nearest_vertices : int
+            How many of the nearest vertices of a direction are considered
+            when searching for the face containing the direction.
+        faces_neighbors : numpy.array, shape(N, 3), int
+            See spherical_histogram.mesh.estimate_faces_neighbors().
+            Estimated when None.
+        """
+        assert num_nearest_vertices > 0
+        self.num_nearest_vertices = min(
+            int(num_nearest_vertices), len(vertices)
+        )
+        self.vertices_tree = vertices_tree
+        self.faces_edge_normals = mesh.estimate_faces_edge_normals(
+            vertices=vertices, faces=faces
+        )
+        self.vertices_to_faces = _make_padded_vertices_to_faces(
+            vertices_to_faces=vertices_to_faces
+        )
+        if faces_neighbors is None:
+            faces_neighbors = mesh.estimate_faces_neighbors(faces=faces)
+        self.faces_neighbors = np.asarray(faces_neighbors)
+        self.max_num_walk_steps = 4 * int(np.ceil(np.sqrt(len(faces)))) + 16
+
+        # A direction further away from its nearest vertex than the longest
+        # edge can not be inside any face.
+        _edges_rad = mesh.estimate_faces_edges_angles(
+            vertices=vertices, faces=faces
+        )
+        self.max_edge_distance = 2.0 * np.sin(0.5 * np.max(_edges_rad))
+
+        # When all vertices are above the x-y plane, no face reaches below
+        # the lowest vertex.
+        self.min_cz = np.min(vertices[:, 2])
+        if self.min_cz < 0.0:
+            self.min_cz = -np.inf
+
+    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
+        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy(self, cx, cy):
+        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy_cz(self, cx, cy, cz):
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        cxcycz = np.c_[cx, cy, cz]
+        size = len(cxcycz)
+        face_ids = -1 * np.ones(size, dtype=int)
+        idx = np.flatnonzero(cz >= self.min_cz)
+
+        # Most directions are inside a face of their nearest vertex.
+        distances, vidxs = self.vertices_tree.query(
+            x=cxcycz[idx],
+            k=1,
+            distance_upper_bound=self.max_edge_distance,
+            workers=-1,
+        )
+        near = np.isfinite(distances)
+        idx = idx[near]
+        vidxs = vidxs[near]
+        face_ids[idx] = mesh.find_first_face_containing_direction(
+            faces_edge_normals=self.faces_edge_normals,
+            candidate_faces=self.vertices_to_faces[vidxs],
+            directions=cxcycz[idx],
+        )
+        nearest = vidxs[face_ids[idx] < 0]
+
+        # The remaining ones are either outside of the mesh, or inside a
+        # face of one of their next nearest vertices.
+        idx = idx[face_ids[idx] < 0]
+        if len(idx) > 0 and self.num_nearest_vertices > 1:
+            _, vidxs = self.vertices_tree.query(
+                x=cxcycz[idx],
+                k=self.num_nearest_vertices,
+                distance_upper_bound=self.max_edge_distance,
+                workers=-1,
+            )
+            for k in range(1, self.num_nearest_vertices):
+                found = mesh.find_first_face_containing_direction(
+                    faces_edge_normals=self.faces_edge_normals,
+                    candidate_faces=self.vertices_to_faces[vidxs[:, k]],
+                    directions=cxcycz[idx],
+                )
+                hit = found >= 0
+                face_ids[idx[hit]] = found[hit]
+                idx = idx[~hit]
+                vidxs = vidxs[~hit]
+                nearest = nearest[~hit]
+                if len(idx) == 0:
+                    break
+
+        # The last ones walk from a face of their nearest vertex. Only
+        # walks leaving the mesh show that a direction is outside.
+        if len(idx) > 0:
+            face_ids[idx] = mesh.walk_to_faces_containing_directions(
+                faces_edge_normals=self.faces_edge_normals,
+                faces_neighbors=self.faces_neighbors,
+                start_faces=np.maximum(self.vertices_to_faces[nearest, 0], 0),
+                directions=cxcycz[idx],
+                max_num_steps=self.max_num_walk_steps,
+            )
+            for i in idx[face_ids[idx] == -2]:
+                face_ids[i] = self._find_face_exhaustive(cxcycz[i])
+
+        return spherical_coordinates.dimensionality._out(
+            is_scalar=is_scalar,
+            x=face_ids,
+        )
+
+    def _find_face_exhaustive(self, direction):
+        dots = np.einsum("nkj,j->nk", self.faces_edge_normals, direction)
+        faces = np.flatnonzero(np.all(dots >= 0.0, axis=1))
+        return faces[0] if len(faces) > 0 else -1
+
+
+def _make_padded_vertices_to_faces(vertices_to_faces):
+    """
+    Returns the vertices_to_faces as an array of shape
+    (num_vertices + 1, max. number of faces on a vertex) where unused
+    slots are -1. The additional last row is for the index num_vertices
+    which the cKDTree returns when it finds no vertex.
+    """
+    indptr, indices = vertices_to_faces
+    num_vertices = len(indptr) - 1
+    counts = np.diff(indptr)
+    max_num = np.max(counts) if num_vertices > 0 else 0
+
+    out = -1 * np.ones(shape=(num_vertices + 1, max_num), dtype=int)
+    rows = np.repeat(np.arange(num_vertices), counts)
+    cols = np.arange(len(rows)) - np.repeat(indptr[:-1], counts)
+    out[rows, cols] = indices[indptr[0] : indptr[-1]]
+    return out
@@ -0,0 +1,575 @@
+"""
+Bins which are the spherical Voronoi cells of Fibonacci spaced points.
+
+A direction is in the bin of its nearest point. So finding the bin is a
+single query of a KD-tree, without testing triangles and without ray
+tracing. The cells of the points on the horizon-ring reach below the
+max_zenith_distance_rad. Directions there are overflow, and the solid angles
+of these cells only count their part above.
+
+The faces of a VoronoiHemisphereGeometry are the cells, polygons with a
+varying number of corners padded with -1. So a HemisphereHistogram works on
+top of it as on a HemisphereGeometry.
+"""
+
+from . import mesh
+from . import geometry
+from . import raster
+from . import stream
+
+import itertools
+import numpy as np
+import spherical_coordinates
+
+
+class VoronoiHemisphereGeometry:
+    """
+    Fields
+    ------
+    points : numpy.array, shape(N, 3)
+        The N points on the unit-sphere. Each has one cell (bin).
+    max_zenith_distance_rad : float
+        Directions beyond are not in any cell.
+    vertices : numpy.array, shape(M, 3)
+        The corners of the cells.
+    faces : numpy.array, shape(N, K), int
+        The corners of each cell in counter clockwise order, padded with -1.
+    """
+
+    def __init__(self, points, max_zenith_distance_rad, vertices, faces):
+        """
+        Use from_num_vertices_and_max_zenith_distance_rad() or
+        from_points() to make the cells.
+        """
+        self.points = np.asarray(points, dtype=float)
+        self.max_zenith_distance_rad = float(max_zenith_distance_rad)
+        self.vertices = np.asarray(vertices, dtype=float)
+        self.faces = np.asarray(faces, dtype=int)
+        assert len(self.points) == len(self.faces)
+        # The size of the batches when assigning streams of directions.
+        self.chunk_size = stream.CHUNK_SIZE
+
+        # The derived structures are made on first access, see warm().
+        self._tree = None
+        self._faces_solid_angles = None
+        self._faces_radii = None
+        self._faces_sampling_table = None
+        self._fingerprint = None
+        self._pixel_to_face = {}
+
+    @classmethod
+    def from_points(cls, points, max_zenith_distance_rad):
+        """
+        Parameters
+        ----------
+        points : numpy.array, shape(N, 3)
+            Points on the unit-sphere with zenith-distances up to
+            max_zenith_distance_rad.
+        max_zenith_distance_rad : float
+            Directions beyond are not in any cell.
+        """
+        vertices, faces = make_cells(points=points)
+        return cls(
+            points=points,
+            max_zenith_distance_rad=max_zenith_distance_rad,
+            vertices=vertices,
+            faces=faces,
+        )
+
+    @classmethod
+    def from_num_vertices_and_max_zenith_distance_rad(
+        cls,
+        num_vertices,
+        max_zenith_distance_rad,
+    ):
+        """
+        Makes the cells of the same points as the vertices of a
+        HemisphereGeometry, see spherical_histogram.mesh.make_vertices().
+        """
+        points = mesh.make_vertices(
+            num_vertices=num_vertices,
+            max_zenith_distance_rad=max_zenith_distance_rad,
+        )
+        return cls.from_points(
+            points=points, max_zenith_distance_rad=max_zenith_distance_rad
+        )
+
+    def warm(self):
+        """
+        Makes all derived structures now instead of on first access.
+
+        Returns
+        -------
+        self : VoronoiHemisphereGeometry
+        """
+        self.tree
+        self.faces_solid_angles
+        self.faces_radii
+        self.faces_sampling_table
+        self.fingerprint
+        return self
+
+    @property
+    def min_cz(self):
+        return np.cos(self.max_zenith_distance_rad)
+
+    @property
+    def tree(self):
+        """
+        The engine to find the cell of a direction, see NearestPointTree.
+        """
+        if self._tree is None:
+            self._tree = NearestPointTree(
+                points=self.points, min_cz=self.min_cz
+            )
+        return self._tree
+
+    @property
+    def faces_solid_angles(self):
+        """
+        The solid angle of each cell above the max_zenith_distance_rad.
+        """
+        if self._faces_solid_angles is None:
+            self._faces_solid_angles = estimate_cells_solid_angles(
+                points=self.points,
+                vertices=self.vertices,
+                faces=self.faces,
+                min_cz=self.min_cz,
+            )
+        return self._faces_solid_angles
+
+    @property
+    def faces_centroids(self):
+        """
+        The points of the cells. Close to the cells' centroids.
+        """
+        return self.points
+
+    @property
+    def faces_radii(self):
+        """
+        The angle from each point to the most distant corner of its cell.
+        """
+        if self._faces_radii is None:
+            corners = self.vertices[self.faces]
+            cos_angle = np.einsum("nj,nkj->nk", self.points, corners)
+            cos_angle[self.faces < 0] = 1.0
+            self._faces_radii = np.arccos(
+                np.clip(np.min(cos_angle, axis=1), -1.0, 1.0)
+            )
+        return self._faces_radii
+
+    @property
+    def faces_sampling_table(self):
+        """
+        The cells split into the triangles fanning out from their points.
+        See make_cells_sampling_table().
+        """
+        if self._faces_sampling_table is None:
+            self._faces_sampling_table = make_cells_sampling_table(
+                points=self.points, vertices=self.vertices, faces=self.faces
+            )
+        return self._faces_sampling_table
+
+    @property
+    def fingerprint(self):
+        """
+        A hexadecimal hash of the points and the max_zenith_distance_rad.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = geometry.make_fingerprint(
+                vertices=np.r_[self.points.ravel(), self.min_cz],
+                faces=[],
+            )
+        return self._fingerprint
+
+    def has_same_bins(self, other):
+        if other is self:
+            return True
+        return self.fingerprint == other.fingerprint
+
+    def pixel_to_face(self, num_pixel=1080):
+        """
+        See HemisphereGeometry.pixel_to_face().
+        """
+        num_pixel = int(num_pixel)
+        if num_pixel not in self._pixel_to_face:
+            self._pixel_to_face[num_pixel] = raster.make_pixel_to_face(
+                bin_geometry=self, num_pixel=num_pixel
+            )
+        return self._pixel_to_face[num_pixel]
+
+    # The instrumentation is accepted like in HemisphereGeometry, but the
+    # lookup of the nearest point has no stages to be timed.
+
+    def query_azimuth_zenith(
+        self, azimuth_rad, zenith_rad, instrumentation=None
+    ):
+        return self.tree.query_azimuth_zenith(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+
+    def query_cx_cy(self, cx, cy, instrumentation=None):
+        return self.tree.query_cx_cy(cx=cx, cy=cy)
+
+    def query_cx_cy_cz(self, cx, cy, cz, instrumentation=None):
+        return self.tree.query_cx_cy_cz(cx, cy, cz)
+
+    def query_cone_cx_cy(self, cx, cy, half_angle_rad):
+        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
+        return self.query_cone_cx_cy_cz(
+            cx=cx, cy=cy, cz=cz, half_angle_rad=half_angle_rad
+        )
+
+    def query_cone_azimuth_zenith(
+        self, azimuth_rad, zenith_rad, half_angle_rad
+    ):
+        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+        return self.query_cone_cx_cy_cz(
+            cx=cx, cy=cy, cz=cz, half_angle_rad=half_angle_rad
+        )
+
+    def query_cone_cx_cy_cz(self, cx, cy, cz, half_angle_rad):
+        """
+        Finds the cells which might touch the cones. A cell is taken when
+        the cap around its point with the cell's radius overlaps with the
+        cone. The cell of the cone's pointing is always taken.
+        See HemisphereGeometry.query_cone_cx_cy_cz() for the returns.
+        """
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        cxcycz = np.c_[cx, cy, cz]
+        num_cones = len(cxcycz)
+        half_angle_rad = np.broadcast_to(half_angle_rad, (num_cones,))
+        assert np.all(half_angle_rad >= 0)
+
+        query_angle_rad = np.minimum(
+            half_angle_rad + np.max(self.faces_radii), np.pi
+        )
+        in_cones = self.tree.points_tree.query_ball_point(
+            x=cxcycz,
+            r=2.0 * np.sin(0.5 * query_angle_rad),
+            workers=-1,
+            return_sorted=False,
+        )
+        num_candidates = np.fromiter(
+            (len(c) for c in in_cones), dtype=int, count=num_cones
+        )
+        candidates = np.fromiter(
+            itertools.chain.from_iterable(in_cones),
+            dtype=int,
+            count=np.sum(num_candidates),
+        )
+        cones = np.repeat(np.arange(num_cones), num_candidates)
+
+        cos_angle = np.einsum(
+            "ij,ij->i", cxcycz[cones], self.points[candidates]
+        )
+        angle = np.arccos(np.clip(cos_angle, -1.0, 1.0))
+        reach = half_angle_rad[cones] + self.faces_radii[candidates]
+        touching = angle <= reach
+
+        # the cell of the pointing itself
+        pointing_faces = self.tree.query_cx_cy_cz(
+            cx=cxcycz[:, 0], cy=cxcycz[:, 1], cz=cxcycz[:, 2]
+        )
+        hit = pointing_faces >= 0
+
+        num_faces = len(self.faces)
+        keys = np.unique(
+            np.r_[
+                cones[touching] * num_faces + candidates[touching],
+                np.flatnonzero(hit) * num_faces + pointing_faces[hit],
+            ]
+        )
+        cones = keys // num_faces
+        faces = keys % num_faces
+
+        if is_scalar:
+            return faces
+
+        faces_indptr = np.zeros(num_cones + 1, dtype=int)
+        faces_indptr[1:] = np.cumsum(np.bincount(cones, minlength=num_cones))
+        return faces_indptr, faces
+
+    def draw_points_in_faces(self, prng, faces):
+        """
+        Draws one point uniformly distributed in each of the cells above the
+        max_zenith_distance_rad.
+        """
+        faces = np.asarray(faces, dtype=int)
+        points = np.zeros(shape=(len(faces), 3))
+        todo = np.arange(len(faces))
+        while len(todo) > 0:
+            points[todo] = draw_points_with_cells_sampling_table(
+                prng=prng,
+                table=self.faces_sampling_table,
+                faces=faces[todo],
+            )
+            todo = todo[points[todo, 2] < self.min_cz]
+        return points
+
+    def plot(self, **kwargs):
+        """
+        Writes a plot with the cells to path.
+        """
+        mesh.plot(vertices=self.vertices, faces=self.faces, **kwargs)
+
+    def __repr__(self):
+        return "{:s}(num_bins={:d})".format(
+            self.__class__.__name__, len(self.faces)
+        )
+
+
+class NearestPointTree:
+    """
+    Finds the nearest point of a direction with a KD-tree. Directions with
+    a cz below min_cz are not in any cell, -1.
+    """
+
+    def __init__(self, points, min_cz):
+        import scipy.spatial
+
+        self.points_tree = scipy.spatial.cKDTree(data=points)
+        self.min_cz = min_cz
+
+    def query_azimuth_zenith(self, azimuth_rad, zenith_rad):
+        cx, cy, cz = spherical_coordinates.az_zd_to_cx_cy_cz(
+            azimuth_rad=azimuth_rad, zenith_rad=zenith_rad
+        )
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy(self, cx, cy):
+        cz = spherical_coordinates.restore_cz(cx=cx, cy=cy)
+        return self.query_cx_cy_cz(cx=cx, cy=cy, cz=cz)
+
+    def query_cx_cy_cz(self, cx, cy, cz):
+        cx_is_scalar, cx = spherical_coordinates.dimensionality._in(x=cx)
+        cy_is_scalar, cy = spherical_coordinates.dimensionality._in(x=cy)
+        cz_is_scalar, cz = spherical_coordinates.dimensionality._in(x=cz)
+        assert cx_is_scalar == cy_is_scalar
+        assert cx_is_scalar == cz_is_scalar
+        is_scalar = cx_is_scalar
+
+        face_ids = -1 * np.ones(len(cx), dtype=int)
+        idx = np.flatnonzero(cz >= self.min_cz)
+        _, face_ids[idx] = self.points_tree.query(
+            x=np.c_[cx[idx], cy[idx], cz[idx]], k=1, workers=-1
+        )
+        return spherical_coordinates.dimensionality._out(
+            is_scalar=is_scalar,
+            x=face_ids,
+        )
+
+
+def make_cells(points):
+    """
+    Makes the spherical Voronoi cells of the points.
+
+    The points are mirrored at the x-y plane before the cells are made. So
+    the cells of the points above do not reach below the x-y plane.
+
+    Parameters
+    ----------
+    points : numpy.array, shape(N, 3)
+        On the unit-sphere with cz >= 0.
+
+    Returns
+    -------
+    (vertices, faces) : (numpy.array, numpy.array)
+        The corners of the cells, shape(M, 3), and the corners of each cell,
+        shape(N, K), in counter clockwise order padded with -1.
+    """
+    import scipy.spatial
+
+    points = np.asarray(points, dtype=float)
+    num_points = len(points)
+    assert np.all(points[:, 2] >= 0.0)
+
+    # Points on the x-y plane would be their own mirror.
+    mirror = points[points[:, 2] > 1e-9] * [1.0, 1.0, -1.0]
+    sv = scipy.spatial.SphericalVoronoi(points=np.r_[points, mirror])
+    sv.sort_vertices_of_regions()
+    regions = sv.regions[0:num_points]
+
+    num_corners = np.array([len(r) for r in regions], dtype=int)
+    faces = -1 * np.ones(shape=(num_points, np.max(num_corners)), dtype=int)
+    corners = np.fromiter(
+        itertools.chain.from_iterable(regions),
+        dtype=int,
+        count=np.sum(num_corners),
+    )
+    is_corner = np.arange(faces.shape[1]) < num_corners[:, np.newaxis]
+    faces[is_corner] = corners
+
+    # only keep the corners of the cells above
+    used, faces[is_corner] = np.unique(corners, return_inverse=True)
+    return sv.vertices[used], faces
+
+
+def make_fan_triangles(points, vertices, faces):
+    """
+    Splits each cell into the triangles from its point to each of its edges.
+
+    Returns
+    -------
+    (fan_vertices, fan_faces, fan_cells) : (numpy.arrays)
+        The vertices of the triangles are the corners of the cells followed
+        by the points. fan_cells is the cell of each triangle. The triangles
+        of a cell are consecutive.
+    """
+    num_cells, max_num_corners = faces.shape
+    num_corners = np.sum(faces >= 0, axis=1)
+    cells = np.arange(num_cells)
+
+    fan_faces = np.zeros(shape=(num_cells, max_num_corners, 3), dtype=int)
+    for j in range(max_num_corners):
+        nxt = faces[cells, (j + 1) % np.maximum(num_corners, 1)]
+        fan_faces[:, j, 0] = len(vertices) + cells
+        fan_faces[:, j, 1] = faces[:, j]
+        fan_faces[:, j, 2] = nxt
+
+    is_edge = faces >= 0
+    fan_vertices = np.r_[vertices, points]
+    fan_cells = np.repeat(cells, num_corners)
+    return fan_vertices, fan_faces[is_edge], fan_cells
+
+
+def estimate_cells_solid_angles(points, vertices, faces, min_cz):
+    """
+    Returns the solid angle of each cell above min_cz.
+    """
+    fan_vertices, fan_faces, fan_cells = make_fan_triangles(
+        points=points, vertices=vertices, faces=faces
+    )
+    solid_angles = np.bincount(
+        fan_cells,
+        weights=mesh.estimate_solid_angles(
+            vertices=fan_vertices, faces=fan_faces
+        ),
+        minlength=len(faces),
+    )
+
+    # The edges are great circles which bulge away from the x-y plane. So
+    # only cells with a corner below min_cz reach below it.
+    num_corners = np.sum(faces >= 0, axis=1)
+    corners_cz = np.where(faces >= 0, vertices[faces, 2], np.inf)
+    for i in np.flatnonzero(np.min(corners_cz, axis=1) < min_cz):
+        solid_angles[i] = estimate_polygon_solid_angle_above(
+            polygon=vertices[faces[i, 0 : num_corners[i]]],
+            min_cz=min_cz,
+        )
+    return solid_angles
+
+
+def estimate_polygon_solid_angle_above(polygon, min_cz, num_steps=256):
+    """
+    Returns the solid angle of the part of a spherical polygon above min_cz.
+
+    By Archimedes' hat-box theorem the projection of the sphere to azimuth
+    and cz is equal in area. There, the part above min_cz is found by
+    clipping a plane polygon. The great circle edges are approximated by
+    num_steps straight lines each.
+
+    Parameters
+    ----------
+    polygon : numpy.array, shape(K, 3)
+        The corners in counter clockwise order on the unit-sphere. The
+        polygon must not contain the nadir.
+    min_cz : float
+        The lower limit.
+    num_steps : int
+        For each edge.
+
+    Returns
+    -------
+    solid_angle : float
+    """
+    polygon = np.asarray(polygon, dtype=float)
+    t = np.linspace(0.0, 1.0, num_steps, endpoint=False)[:, np.newaxis]
+    start = polygon
+    stop = np.roll(polygon, -1, axis=0)
+    line = start[:, np.newaxis] * (1.0 - t) + stop[:, np.newaxis] * t
+    line = line.reshape((-1, 3))
+    line /= np.linalg.norm(line, axis=1)[:, np.newaxis]
+
+    az = np.unwrap(np.arctan2(line[:, 1], line[:, 0]))
+    cz = line[:, 2]
+
+    # When the polygon contains the zenith, its azimuth goes once around.
+    az_closing = az[-1] + _wrap(az[0] - az[-1])
+    if abs(az_closing - az[0]) > np.pi:
+        az = np.r_[az, az_closing, az[0]]
+        cz = np.r_[cz, 1.0, 1.0]
+
+    # clip by cz >= min_cz
+    az_next = np.roll(az, -1)
+    cz_next = np.roll(cz, -1)
+    inside = cz >= min_cz
+    crossing = inside != (cz_next >= min_cz)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = np.where(crossing, (min_cz - cz) / (cz_next - cz), 0.0)
+    x = np.c_[az, az + f * (az_next - az)].ravel()
+    y = np.c_[cz, np.full(len(cz), min_cz)].ravel()
+    keep = np.c_[inside, crossing].ravel()
+    x = x[keep]
+    y = y[keep]
+
+    shoelace = np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+    return abs(0.5 * shoelace)
+
+
+def _wrap(angle):
+    return np.mod(angle + np.pi, 2.0 * np.pi) - np.pi
+
+
+def make_cells_sampling_table(points, vertices, faces):
+    """
+    Precomputes the fan triangles of the cells to draw points in them.
+
+    Returns
+    -------
+    table : dict
+        triangles : The table of the fan triangles, see
+            spherical_histogram.mesh.make_spherical_triangles_sampling_table().
+        indptr : The triangles of cell i are indptr[i] to indptr[i + 1].
+        cumsum : The cumulative sum of the triangles' areas.
+    """
+    fan_vertices, fan_faces, fan_cells = make_fan_triangles(
+        points=points, vertices=vertices, faces=faces
+    )
+    triangles = mesh.make_spherical_triangles_sampling_table(
+        vertices=fan_vertices, faces=fan_faces
+    )
+    indptr = np.zeros(len(faces) + 1, dtype=int)
+    indptr[1:] = np.cumsum(np.bincount(fan_cells, minlength=len(faces)))
+    return {
+        "triangles": triangles,
+        "indptr": indptr,
+        "cumsum": np.r_[0.0, np.cumsum(triangles["area"])],
+    }
+
+
+def draw_points_with_cells_sampling_table(prng, table, faces):
+    """
+    Draws one point uniformly distributed within each of the cells faces.
+    The points might be below the max_zenith_distance_rad.
+    """
+    faces = np.asarray(faces, dtype=int)
+    indptr = table["indptr"]
+    cumsum = table["cumsum"]
+    start = cumsum[indptr[faces]]
+    stop = cumsum[indptr[faces + 1]]
+    u = start + prng.uniform(size=len(faces)) * (stop - start)
+    triangles = np.searchsorted(cumsum, u, side="right") - 1
+    triangles = np.clip(triangles, indptr[faces], indptr[faces + 1] - 1)
+    return mesh.draw_points_with_sampling_table(
+        prng=prng, table=table["triangles"], faces=triangles
+    )